@@ -0,0 +1,55 @@
+####################################################################################################
+# 
+# ファイル名：bench_candidate_match.py
+# 詳細：案件マッチングのスコア計算のベンチマークです。
+#       10,000 ユーザー × 500 技術の合成データでスキル行列を構築し、採点にかかる時間を計測します。
+#       myapp ディレクトリで `python benchmarks/bench_candidate_match.py` として実行します。
+# 
+####################################################################################################
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.match_utils import SkillMatrix, build_requirement
+
+USER_COUNT = 10000
+TECH_COUNT = 500
+SKILLS_PER_USER = 30
+REPEAT = 20
+
+
+def build_matrix():
+    random.seed(0)
+    tech_names = {f'tech{index}': f'Tech{index}' for index in range(TECH_COUNT)}
+    keys = list(tech_names)
+    user_months = {
+        user_id: {key: random.randint(1, 120) for key in random.sample(keys, SKILLS_PER_USER)}
+        for user_id in range(1, USER_COUNT + 1)
+    }
+    matrix = SkillMatrix()
+    started = time.perf_counter()
+    matrix.load(user_months, tech_names)
+    return matrix, time.perf_counter() - started
+
+
+def main():
+    matrix, build_seconds = build_matrix()
+    print(f'build: {USER_COUNT} users x {TECH_COUNT} technologies in {build_seconds * 1000:.1f} ms')
+
+    requirements = (
+        [build_requirement(f'Tech{index}', 36, 3, True) for index in range(3)]
+        + [build_requirement(f'Tech{index}', 12, None, False) for index in range(3, 10)]
+    )
+    for limit in (10, 100):
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            results = matrix.score(requirements, limit)
+        elapsed = (time.perf_counter() - started) / REPEAT
+        print(f'score: {len(requirements)} requirements, top {limit} -> {elapsed * 1000:.2f} ms/query (best score {results[0]["score"]})')
+
+
+if __name__ == '__main__':
+    main()
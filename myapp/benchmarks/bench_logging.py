@@ -0,0 +1,97 @@
+####################################################################################################
+# 
+# ファイル名：bench_logging.py
+# 詳細：ログ出力の待ち時間のベンチマークです。
+#       複数のスレッドから同時にログを出力し、1回の logger.info にかかる時間を
+#       (1) RotatingFileHandler（maxBytes=10KB）を直接使う従来の構成と
+#       (2) QueueHandler / QueueListener を経由する現在の構成（maxBytes=10MB）で比較します。
+#       myapp ディレクトリで `python benchmarks/bench_logging.py` として実行します。
+# 
+####################################################################################################
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+THREAD_COUNT = 8
+MESSAGES_PER_THREAD = 2000
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+
+def run_threads(logger):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(index):
+        local = []
+        for number in range(MESSAGES_PER_THREAD):
+            started = time.perf_counter()
+            logger.info(f'Admin {index} accessed user list {number}')
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(THREAD_COUNT)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f'{name}: p50 {p50:.1f} us, p99 {p99:.1f} us, max {latencies[-1] * 1e6:.1f} us, wall {elapsed * 1000:.0f} ms')
+
+
+def build_file_handler(directory, max_bytes):
+    handler = RotatingFileHandler(os.path.join(directory, 'skill_canvas.log'), maxBytes=max_bytes, backupCount=10)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def bench_direct(directory):
+    logger = logging.getLogger('bench.direct')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = build_file_handler(directory, 10240)
+    logger.addHandler(handler)
+    latencies, elapsed = run_threads(logger)
+    handler.close()
+    report('RotatingFileHandler (10KB)   ', latencies, elapsed)
+
+
+def bench_queue(directory):
+    logger = logging.getLogger('bench.queue')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = build_file_handler(directory, 10 * 1024 * 1024)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler)
+    logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    latencies, elapsed = run_threads(logger)
+    flush_started = time.perf_counter()
+    listener.stop()
+    handler.close()
+    report('QueueHandler + listener (10MB)', latencies, elapsed)
+    print(f'  flush on shutdown: {(time.perf_counter() - flush_started) * 1000:.0f} ms')
+
+
+def main():
+    print(f'{THREAD_COUNT} threads x {MESSAGES_PER_THREAD} messages')
+    with tempfile.TemporaryDirectory() as directory:
+        bench_direct(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_queue(directory)
+
+
+if __name__ == '__main__':
+    main()
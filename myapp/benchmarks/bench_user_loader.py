@@ -0,0 +1,86 @@
+####################################################################################################
+# 
+# ファイル名：bench_user_loader.py
+# 詳細：ログインが必要なJSONエンドポイント（/api/tech_projects）の1秒あたりのリクエスト数のベンチマークです。
+#       user_loader が (1) 毎回 User.query.get でユーザーを読み込む従来の構成と
+#       (2) プロセス内のキャッシュ（get_cached_user）を使う現在の構成で、リクエスト数とSQL文の数を比較します。
+#       マイグレーション済みのDBを使用するため、myapp ディレクトリで `python benchmarks/bench_user_loader.py` として実行します。
+#       計測用のユーザーは終了時に削除します。
+# 
+####################################################################################################
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from run import app, db, login_manager, User
+from views.login_views import load_user
+from utils.auth_utils import hash_password
+
+BENCH_USERNAME = 'bench_user_loader'
+BENCH_PASSWORD = 'bench-password'
+REQUESTS = 2000
+WARMUP = 50
+
+
+def create_bench_user():
+    with app.app_context():
+        user = User.query.filter_by(username=BENCH_USERNAME).first()
+        if user is None:
+            user = User(
+                username=BENCH_USERNAME,
+                email=f'{BENCH_USERNAME}@example.com',
+                password=hash_password(BENCH_PASSWORD),
+                is_active=True,
+            )
+            db.session.add(user)
+            db.session.commit()
+
+
+def delete_bench_user():
+    with app.app_context():
+        User.query.filter_by(username=BENCH_USERNAME).delete()
+        db.session.commit()
+
+
+def run_requests(client, statements):
+    for _ in range(WARMUP):
+        client.get('/api/tech_projects/Python')
+    statements[0] = 0
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get('/api/tech_projects/Python')
+        assert response.status_code == 200, response.status_code
+    elapsed = time.perf_counter() - started
+    return REQUESTS / elapsed, statements[0] / REQUESTS
+
+
+def main():
+    app.config['TESTING'] = True
+    create_bench_user()
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    try:
+        client = app.test_client()
+        response = client.post('/login', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+        assert response.status_code == 302, 'login failed'
+
+        login_manager.user_loader(lambda user_id: User.query.get(int(user_id)))
+        rps, queries = run_requests(client, statements)
+        print(f'User.query.get : {rps:8.0f} req/s, {queries:.2f} SQL statements per request')
+
+        login_manager.user_loader(load_user)
+        rps, queries = run_requests(client, statements)
+        print(f'get_cached_user: {rps:8.0f} req/s, {queries:.2f} SQL statements per request')
+    finally:
+        login_manager.user_loader(load_user)
+        delete_bench_user()
+
+
+if __name__ == '__main__':
+    main()
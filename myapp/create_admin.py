@@ -1,12 +1,12 @@
 # create_admin.py
 
 from run import app, db, User
-from werkzeug.security import generate_password_hash
+from utils.auth_utils import hash_password
 
 def create_admin(username, mail, password):
     with app.app_context():
         # ハッシュ化されたパスワードを作成
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = hash_password(password)
         
         # 管理者ユーザーを作成
         admin_user = User(username=username, email=mail, password=hashed_password,is_active=True, is_admin=True)
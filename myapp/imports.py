@@ -2,7 +2,8 @@ from functools import wraps
 from flask import Flask, render_template, redirect, url_for, request, flash
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import asc, desc
+from sqlalchemy import asc, desc, func, select, insert, update, delete
+from sqlalchemy.orm import selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from flask_migrate import Migrate
@@ -16,9 +17,12 @@ import yaml
 from flask import send_file
 from pdf.pdf_utils import generate_pdf
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import atexit
+import queue
 import os
 from datetime import datetime, timedelta
 import re
 from flask_mail import Mail, Message
 from itsdangerous import URLSafeTimedSerializer
+from werkzeug.middleware.proxy_fix import ProxyFix
@@ -0,0 +1,66 @@
+"""project fts
+
+Revision ID: 8d2e4b61c0a7
+Revises: 3f1c9a7d2e54
+Create Date: 2026-10-19 19:02:47.551380
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b61c0a7'
+down_revision = '3f1c9a7d2e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5はSQLite専用のため、他のDBでは何もしない
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # 日本語の部分一致に対応するため trigram トークナイザーを使用（SQLite 3.34以降）
+    op.execute("""
+        CREATE VIRTUAL TABLE project_fts USING fts5(
+            project_name, industry, project_summary, responsibilities,
+            content='project', content_rowid='id', tokenize='trigram'
+        )
+    """)
+
+    # project テーブルとの同期用トリガー
+    # 注意：batch_alter_table で project を再作成するとトリガーも削除されるため、再作成が必要です
+    op.execute("""
+        CREATE TRIGGER project_fts_ai AFTER INSERT ON project BEGIN
+            INSERT INTO project_fts(rowid, project_name, industry, project_summary, responsibilities)
+            VALUES (new.id, new.project_name, new.industry, new.project_summary, new.responsibilities);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER project_fts_ad AFTER DELETE ON project BEGIN
+            INSERT INTO project_fts(project_fts, rowid, project_name, industry, project_summary, responsibilities)
+            VALUES ('delete', old.id, old.project_name, old.industry, old.project_summary, old.responsibilities);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER project_fts_au AFTER UPDATE ON project BEGIN
+            INSERT INTO project_fts(project_fts, rowid, project_name, industry, project_summary, responsibilities)
+            VALUES ('delete', old.id, old.project_name, old.industry, old.project_summary, old.responsibilities);
+            INSERT INTO project_fts(rowid, project_name, industry, project_summary, responsibilities)
+            VALUES (new.id, new.project_name, new.industry, new.project_summary, new.responsibilities);
+        END
+    """)
+
+    # 既存のプロジェクトを索引に登録
+    op.execute("INSERT INTO project_fts(project_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute('DROP TRIGGER IF EXISTS project_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS project_fts_ad')
+    op.execute('DROP TRIGGER IF EXISTS project_fts_ai')
+    op.execute('DROP TABLE IF EXISTS project_fts')
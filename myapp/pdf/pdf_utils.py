@@ -7,9 +7,11 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak
 from reportlab.lib import colors
 
-def generate_pdf(user, projects):
+def generate_pdf(user, projects, invariant=False):
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72, title="スキルシート")
+    # invariant=True の場合は作成日時と文書IDを固定し、同じ内容からは同じバイト列のPDFを出力する
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72, title="スキルシート",
+                            invariant=1 if invariant else None)
     story = []
 
     # フォントの登録
@@ -7,8 +7,8 @@ app = Flask(__name__)
 # セッションのための秘密鍵
 app.secret_key = 'your_secret_key'  
 
-# DBのURL
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///flask.db'
+# DBのURL（環境変数 DATABASE_URL で上書きできます。テストでは一時ファイルのDBを使用）
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///flask.db')
 
 # DB操作のための変数
 db = SQLAlchemy(app)
@@ -24,15 +24,35 @@ login_manager.login_view = 'login'
 if not os.path.exists('logs'):
     os.mkdir('logs')
 
-# ロガーの設定
-file_handler = RotatingFileHandler('logs/skill_canvas.log', maxBytes=10240, backupCount=10)
+# ロガーの設定（10MBごとにローテーション）
+file_handler = RotatingFileHandler('logs/skill_canvas.log', maxBytes=10 * 1024 * 1024, backupCount=10)
 file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'))
 file_handler.setLevel(logging.INFO)
 
+# ファイルへの書き込みは専用のスレッドで行い、リクエスト処理中はキューに追加するだけにする
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
 # Flaskアプリケーションのロガーにハンドラーを追加
-app.logger.addHandler(file_handler)
+app.logger.addHandler(QueueHandler(log_queue))
 app.logger.setLevel(logging.INFO)
 
+# スロークエリ専用のロガーの設定（1行1件のJSON形式で記録）
+slow_query_handler = RotatingFileHandler('logs/slow_query.log', maxBytes=1024 * 1024, backupCount=5)
+slow_query_handler.setFormatter(logging.Formatter('%(message)s'))
+slow_query_queue = queue.SimpleQueue()
+slow_query_listener = QueueListener(slow_query_queue, slow_query_handler)
+slow_query_logger = logging.getLogger('skill_canvas.slow_query')
+slow_query_logger.addHandler(QueueHandler(slow_query_queue))
+slow_query_logger.setLevel(logging.INFO)
+slow_query_logger.propagate = False
+
+# ログの書き込みスレッドを開始し、終了時にキューに残ったログを書き込む
+log_listener.start()
+slow_query_listener.start()
+atexit.register(log_listener.stop)
+atexit.register(slow_query_listener.stop)
+
 # アプリケーション起動時のログ
 app.logger.info('SkillCanvas startup')
 
@@ -44,6 +64,80 @@ mail = Mail(app)
 # パスワードリセット用のシリアライザ
 serializer = URLSafeTimedSerializer(app.secret_key)
 
+# SQLクエリ計測の設定
+app.config['SQL_QUERY_STATS_HEADER'] = False  # Trueの場合、クエリ数とDB時間をレスポンスヘッダーに出力
+app.config['SQL_QUERY_STATS_LOG'] = False  # Trueの場合、リクエストごとのクエリ数とDB時間をINFOでログに出力
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = 5  # 同じSQL文がこの回数を超えて実行されるとN+1として警告
+app.config['SQL_QUERY_BUDGETS'] = {}  # エンドポイント名: 1リクエストあたりのクエリ数の上限
+app.config['SQL_QUERY_BUDGET_STRICT'] = False  # Trueの場合、上限を超えると例外を送出（テスト用）
+app.config['SLOW_QUERY_THRESHOLD'] = 0.5  # この秒数を超えたSQL文をスロークエリとして記録（Noneで無効）
+
+# 管理画面の一覧のページネーションの設定
+app.config['PAGINATION_COUNT_TTL'] = 60  # 絞り込み条件ごとの件数をキャッシュする秒数
+
+# 管理者ダッシュボードの運用統計を再集計する間隔（秒）
+app.config['DASHBOARD_ROLLUP_TTL'] = 300
+
+# 構造化ログ（ログストア）の設定
+app.config['LOG_STORE_PATH'] = 'logs/log_store.db'  # 構造化ログを保存するSQLiteファイル
+app.config['LOG_STORE_BATCH_SIZE'] = 200  # 1回のトランザクションで書き込む最大件数
+app.config['LOG_STORE_FLUSH_INTERVAL'] = 2.0  # 書き込みを待つ最大の秒数
+app.config['LOG_STORE_RETENTION_DAYS'] = 30  # 構造化ログを保存する日数
+
+# 管理画面のログのライブ表示（Server-Sent Events）の設定
+app.config['LOG_STREAM_POLL_INTERVAL'] = 1.0  # 追記を確認する間隔（秒）
+app.config['LOG_STREAM_HEARTBEAT_INTERVAL'] = 15.0  # 追記がない場合に接続確認を送る間隔（秒）
+app.config['LOG_STREAM_MAX_SECONDS'] = 300  # 1回の接続を維持する最大秒数（ブラウザは自動で再接続）
+
+# ログの間引き・流量制限の設定（WARNING 以上のログは常に出力）
+#   message: メッセージの正規表現、logger: ロガー名（省略時はすべて）
+#   sample_rate: 残す割合（リクエスト単位で判定）、rate / burst: 1秒あたりの件数と連続で許可する件数
+app.config['LOG_SAMPLING_RULES'] = [
+    {'message': r'^(Feature|Contact) page accessed$', 'sample_rate': 0.1, 'rate': 10, 'burst': 20},
+    {'message': r'^(Received request to download PDF|Generating PDF for|PDF generated successfully)', 'sample_rate': 0.1, 'rate': 10, 'burst': 30},
+    {'message': r'^Rejected login attempt', 'rate': 1, 'burst': 10},
+]
+app.config['LOG_SAMPLING_SUMMARY_INTERVAL'] = 60  # 捨てたログの件数をまとめて出力する間隔（秒）
+
+# プロセス内キャッシュの設定
+app.config['CACHE_REVISION_CHECK_INTERVAL'] = 2.0  # 他のワーカーでの変更（世代番号）を確認する間隔（秒）
+app.config['LINK_CACHE_SIZE'] = 10000  # リンクコードのキャッシュの最大件数
+app.config['LINK_CACHE_TTL'] = 300  # 存在するリンクコードをキャッシュする秒数
+app.config['LINK_CACHE_NEGATIVE_TTL'] = 30  # 存在しないリンクコードをキャッシュする秒数
+app.config['USER_CACHE_SIZE'] = 10000  # ログイン中のユーザーのキャッシュの最大件数
+app.config['USER_CACHE_TTL'] = 300  # ログイン中のユーザーをキャッシュする秒数
+app.config['USER_CACHE_NEGATIVE_TTL'] = 30  # 存在しないユーザーIDをキャッシュする秒数
+
+# 署名のないUUID形式のリンクコード（移行前に発行したリンク）を受け付けるかどうか
+app.config['LEGACY_LINK_CODES_ENABLED'] = True
+
+# パスワードのハッシュ方式（反復回数を変更すると、次回のログイン時に新しい方式で再ハッシュする）
+app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+
+# リバースプロキシの段数（0 の場合は X-Forwarded-For を信頼せず、接続元のアドレスをクライアントのアドレスとする）
+# プロキシの後ろで動かす場合は環境変数 PROXY_FIX_X_FOR に段数を設定し、流量制限をクライアントごとにする
+app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_FOR'])
+
+# ログイン・登録の流量制限（ハッシュ計算の前に確認し、超えた場合は 429 を返却）
+app.config['LOGIN_IP_RATE'] = 0.5  # 1つのIPアドレスからの失敗（登録は試行）を1秒あたりに補充する回数
+app.config['LOGIN_IP_BURST'] = 10  # 1つのIPアドレスから連続で許可する失敗（登録は試行）の回数
+app.config['LOGIN_USERNAME_RATE'] = 0.1  # 1つのユーザー名の失敗を1秒あたりに補充する回数
+app.config['LOGIN_USERNAME_BURST'] = 5  # 1つのユーザー名で連続で許可する失敗の回数
+
+# 共有リンクの閲覧数をメモリに集計し、DBに書き込む間隔（秒）
+app.config['LINK_STATS_FLUSH_INTERVAL'] = 30
+
+# 共有リンクの有効期限の設定
+app.config['LINK_EXPIRES_DAYS_CHOICES'] = [1, 7, 30, 90]  # リンク作成時に選択できる有効期限（日）
+app.config['LINK_SWEEP_INTERVAL'] = 3600  # 期限切れ・無効化済みのリンクを削除する間隔（秒）
+app.config['LINK_SWEEP_BATCH_SIZE'] = 500  # 1回の DELETE 文で削除する件数
+app.config['LINK_SWEEP_MAX_BATCHES'] = 20  # 1回の削除処理で実行する DELETE 文の最大数
+
+# スナップショットのリンクの設定
+app.config['SNAPSHOT_DIR'] = 'snapshots'  # 作成時に出力したHTMLとPDFを保存するディレクトリ（相対パスは myapp ディレクトリが基準）
+
 ####################################################################################################
 # 
 # 変数：中間テーブル
@@ -68,7 +162,7 @@ class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # scrypt のハッシュ（約160文字）も保存できる長さ
     is_active = db.Column(db.Boolean, default=False) 
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
@@ -170,10 +264,37 @@ class Link(db.Model):
     __tablename__ = 'link'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    link_code = db.Column(db.String(36), unique=True, nullable=False)
+    link_code = db.Column(db.String(128), unique=True, nullable=False)  # 署名付きのリンクコード（移行前のリンクはUUID）
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     user = db.relationship('User', backref='links', lazy=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expires_at = db.Column(db.DateTime, nullable=True)  # 有効期限（None の場合は無期限）
+    snapshot_digest = db.Column(db.String(64), nullable=True)  # スナップショットのダイジェスト（None の場合は最新の内容を表示）
+    # ユーザーごとの最新の有効なリンクの取得と、期限切れのリンクの削除に使用
+    __table_args__ = (
+        db.Index('ix_link_user_id_is_active_created_at', 'user_id', 'is_active', 'created_at'),
+        db.Index('ix_link_expires_at', 'expires_at'),
+    )
+
+####################################################################################################
+# 
+# モデル：LinkStat
+# 詳細：共有リンクの時間帯ごとの閲覧数とPDFのダウンロード数を扱います。
+#       リンクを削除した後も集計を残すため、link_id には外部キー制約を付けていません。
+# 
+####################################################################################################
+class LinkStat(db.Model):
+    __tablename__ = 'link_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    link_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)  # 集計の時間帯（毎時0分）
+    views = db.Column(db.Integer, nullable=False, default=0)
+    pdf_downloads = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('link_id', 'hour', name='uq_link_stats_link_id_hour'),
+        db.Index('ix_link_stats_user_id_hour', 'user_id', 'hour'),
+    )
 
 ####################################################################################################
 # 
@@ -189,6 +310,31 @@ class Contact(db.Model):
     email = db.Column(db.String(120), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    replied_at = db.Column(db.DateTime, nullable=True)  # 未返信の場合は None
+
+####################################################################################################
+# 
+# モデル：DashboardRollup
+# 詳細：管理者ダッシュボードに表示する運用統計の集計結果を扱います。
+# 
+####################################################################################################
+class DashboardRollup(db.Model):
+    __tablename__ = 'dashboard_rollup'
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text, nullable=False)  # JSON形式の集計値
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+####################################################################################################
+# 
+# モデル：CacheRevision
+# 詳細：プロセス内キャッシュの世代番号を扱います。データを変更したトランザクションで番号を増やし、
+#       他のワーカーは番号の変化を見てキャッシュを破棄します。
+# 
+####################################################################################################
+class CacheRevision(db.Model):
+    __tablename__ = 'cache_revision'
+    name = db.Column(db.String(64), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
 
 
 
@@ -205,6 +351,16 @@ class AdminLoginForm(FlaskForm):
     password = PasswordField('パスワード', validators=[DataRequired()])
     submit = SubmitField('ログイン')
 
+####################################################################################################
+# 
+# 詳細：SQLクエリ計測と構造化ログのインポート
+# 
+####################################################################################################
+
+from utils.query_utils import *
+from utils.log_store import *
+from utils.log_sampling import *
+
 ####################################################################################################
 # 
 # 詳細：各Viewのインポート
@@ -0,0 +1,145 @@
+/*
+ * HTMLエスケープ
+ * サーバーから受け取った値を innerHTML に埋め込む前に使用します。
+ */
+function escapeHtml(value) {
+    if (value === null || value === undefined) {
+        return '';
+    }
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+/*
+ * 仮想スクロールのテーブル
+ * 取得済みの行のうち、表示領域に入る行だけをDOMに描画します。
+ * スクロールが末尾に近づくと、fetchPage(cursor) で次のページを取得して追加します。
+ *
+ * options:
+ *   container   - スクロールする要素
+ *   tbody       - 行を描画する tbody 要素
+ *   columnCount - 列数（スペーサー行に使用）
+ *   rowHeight   - 1行の高さ（px）
+ *   fetchPage   - (cursor) => Promise<{ rows, nextCursor, total }>
+ *                 失敗した場合は自動で再取得せず、テーブルに再試行ボタンを表示します。
+ *   renderRow   - (item) => 行の innerHTML
+ *   onTotal     - (total) => 件数の表示
+ */
+function createVirtualTable(options) {
+    const overscan = 10;
+    let items = [];
+    let nextCursor = null;
+    let done = false;
+    let loading = false;
+    let failed = false;
+    let generation = 0;
+    let framePending = false;
+
+    function spacerRow(height) {
+        const row = document.createElement('tr');
+        row.className = 'virtual-spacer';
+        row.innerHTML = `<td colspan="${options.columnCount}" style="height: ${height}px; padding: 0; border: none;"></td>`;
+        return row;
+    }
+
+    function errorRow() {
+        const row = document.createElement('tr');
+        row.className = 'virtual-error';
+        row.innerHTML = `<td colspan="${options.columnCount}" class="has-text-danger has-text-centered">
+            データの取得に失敗しました。
+            <button type="button" class="button is-small is-light ml-2">再試行</button>
+        </td>`;
+        row.querySelector('button').addEventListener('click', retry);
+        return row;
+    }
+
+    function render() {
+        framePending = false;
+        const scrollTop = options.container.scrollTop;
+        const viewportHeight = options.container.clientHeight;
+        const start = Math.max(0, Math.floor(scrollTop / options.rowHeight) - overscan);
+        const end = Math.min(items.length, Math.ceil((scrollTop + viewportHeight) / options.rowHeight) + overscan);
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(spacerRow(start * options.rowHeight));
+        for (let i = start; i < end; i++) {
+            const row = document.createElement('tr');
+            row.style.height = `${options.rowHeight}px`;
+            row.innerHTML = options.renderRow(items[i]);
+            fragment.appendChild(row);
+        }
+        fragment.appendChild(spacerRow((items.length - end) * options.rowHeight));
+        if (failed) {
+            fragment.appendChild(errorRow());
+        }
+        options.tbody.replaceChildren(fragment);
+
+        // 末尾に近づいたら次のページを取得（取得に失敗した後は再試行ボタンが押されるまで取得しない）
+        if (!done && !failed && end >= items.length - overscan) {
+            loadMore();
+        }
+    }
+
+    function scheduleRender() {
+        if (!framePending) {
+            framePending = true;
+            requestAnimationFrame(render);
+        }
+    }
+
+    function loadMore() {
+        if (loading || done || failed) {
+            return;
+        }
+        loading = true;
+        const currentGeneration = generation;
+        options.fetchPage(nextCursor).then(page => {
+            // 検索条件の変更後に届いた古い応答は破棄
+            if (currentGeneration !== generation) {
+                return;
+            }
+            items = items.concat(page.rows);
+            nextCursor = page.nextCursor;
+            done = !nextCursor;
+            if (page.total !== undefined && options.onTotal) {
+                options.onTotal(page.total);
+            }
+        }).catch(error => {
+            if (currentGeneration === generation) {
+                console.error('Error:', error);
+                failed = true;
+            }
+        }).finally(() => {
+            if (currentGeneration === generation) {
+                loading = false;
+                scheduleRender();
+            }
+        });
+    }
+
+    function retry() {
+        failed = false;
+        loadMore();
+        render();
+    }
+
+    function reset() {
+        generation++;
+        items = [];
+        nextCursor = null;
+        done = false;
+        loading = false;
+        failed = false;
+        options.container.scrollTop = 0;
+        render();
+    }
+
+    options.container.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', scheduleRender);
+
+    return { reset: reset };
+}
@@ -0,0 +1,91 @@
+####################################################################################################
+#
+# ファイル名：conftest.py
+# 詳細：テスト用のアプリケーションとDBを準備します。myapp ディレクトリで `python -m pytest tests` として実行します。
+#       DBは一時ディレクトリのSQLiteファイルにマイグレーションで作成し、テストごとに全テーブルを空にします。
+#       ログやスナップショットも一時ディレクトリに出力します。
+#
+####################################################################################################
+import os
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix='skill_canvas_test_')
+
+# run.py はインポート時にDBの接続先を決め、ログディレクトリをカレントディレクトリに作成する
+sys.path.insert(0, APP_DIR)
+os.chdir(TEST_DIR)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'test.db')
+
+import run  # noqa: E402
+from run import app, db, User  # noqa: E402
+from flask_migrate import upgrade  # noqa: E402
+from utils.auth_utils import hash_password, login_ip_limiter, login_username_limiter  # noqa: E402
+from utils.link_utils import link_code_cache  # noqa: E402
+from utils.pagination_utils import clear_count_cache  # noqa: E402
+from utils.user_cache import user_cache  # noqa: E402
+from utils.skill_index import skill_index  # noqa: E402
+from utils.user_index import user_prefix_index  # noqa: E402
+
+PASSWORD = 'test-password'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        # テストではハッシュ計算の時間を短くする
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        SNAPSHOT_DIR=os.path.join(TEST_DIR, 'snapshots'),
+    )
+    # 登録確認などのメールは送信しない
+    app.extensions['mail'].suppress = True
+    with app.app_context():
+        upgrade(directory=os.path.join(APP_DIR, 'migrations'))
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    yield
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    # プロセス内のキャッシュと流量制限も次のテストに持ち越さない
+    for cache in (link_code_cache, user_cache):
+        cache.clear()
+    clear_count_cache()
+    user_prefix_index.invalidate()
+    skill_index.invalidate()
+    login_ip_limiter.buckets.clear()
+    login_username_limiter.buckets.clear()
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def create_user():
+    def _create_user(username, password=PASSWORD, **values):
+        values.setdefault('is_active', True)
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', password=hash_password(password), **values)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return _create_user
+
+
+@pytest.fixture
+def admin_client(client, create_user):
+    create_user('admin', is_admin=True)
+    response = client.post('/admin', data={'username': 'admin', 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
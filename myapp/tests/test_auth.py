@@ -0,0 +1,83 @@
+from sqlalchemy import inspect
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash
+
+from conftest import PASSWORD
+from run import app, db, User
+
+
+def login(client, username, password=PASSWORD, address='10.0.0.1'):
+    return client.post('/login', data={'username': username, 'password': password},
+                       environ_base={'REMOTE_ADDR': address}).status_code
+
+
+def test_username_is_throttled_after_repeated_failures(client, create_user):
+    create_user('taro')
+    assert [login(client, 'taro', 'wrong') for _ in range(app.config['LOGIN_USERNAME_BURST'])] == [200] * 5
+    # 正しいパスワードでも、ハッシュ計算の前に拒否される
+    assert login(client, 'taro') == 429
+
+
+def test_ip_is_charged_only_on_failures(client, create_user):
+    create_user('taro')
+    for _ in range(app.config['LOGIN_IP_BURST'] + 5):
+        assert login(client, 'taro') == 302
+        client.get('/logout')
+
+    # 別々のユーザー名での失敗はIPアドレスごとに数える
+    statuses = [login(client, f'user{index}', 'wrong') for index in range(app.config['LOGIN_IP_BURST'] + 1)]
+    assert statuses == [200] * app.config['LOGIN_IP_BURST'] + [429]
+    assert login(client, 'taro', address='10.0.0.2') == 302
+
+
+def test_ip_throttle_uses_the_forwarded_client_address(client, create_user, monkeypatch):
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+    create_user('taro')
+
+    def login_via_proxy(client_address, password):
+        response = client.post('/login', data={'username': f'user-{password}', 'password': password},
+                               environ_base={'REMOTE_ADDR': '192.0.2.1'}, headers={'X-Forwarded-For': client_address})
+        return response.status_code
+
+    for index in range(app.config['LOGIN_IP_BURST']):
+        assert login_via_proxy('198.51.100.1', f'wrong{index}') == 200
+    assert login_via_proxy('198.51.100.1', 'wrong') == 429
+    # 同じプロキシを経由する別のクライアントは制限されない
+    assert login_via_proxy('198.51.100.2', 'wrong') == 200
+
+
+def test_registration_is_charged_on_every_attempt(client):
+    def register(index):
+        return client.post('/register', data={'username': f'new{index}', 'email': f'new{index}@example.com', 'password': PASSWORD},
+                           environ_base={'REMOTE_ADDR': '10.0.0.3'}).status_code
+
+    statuses = [register(index) for index in range(app.config['LOGIN_IP_BURST'] + 1)]
+    assert statuses == [302] * app.config['LOGIN_IP_BURST'] + [429]
+
+
+def test_login_rehashes_passwords_with_an_outdated_method(client, create_user):
+    user_id = create_user('taro')
+    with app.app_context():
+        db.session.get(User, user_id).password = generate_password_hash(PASSWORD, method='scrypt')
+        db.session.commit()
+
+    assert login(client, 'taro') == 302
+    with app.app_context():
+        password = db.session.get(User, user_id).password
+    assert password.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+
+
+def test_login_keeps_passwords_hashed_with_the_current_method(client, create_user):
+    user_id = create_user('taro')
+    with app.app_context():
+        before = db.session.get(User, user_id).password
+
+    assert login(client, 'taro') == 302
+    with app.app_context():
+        assert db.session.get(User, user_id).password == before
+
+
+def test_password_column_fits_scrypt_hashes():
+    with app.app_context():
+        columns = {column['name']: column for column in inspect(db.engine).get_columns('user')}
+    assert columns['password']['type'].length >= len(generate_password_hash(PASSWORD, method='scrypt'))
@@ -0,0 +1,41 @@
+from run import app, db, User
+
+
+def bulk_action(client, **data):
+    return client.post('/admin/users/bulk_action', json=data)
+
+
+def test_bulk_action_is_rejected_when_the_count_changed(admin_client, create_user):
+    for index in range(3):
+        create_user(f'member-{index}')
+
+    # 画面で確認した後に、検索条件に一致するユーザーが増えた
+    response = bulk_action(admin_client, action='delete', filters={'username': 'member'}, expected_count=2)
+    assert response.status_code == 409
+    assert response.get_json()['matched'] == 3
+
+    with app.app_context():
+        assert User.query.count() == 4
+
+
+def test_bulk_action_requires_a_valid_count_for_destructive_actions(admin_client, create_user):
+    create_user('member')
+
+    assert bulk_action(admin_client, action='delete', filters={'username': 'member'}).status_code == 400
+    assert bulk_action(admin_client, action='promote', filters={}, expected_count='two').status_code == 400
+    assert bulk_action(admin_client, action='drop', filters={}, expected_count=1).status_code == 400
+
+
+def test_bulk_action_applies_to_matched_users_except_the_admin(admin_client, create_user):
+    member_ids = [create_user(f'member-{index}') for index in range(2)]
+    create_user('other')
+
+    # expected_count は操作中の管理者自身を含む検索結果の件数
+    response = bulk_action(admin_client, action='promote', filters={'username': 'm'}, expected_count=3)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['matched'] == 2
+    assert body['audit']['user_ids'] == member_ids
+
+    with app.app_context():
+        assert sorted(user.username for user in User.query.filter_by(is_admin=True)) == ['admin', 'member-0', 'member-1']
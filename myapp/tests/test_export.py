@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+from run import app, db, Project, Technology, Process
+from utils import export_utils
+
+
+def create_projects(user_id, count):
+    with app.app_context():
+        for index in range(count):
+            project = Project(user_id=user_id, start_month='2020-01', end_month='2021-03', industry='金融',
+                              project_name=f'project-{index}', project_summary='概要', responsibilities='担当')
+            db.session.add(project)
+            db.session.flush()
+            db.session.add_all([
+                Technology(project_id=project.id, type='language', name='Python', duration_months=12),
+                Technology(project_id=project.id, type='database', name='SQLite', duration_months=6),
+                Process(project_id=project.id, name='設計'),
+            ])
+        db.session.commit()
+
+
+def test_export_projects_csv_streams_every_batch(admin_client, create_user, monkeypatch):
+    # バッチの境界をまたぐように件数を小さくする
+    monkeypatch.setattr(export_utils, 'EXPORT_BATCH_SIZE', 3)
+    create_projects(create_user('owner'), 7)
+
+    response = admin_client.get('/admin/export/projects?format=csv')
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+
+    assert [row['project_name'] for row in rows] == [f'project-{index}' for index in range(7)]
+    assert rows[0]['technologies'] == 'Python, SQLite'
+    assert rows[0]['processes'] == '設計'
+
+
+def test_export_projects_jsonl_with_filter(admin_client, create_user):
+    create_projects(create_user('owner'), 4)
+
+    response = admin_client.get('/admin/export/projects?format=jsonl&technologies=Python')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=projects.jsonl'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert len(rows) == 4
+    assert rows[-1]['project_name'] == 'project-3'
+    assert rows[-1]['technologies'] == 'Python, SQLite'
+
+
+def test_export_users(admin_client, create_user):
+    create_user('member')
+
+    response = admin_client.get('/admin/export/users?format=jsonl')
+    assert response.status_code == 200
+    usernames = [json.loads(line)['username'] for line in response.get_data(as_text=True).splitlines()]
+    assert usernames == ['admin', 'member']
+
+
+def test_csv_header_is_sent_before_rows():
+    def rows():
+        raise AssertionError('rows must not be read before the header is sent')
+        yield
+
+    lines = export_utils._csv_lines(['id', 'name'], rows())
+    assert next(lines) == '\ufeffid,name\r\n'
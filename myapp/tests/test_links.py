@@ -0,0 +1,154 @@
+import uuid
+from datetime import datetime, timedelta
+
+from run import app, db, Link
+from utils import link_utils
+from utils.link_utils import link_code_cache, resolve_link_code, verify_link_code, generate_link_code, sweep_links
+from conftest import PASSWORD
+
+
+def create_link(user_id, link_code=None, **values):
+    values.setdefault('is_active', True)
+    with app.app_context():
+        link = Link(user_id=user_id, link_code=link_code or str(uuid.uuid4()), **values)
+        db.session.add(link)
+        db.session.commit()
+        return link.id
+
+
+def create_signed_link(user_id):
+    with app.app_context():
+        link = Link(user_id=user_id, link_code='pending', is_active=True)
+        db.session.add(link)
+        db.session.flush()
+        link.link_code = generate_link_code(link)
+        db.session.commit()
+        return link.id, link.link_code
+
+
+def fail_on_query(*args, **kwargs):
+    raise AssertionError('link code must be resolved without a query')
+
+
+def test_unknown_link_code_is_cached_as_missing(monkeypatch):
+    link_code = str(uuid.uuid4())
+    with app.app_context():
+        assert resolve_link_code(link_code) is None
+        assert link_code_cache.get(link_code) == (True, None)
+
+        monkeypatch.setattr(db.session, 'execute', fail_on_query)
+        assert resolve_link_code(link_code) is None
+
+
+def test_cached_link_is_dropped_when_links_change(create_user):
+    link_code = str(uuid.uuid4())
+    link_id = create_link(create_user('owner'), link_code)
+    with app.app_context():
+        assert resolve_link_code(link_code).link_id == link_id
+        assert link_code_cache.get(link_code)[0]
+
+        db.session.get(Link, link_id).is_active = False
+        db.session.commit()
+
+        assert link_code_cache.get(link_code) == (False, None)
+        assert resolve_link_code(link_code) is None
+
+
+def test_signed_link_code_resolves_to_its_link(create_user):
+    user_id = create_user('owner')
+    link_id, link_code = create_signed_link(user_id)
+    assert verify_link_code(link_code) == (user_id, link_id)
+    with app.app_context():
+        target = resolve_link_code(link_code)
+    assert (target.link_id, target.user_id) == (link_id, user_id)
+
+
+def test_tampered_link_code_is_rejected_without_a_query(create_user, monkeypatch):
+    _, link_code = create_signed_link(create_user('owner'))
+    tampered = link_code[:-1] + ('A' if link_code[-1] != 'A' else 'B')
+    assert verify_link_code(tampered) is False
+
+    with app.app_context():
+        with monkeypatch.context() as patched:
+            patched.setattr(db.session, 'execute', fail_on_query)
+            assert resolve_link_code(tampered) is None
+        assert link_code_cache.get(tampered) == (False, None)
+
+
+def test_signed_claims_must_match_the_stored_link(create_user):
+    owner_id = create_user('owner')
+    link_id, _ = create_signed_link(owner_id)
+    # 別のユーザーのIDを埋め込んだ、署名は正しいリンクコード
+    forged = generate_link_code(Link(user_id=create_user('other'), id=link_id))
+    with app.app_context():
+        db.session.get(Link, link_id).link_code = forged
+        db.session.commit()
+        assert resolve_link_code(forged) is None
+
+
+def test_legacy_link_code_follows_the_setting(create_user, monkeypatch):
+    link_code = str(uuid.uuid4())
+    link_id = create_link(create_user('owner'), link_code)
+    assert verify_link_code(link_code) is None
+    with app.app_context():
+        assert resolve_link_code(link_code).link_id == link_id
+
+    monkeypatch.setitem(app.config, 'LEGACY_LINK_CODES_ENABLED', False)
+    assert verify_link_code(link_code) is False
+    with app.app_context():
+        assert resolve_link_code(link_code) is None
+
+
+INVALID_LINK_MESSAGE = '無効なURLのため、スキルシートを表示できません。'
+
+
+def test_create_link_sets_the_chosen_expiry(client, create_user):
+    create_user('owner')
+    client.post('/login', data={'username': 'owner', 'password': PASSWORD})
+
+    assert client.post('/create_link', json={'expires_in_days': 5}).status_code == 400
+    response = client.post('/create_link', json={'expires_in_days': 7})
+    assert response.status_code == 200
+    with app.app_context():
+        expires_at = Link.query.one().expires_at
+    assert timedelta(days=7) - timedelta(minutes=1) < expires_at - datetime.now() <= timedelta(days=7)
+
+
+def test_expired_link_is_not_shown(client, create_user):
+    link_code = str(uuid.uuid4())
+    create_link(create_user('owner'), link_code, expires_at=datetime.now() - timedelta(seconds=1))
+    response = client.get(f'/view_sheet/{link_code}')
+    assert INVALID_LINK_MESSAGE in response.get_data(as_text=True)
+
+
+def test_cached_link_is_rejected_once_it_expires(create_user, monkeypatch):
+    link_code = str(uuid.uuid4())
+    expires_at = datetime.now() + timedelta(hours=1)
+    create_link(create_user('owner'), link_code, expires_at=expires_at)
+    with app.app_context():
+        assert resolve_link_code(link_code) is not None
+
+        class Later(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return expires_at + timedelta(seconds=1)
+
+        monkeypatch.setattr(link_utils, 'datetime', Later)
+        assert link_code_cache.get(link_code)[0]
+        assert resolve_link_code(link_code) is None
+
+
+def test_sweep_links_deletes_expired_and_revoked_links_in_batches(create_user):
+    user_id = create_user('owner')
+    past = datetime.now() - timedelta(days=1)
+    for _ in range(3):
+        create_link(user_id, expires_at=past)
+    create_link(user_id, is_active=False)
+    kept = [
+        create_link(user_id),
+        create_link(user_id, expires_at=datetime.now() + timedelta(days=1)),
+    ]
+
+    with app.app_context():
+        assert sweep_links(batch_size=2, max_batches=10) == 4
+        assert sorted(link.id for link in Link.query.all()) == kept
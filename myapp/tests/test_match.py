@@ -0,0 +1,63 @@
+import pytest
+
+from utils import match_utils
+from utils.match_utils import SkillMatrix, build_requirement
+
+
+def build_matrix():
+    matrix = SkillMatrix()
+    matrix.load(
+        {1: {'python': 36, 'sql': 12}, 2: {'python': 6}, 3: {'go': 48}},
+        {'python': 'Python', 'sql': 'SQL', 'go': 'Go'},
+    )
+    return matrix
+
+
+def test_score_ranks_candidates_meeting_required_skills_first():
+    results = build_matrix().score([
+        build_requirement('Python', 24, None, True),
+        build_requirement('SQL', 12, None, False),
+    ])
+
+    assert [result['user_id'] for result in results] == [1, 2]
+    assert results[0]['score'] == 100.0
+    assert results[0]['skills'] == {'Python': 36, 'SQL': 12}
+    assert results[1]['missing_required'] == ['Python']
+
+
+def test_score_is_not_affected_by_a_reload_during_scoring(monkeypatch):
+    matrix = build_matrix()
+    normalize = match_utils.normalize_skill_name
+    calls = []
+
+    def reload_while_scoring(name):
+        # 採点の途中で、列と行の数が異なる内容に再構築される
+        calls.append(name)
+        if len(calls) == 3:
+            matrix.load({9: {'rust': 1}}, {'rust': 'Rust'})
+        return normalize(name)
+
+    monkeypatch.setattr(match_utils, 'normalize_skill_name', reload_while_scoring)
+    results = matrix.score([build_requirement('Python', 24, None, True), build_requirement('Go', 12, None, False)])
+
+    assert [result['user_id'] for result in results] == [1, 3, 2]
+    assert matrix.score([build_requirement('Rust', 1, None, True)])[0]['user_id'] == 9
+
+
+@pytest.mark.parametrize('months, weight', [('nan', None), (None, 'inf'), (None, float('-inf')), (float('nan'), 1)])
+def test_build_requirement_rejects_non_finite_values(months, weight):
+    with pytest.raises(ValueError):
+        build_requirement('Python', months, weight, True)
+
+
+def test_build_requirement_defaults_unreadable_values():
+    assert build_requirement('Python', 'abc', '', False) == {'name': 'Python', 'months': 1, 'weight': 1.0, 'required': False}
+
+
+def test_candidate_match_rejects_non_finite_weight(admin_client):
+    response = admin_client.post('/admin/candidate_match', json={'required': [{'name': 'frfr', 'weight': 'nan'}]})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'スキル要件の形式が正しくありません。'}
+
+    response = admin_client.post('/admin/candidate_match', json={'required': [{'name': 'frfr', 'weight': 2}], 'limit': 1e999})
+    assert response.status_code == 200
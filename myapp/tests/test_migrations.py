@@ -0,0 +1,12 @@
+import os
+
+from flask_migrate import check
+
+from conftest import APP_DIR
+from run import app
+
+
+def test_models_match_migrations():
+    # autogenerate で差分が検出されないこと（project_fts の仮想テーブルを削除する差分も含む）
+    with app.app_context():
+        check(directory=os.path.join(APP_DIR, 'migrations'))
@@ -0,0 +1,43 @@
+from utils.pagination_utils import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42, 'next')) == (42, 'next')
+    assert decode_cursor(encode_cursor(7, 'prev')) == (7, 'prev')
+
+
+def test_tampered_or_missing_cursor_starts_from_the_first_page():
+    token = encode_cursor(42, 'prev')
+    assert decode_cursor(token[:-1] + ('A' if token[-1] != 'A' else 'B')) == (None, 'next')
+    assert decode_cursor(None) == (None, 'next')
+    assert decode_cursor('not-a-cursor') == (None, 'next')
+
+
+def fetch_page(client, cursor=None):
+    params = {'per_page': 2}
+    if cursor:
+        params['cursor'] = cursor
+    response = client.get('/admin/users_pagination', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_users_pagination_walks_forward_and_back(admin_client, create_user):
+    for index in range(4):
+        create_user(f'member-{index}')
+
+    first = fetch_page(admin_client)
+    assert [user['username'] for user in first['users']] == ['admin', 'member-0']
+    assert first['total'] == 5
+    assert first['prev_cursor'] is None
+
+    second = fetch_page(admin_client, first['next_cursor'])
+    assert [user['username'] for user in second['users']] == ['member-1', 'member-2']
+
+    last = fetch_page(admin_client, second['next_cursor'])
+    assert [user['username'] for user in last['users']] == ['member-3']
+    assert last['next_cursor'] is None
+
+    back = fetch_page(admin_client, last['prev_cursor'])
+    assert back['users'] == second['users']
+    assert fetch_page(admin_client, back['prev_cursor'])['users'] == first['users']
@@ -0,0 +1,61 @@
+from run import app, db, Project, Technology, Process
+from utils.project_utils import sync_project_skills, load_project_skills, group_technologies_by_type
+
+
+def create_project(user_id):
+    with app.app_context():
+        project = Project(user_id=user_id, start_month='2020-01', end_month='2021-03', industry='金融',
+                          project_name='project', project_summary='概要', responsibilities='担当')
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([
+            Technology(project_id=project.id, type='language', name='Python', duration_months=12),
+            Technology(project_id=project.id, type='language', name='Go', duration_months=6),
+            # 同じ (種類, 技術名) の重複行
+            Technology(project_id=project.id, type='language', name='Go', duration_months=6),
+            Technology(project_id=project.id, type='database', name='SQLite', duration_months=6),
+            Process(project_id=project.id, name='設計'),
+            Process(project_id=project.id, name='テスト'),
+        ])
+        db.session.commit()
+        return project.id
+
+
+def test_sync_project_skills_applies_only_the_diff(create_user):
+    project_id = create_project(create_user('owner'))
+
+    with app.app_context():
+        counts = sync_project_skills(
+            project_id,
+            {'language': {'Python': '24', 'Go': '6'}, 'database': {}, 'tools': {'Git': '3'}},
+            ['設計', '実装', '実装'],
+        )
+        db.session.commit()
+        technologies, processes = load_project_skills(project_id)
+
+    assert counts == {
+        'technologies_added': 1,
+        'technologies_updated': 1,
+        'technologies_deleted': 2,
+        'processes_added': 1,
+        'processes_deleted': 1,
+    }
+    assert sorted((tech.type, tech.name, tech.duration_months) for tech in technologies) == [
+        ('language', 'Go', 6), ('language', 'Python', 24), ('tools', 'Git', 3),
+    ]
+    assert sorted(process.name for process in processes) == ['実装', '設計']
+
+    grouped = group_technologies_by_type(technologies)
+    assert [tech.name for tech in grouped['language']] == ['Python', 'Go']
+    assert grouped['database'] == []
+
+
+def test_sync_project_skills_without_changes_writes_nothing(create_user):
+    project_id = create_project(create_user('owner'))
+    with app.app_context():
+        sync_project_skills(project_id, {'language': {'Python': 12, 'Go': 6}, 'database': {'SQLite': 6}}, ['設計', 'テスト'])
+        db.session.commit()
+
+        counts = sync_project_skills(project_id, {'language': {'Python': 12, 'Go': 6}, 'database': {'SQLite': 6}}, ['設計', 'テスト'])
+
+    assert set(counts.values()) == {0}
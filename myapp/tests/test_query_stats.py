@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from run import app, db
+from utils.query_utils import QueryBudgetExceeded
+
+
+def test_failed_statement_does_not_leave_start_time():
+    with app.app_context():
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+        assert connection.info['query_start_time'] == []
+        db.session.rollback()
+
+
+def test_queries_in_streamed_response_are_counted(admin_client, create_user, monkeypatch):
+    for index in range(3):
+        create_user(f'member-{index}')
+    messages = []
+    monkeypatch.setattr(app.logger, 'info', messages.append)
+    monkeypatch.setitem(app.config, 'SQL_QUERY_STATS_LOG', True)
+    monkeypatch.setitem(app.config, 'SQL_QUERY_STATS_HEADER', True)
+
+    response = admin_client.get('/admin/export/users?format=jsonl')
+    assert len(response.get_data(as_text=True).splitlines()) == 4
+    response.close()
+
+    # ヘッダーは本文の生成前の値で、ログには本文の生成中のクエリも含まれる
+    before_body = int(response.headers['X-Query-Count'])
+    reported = [message for message in messages if message.startswith('admin_export_users:')]
+    assert reported == [f'admin_export_users: {before_body + 1} queries in {reported[0].split(" in ")[1]}']
+
+
+def test_query_budget_covers_streamed_response(admin_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQL_QUERY_BUDGET_STRICT', True)
+    # 本文の生成前に実行されるクエリだけなら上限に収まる
+    monkeypatch.setitem(app.config, 'SQL_QUERY_BUDGETS', {'admin_export_users': 2})
+
+    with pytest.raises(QueryBudgetExceeded):
+        admin_client.get('/admin/export/users?format=jsonl').close()
@@ -0,0 +1,63 @@
+from sqlalchemy import insert
+
+from run import app, db, Project, Technology
+from utils.cache_utils import bump_cache_revision
+from utils.skill_index import skill_index
+
+
+def add_project(user_id, technologies):
+    with app.app_context():
+        project = Project(user_id=user_id, start_month='2020-01', end_month='2022-12', industry='通信',
+                          project_name='基盤更改', project_summary='概要', responsibilities='担当')
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([Technology(project_id=project.id, type='language', name=name, duration_months=months)
+                            for name, months in technologies])
+        db.session.commit()
+        return project.id
+
+
+def search(query):
+    with app.app_context():
+        return [result['user_id'] for result in skill_index.search(query)]
+
+
+def test_local_changes_refresh_only_the_affected_user(create_user, monkeypatch):
+    alice = create_user('alice')
+    bob = create_user('bob')
+    add_project(alice, [('Java', 48)])
+    assert search('Java >= 36') == [alice]
+
+    builds = []
+    monkeypatch.setattr(skill_index, 'build', lambda: builds.append(True))
+    refreshed = []
+    refresh_users = skill_index.refresh_users
+    monkeypatch.setattr(skill_index, 'refresh_users', lambda user_ids: refreshed.append(set(user_ids)) or refresh_users(user_ids))
+
+    add_project(bob, [('Java', 40), ('Go', 12)])
+    assert search('Java >= 36') == [alice, bob]
+    assert search('go') == [bob]
+    assert builds == []
+    assert refreshed == [{bob}]
+
+    with app.app_context():
+        db.session.delete(Technology.query.filter_by(name='Go').one())
+        db.session.commit()
+    assert search('go') == []
+    assert builds == []
+
+
+def test_changes_from_other_workers_rebuild_the_index(create_user, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_REVISION_CHECK_INTERVAL', 0)
+    alice = create_user('alice')
+    project_id = add_project(alice, [('Java', 48)])
+    assert search('rust') == []
+
+    # 別のワーカーが技術を追加した場合（このプロセスのセッションのイベントを経由しない）
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(insert(Technology.__table__).values(
+                project_id=project_id, type='language', name='Rust', duration_months=6))
+            bump_cache_revision(connection, skill_index.name)
+
+    assert search('rust') == [alice]
@@ -0,0 +1,89 @@
+import os
+
+import reportlab
+from reportlab.pdfbase.ttfonts import TTFont
+
+from pdf import pdf_utils
+from run import app, db, Link
+from utils.link_utils import generate_link_code
+from utils.snapshot_utils import write_snapshot, SNAPSHOT_HTML_NAME
+from conftest import PASSWORD
+
+
+def create_snapshot_link(user_id):
+    digest = write_snapshot({SNAPSHOT_HTML_NAME: b'<html>snapshot</html>', 'sheet.pdf': b'%PDF-1.4 snapshot'})
+    with app.app_context():
+        link = Link(user_id=user_id, link_code='pending', snapshot_digest=digest)
+        db.session.add(link)
+        db.session.flush()
+        link.link_code = generate_link_code(link)
+        db.session.commit()
+        return link.id, link.link_code
+
+
+def test_snapshot_is_revalidated_on_every_request(client, create_user):
+    with app.app_context():
+        _, link_code = create_snapshot_link(create_user('owner'))
+
+    response = client.get(f'/view_sheet/{link_code}')
+    assert response.status_code == 200
+    assert response.get_data() == b'<html>snapshot</html>'
+    assert response.cache_control.private
+    assert response.cache_control.no_cache
+    assert not response.cache_control.public
+    assert not response.cache_control.immutable
+
+    revalidated = client.get(f'/view_sheet/{link_code}', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    pdf = client.get(f'/download_pdf/{link_code}')
+    assert pdf.get_data() == b'%PDF-1.4 snapshot'
+    assert pdf.cache_control.no_cache
+
+
+def test_revoked_snapshot_is_not_served(client, create_user):
+    with app.app_context():
+        link_id, link_code = create_snapshot_link(create_user('owner'))
+    first = client.get(f'/view_sheet/{link_code}')
+
+    with app.app_context():
+        db.session.get(Link, link_id).is_active = False
+        db.session.commit()
+
+    response = client.get(f'/view_sheet/{link_code}', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert b'snapshot' not in response.get_data()
+
+
+def test_relative_snapshot_dir_is_resolved_against_app_root(client, create_user, monkeypatch, tmp_path):
+    # カレントディレクトリ（一時ディレクトリ）とは別の場所をアプリケーションのディレクトリにする
+    monkeypatch.setattr(app, 'root_path', str(tmp_path))
+    monkeypatch.setitem(app.config, 'SNAPSHOT_DIR', 'snapshots')
+    with app.app_context():
+        _, link_code = create_snapshot_link(create_user('owner'))
+
+    assert list((tmp_path / 'snapshots').glob(f'*/*/{SNAPSHOT_HTML_NAME}'))
+    response = client.get(f'/view_sheet/{link_code}')
+    assert response.get_data() == b'<html>snapshot</html>'
+
+
+def test_snapshots_with_the_same_content_share_one_digest(client, create_user, monkeypatch):
+    # 日本語フォントはリポジトリに含まれないため、reportlab に同梱のフォントで代用する
+    vera = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+    monkeypatch.setattr(pdf_utils, 'TTFont', lambda name, path: TTFont(name, vera))
+    create_user('owner')
+    client.post('/login', data={'username': 'owner', 'password': PASSWORD})
+
+    link_codes = []
+    for _ in range(2):
+        response = client.post('/create_link', json={'snapshot': True})
+        assert response.status_code == 200
+        link_codes.append(response.get_json()['link'].rsplit('/', 1)[1])
+
+    with app.app_context():
+        digests = {link.snapshot_digest for link in Link.query.all()}
+    assert len(digests) == 1 and None not in digests
+
+    for link_code in link_codes:
+        html = client.get(f'/view_sheet/{link_code}').get_data(as_text=True)
+        assert f'/download_pdf/{link_code}' in html
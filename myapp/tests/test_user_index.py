@@ -0,0 +1,46 @@
+from sqlalchemy import insert, update
+
+from run import app, db, User
+from utils.cache_utils import bump_cache_revision
+from utils.user_index import user_prefix_index
+
+
+def suggest(client, prefix):
+    response = client.get(f'/admin/users/suggest?q={prefix}')
+    return [user['username'] for user in response.get_json()['users']]
+
+
+def test_local_changes_are_applied_without_rebuilding(admin_client, create_user):
+    assert suggest(admin_client, 'tar') == []
+    revision = user_prefix_index.revision
+
+    create_user('taro')
+    assert user_prefix_index.built
+    assert user_prefix_index.revision == revision + 1
+    assert suggest(admin_client, 'tar') == ['taro']
+
+
+def test_changes_from_other_workers_are_picked_up(admin_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_REVISION_CHECK_INTERVAL', 0)
+    assert suggest(admin_client, 'han') == []
+
+    # 別のワーカーがユーザーを追加した場合（このプロセスのセッションのイベントを経由しない）
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(insert(User.__table__).values(
+                username='hanako', email='hanako@example.com', password='x', is_active=True, is_admin=False))
+            bump_cache_revision(connection, user_prefix_index.name)
+
+    assert suggest(admin_client, 'han') == ['hanako']
+
+
+def test_bulk_statements_rebuild_the_index(admin_client, create_user):
+    create_user('jiro')
+    assert suggest(admin_client, 'jir') == ['jiro']
+
+    with app.app_context():
+        db.session.execute(update(User).where(User.username == 'jiro').values(username='saburo', email='saburo@example.com'))
+        db.session.commit()
+
+    assert suggest(admin_client, 'jir') == []
+    assert suggest(admin_client, 'sab') == ['saburo']
@@ -0,0 +1,167 @@
+from imports import *
+from run import *
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+
+####################################################################################################
+# 
+# クラス名：TokenBucketLimiter
+# 詳細：キー（IPアドレスやユーザー名）ごとのトークンバケットです。1秒あたり rate 個のトークンが補充され、最大 burst 個まで貯まります。
+#       キーは最大 max_keys 件までとし、超えた場合は最も長く使われていないキーから破棄します。
+# 
+####################################################################################################
+class TokenBucketLimiter:
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # {キー: (トークン数, 補充した時刻)}
+        self.lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, refilled_at = self.buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - refilled_at) * self.rate)
+
+    def allowed(self, key):
+        # トークンを消費せずに残りがあるかだけを確認
+        with self.lock:
+            return self._tokens(key, time.monotonic()) >= 1
+
+    def consume(self, key):
+        now = time.monotonic()
+        with self.lock:
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return allowed
+
+
+####################################################################################################
+# 
+# クラス名：AuthMetrics
+# 詳細：パスワードのハッシュ計算（生成・照合）にかかった時間と、流量制限で拒否したログイン・登録の件数を集計します。
+#       値はプロセスごとに保持します。
+# 
+####################################################################################################
+class AuthMetrics:
+    def __init__(self, sample_size=1000):
+        self.lock = threading.Lock()
+        self.hash_count = 0
+        self.hash_seconds = 0.0
+        self.hash_max = 0.0
+        self.hash_samples = deque(maxlen=sample_size)
+        self.rehash_count = 0
+        self.rejections = {}  # {(エンドポイント, 理由): 件数}
+
+    def record_hash(self, seconds):
+        with self.lock:
+            self.hash_count += 1
+            self.hash_seconds += seconds
+            self.hash_max = max(self.hash_max, seconds)
+            self.hash_samples.append(seconds)
+
+    def record_rehash(self):
+        with self.lock:
+            self.rehash_count += 1
+
+    def record_rejection(self, endpoint, reason):
+        with self.lock:
+            key = (endpoint, reason)
+            self.rejections[key] = self.rejections.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.hash_samples)
+            return {
+                'hash_count': self.hash_count,
+                'hash_avg_ms': self.hash_seconds / self.hash_count * 1000 if self.hash_count else 0.0,
+                'hash_p95_ms': samples[int(len(samples) * 0.95)] * 1000 if samples else 0.0,
+                'hash_max_ms': self.hash_max * 1000,
+                'rehash_count': self.rehash_count,
+                'rejections': [
+                    {'endpoint': endpoint, 'reason': reason, 'count': count}
+                    for (endpoint, reason), count in sorted(self.rejections.items())
+                ],
+                'rejected_total': sum(self.rejections.values()),
+            }
+
+
+auth_metrics = AuthMetrics()
+
+# 1つのIPアドレスからのログインの失敗と登録の試行
+login_ip_limiter = TokenBucketLimiter(app.config['LOGIN_IP_RATE'], app.config['LOGIN_IP_BURST'])
+# 1つのユーザー名に対するログインの失敗（失敗した場合のみ消費）
+login_username_limiter = TokenBucketLimiter(app.config['LOGIN_USERNAME_RATE'], app.config['LOGIN_USERNAME_BURST'])
+
+
+@lru_cache(maxsize=8)
+def password_hash_prefix(method):
+    # 'scrypt' や 'pbkdf2' のように省略したパラメータは Werkzeug の既定値で補われるため、
+    # 実際に生成したハッシュから '$' より前の部分（方式とパラメータ）を取り出す（方式ごとに1回だけ計算）
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+####################################################################################################
+# 
+# 関数名：hash_password / verify_password
+# 引数：password (str) - 平文のパスワード
+#       user (User) - 照合するユーザー
+# 返却値：hash_password はハッシュ化したパスワード、verify_password はパスワードが一致するかどうか
+# 詳細：PASSWORD_HASH_METHOD の方式でパスワードをハッシュ化・照合し、かかった時間を記録します。
+#       照合に成功したユーザーのハッシュが現在の方式と異なる場合（反復回数を変更した場合など）は、
+#       入力されたパスワードで再ハッシュします。再ハッシュした値のコミットは呼び出し元で行ってください。
+# 
+####################################################################################################
+def hash_password(password):
+    started = time.perf_counter()
+    hashed = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+    auth_metrics.record_hash(time.perf_counter() - started)
+    return hashed
+
+
+def verify_password(user, password):
+    started = time.perf_counter()
+    valid = user.check_password(password)
+    auth_metrics.record_hash(time.perf_counter() - started)
+    if valid and user.password.split('$', 1)[0] != password_hash_prefix(app.config['PASSWORD_HASH_METHOD']):
+        user.password = hash_password(password)
+        auth_metrics.record_rehash()
+    return valid
+
+
+####################################################################################################
+# 
+# 関数名：throttle_login / record_login_failure
+# 引数：username (str) - 入力されたユーザー名（登録の場合は None）
+# 返却値：throttle_login は拒否した場合にその理由（'ip' / 'username'）、許可した場合は None
+# 詳細：ハッシュ計算とDBへの問い合わせの前に、クライアントのIPアドレスごととユーザー名ごとの流量制限を確認します。
+#       ログインではどちらのトークンも失敗した場合のみ消費するため、正常なログインは制限されず、
+#       失敗が続いたIPアドレスとユーザー名だけが一時的に拒否されます。
+#       登録には失敗がないため、IPアドレスのトークンを試行のたびに消費します。
+#       リバースプロキシの後ろで動かす場合は PROXY_FIX_X_FOR を設定し、プロキシのアドレスではなく
+#       クライアントのアドレス（X-Forwarded-For）で制限してください。
+# 
+####################################################################################################
+def throttle_login(username=None):
+    address = request.remote_addr or ''
+    ip_allowed = login_ip_limiter.consume(address) if username is None else login_ip_limiter.allowed(address)
+    reason = None
+    if not ip_allowed:
+        reason = 'ip'
+    elif username is not None and not login_username_limiter.allowed(username.lower()):
+        reason = 'username'
+    if reason:
+        auth_metrics.record_rejection(request.endpoint, reason)
+        app.logger.info(f'Rejected login attempt by {reason} throttle: endpoint={request.endpoint}')
+    return reason
+
+
+def record_login_failure(username):
+    login_ip_limiter.consume(request.remote_addr or '')
+    login_username_limiter.consume(username.lower())
@@ -0,0 +1,82 @@
+from imports import *
+from run import *
+
+# 一括操作の対象
+BULK_USER_ACTIONS = ('deactivate', 'promote', 'delete')
+
+# IN句に渡すユーザーIDの件数（SQLiteのバインド変数の上限を超えないように分割）
+BULK_CHUNK_SIZE = 500
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _bulk_delete(model, condition):
+    result = db.session.execute(delete(model).where(condition).execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+####################################################################################################
+# 
+# 関数名：delete_users_cascade
+# 引数：user_ids (list) - 削除するユーザーIDのリスト
+# 返却値：テーブルごとの削除件数の辞書
+# 詳細：ユーザーと、ユーザーに紐づくリンク（閲覧数の集計を含む）、プロジェクト（技術・工程を含む）、個人開発（技術・工程を含む）を
+#       オブジェクトを読み込まずに DELETE 文で削除します。コミットは呼び出し元で行います。
+# 
+####################################################################################################
+def delete_users_cascade(user_ids):
+    counts = {'technologies': 0, 'processes': 0, 'projects': 0, 'individual_technologies': 0,
+              'individual_processes': 0, 'individual_developments': 0, 'links': 0, 'link_stats': 0, 'users': 0}
+    for chunk in _chunks(user_ids, BULK_CHUNK_SIZE):
+        project_ids = select(Project.id).where(Project.user_id.in_(chunk))
+        development_ids = select(IndividualDevelopment.id).where(IndividualDevelopment.user_id.in_(chunk))
+
+        counts['technologies'] += _bulk_delete(Technology, Technology.project_id.in_(project_ids))
+        counts['processes'] += _bulk_delete(Process, Process.project_id.in_(project_ids))
+        db.session.execute(user_project.delete().where(
+            user_project.c.user_id.in_(chunk) | user_project.c.project_id.in_(project_ids)
+        ))
+        counts['projects'] += _bulk_delete(Project, Project.user_id.in_(chunk))
+        counts['individual_technologies'] += _bulk_delete(IndividualTechnology, IndividualTechnology.individual_development_id.in_(development_ids))
+        counts['individual_processes'] += _bulk_delete(IndividualProcess, IndividualProcess.individual_development_id.in_(development_ids))
+        counts['individual_developments'] += _bulk_delete(IndividualDevelopment, IndividualDevelopment.user_id.in_(chunk))
+        counts['links'] += _bulk_delete(Link, Link.user_id.in_(chunk))
+        counts['link_stats'] += _bulk_delete(LinkStat, LinkStat.user_id.in_(chunk))
+        counts['users'] += _bulk_delete(User, User.id.in_(chunk))
+    return counts
+
+
+####################################################################################################
+# 
+# 関数名：apply_bulk_user_action
+# 引数：action (str) - 'deactivate'（無効化）、'promote'（管理者に昇格）、'delete'（削除）
+#       user_ids (list) - 対象のユーザーIDのリスト
+# 返却値：テーブルごとの更新・削除件数の辞書
+# 詳細：対象のユーザーに対して、UPDATE 文または DELETE 文をまとめて実行します。
+#       すべての文は1つのトランザクションで実行し、失敗した場合はロールバックします。
+# 
+####################################################################################################
+def apply_bulk_user_action(action, user_ids):
+    if action not in BULK_USER_ACTIONS:
+        raise ValueError(f'Unknown bulk action: {action}')
+
+    try:
+        if action == 'delete':
+            counts = delete_users_cascade(user_ids)
+        else:
+            values = {'is_active': False} if action == 'deactivate' else {'is_admin': True}
+            counts = {'users': 0}
+            for chunk in _chunks(user_ids, BULK_CHUNK_SIZE):
+                result = db.session.execute(
+                    update(User).where(User.id.in_(chunk)).values(updated_at=datetime.now(), **values)
+                    .execution_options(synchronize_session=False)
+                )
+                counts['users'] += result.rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
@@ -0,0 +1,135 @@
+from imports import *
+from run import *
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+####################################################################################################
+# 
+# 関数名：bump_cache_revision / read_cache_revision
+# 引数：connection - SQLAlchemyのコネクション（データを変更しているトランザクション）
+#       name (str) - キャッシュの名前
+# 返却値：bump_cache_revision は増やした後の世代番号、read_cache_revision は現在の世代番号
+# 詳細：キャッシュの世代番号を増やす・読み込みます。番号はデータの変更と同じトランザクションで増やすため、
+#       コミットされた変更と番号の更新は必ず同時に他のワーカーから見えるようになります。
+# 
+####################################################################################################
+def bump_cache_revision(connection, name):
+    table = CacheRevision.__table__
+    result = connection.execute(update(table).where(table.c.name == name).values(revision=table.c.revision + 1))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(name=name, revision=1))
+    return connection.execute(select(table.c.revision).where(table.c.name == name)).scalar()
+
+
+def read_cache_revision(name):
+    return db.session.execute(select(CacheRevision.revision).where(CacheRevision.name == name)).scalar() or 0
+
+
+####################################################################################################
+# 
+# クラス名：RevisionedCache
+# 詳細：件数の上限（LRU）と有効期限（TTL）を持つプロセス内キャッシュです。値が None のエントリは
+#       「存在しない」ことを表す否定キャッシュとして、より短い negative_ttl 秒だけ保持します。
+#       CACHE_REVISION_CHECK_INTERVAL 秒ごとに世代番号を確認し、他のワーカーでデータが変更されていれば全件を破棄します。
+# 
+####################################################################################################
+class RevisionedCache:
+    def __init__(self, name, max_size, ttl, negative_ttl=None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.entries = OrderedDict()  # {キー: (有効期限, 値)}
+        self.lock = threading.Lock()
+        self.revision = None
+        self.checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def check_revision(self):
+        now = time.monotonic()
+        if now - self.checked_at < app.config['CACHE_REVISION_CHECK_INTERVAL']:
+            return
+        revision = read_cache_revision(self.name)
+        with self.lock:
+            if revision != self.revision:
+                self.entries.clear()
+                self.revision = revision
+            self.checked_at = now
+
+    def get(self, key):
+        self.check_revision()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            # 次回の参照時に世代番号を読み直す
+            self.checked_at = 0.0
+
+    def committed(self, revision):
+        # このワーカーで変更をコミットした場合は全件を破棄する
+        self.clear()
+
+
+####################################################################################################
+# 
+# 関数名：track_cache_revision
+# 引数：cache - 対象のキャッシュ（RevisionedCache など、name と committed を持つオブジェクト）
+#       models (tuple) - 変更を監視するモデル
+# 返却値：なし
+# 詳細：監視するモデルを変更したトランザクションで世代番号を1回だけ増やし、コミット後にキャッシュの committed を
+#       増やした後の世代番号を引数として呼び出します（RevisionedCache はこのワーカーのキャッシュを破棄します）。
+#       オブジェクトの変更（flush）と一括の INSERT/UPDATE/DELETE 文の両方を対象とします。
+# 
+####################################################################################################
+def track_cache_revision(cache, models):
+    flag = f'cache_revision_{cache.name}'
+
+    def mark_changed(session):
+        if flag not in session.info:
+            session.info[flag] = bump_cache_revision(session.connection(), cache.name)
+
+    @event.listens_for(Session, 'after_flush')
+    def _track_flush(session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, models):
+                mark_changed(session)
+                return
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def _track_statement(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            mapper = orm_execute_state.bind_mapper
+            if mapper is not None and mapper.class_ in models:
+                mark_changed(orm_execute_state.session)
+
+    @event.listens_for(Session, 'after_commit')
+    def _clear_cache(session):
+        revision = session.info.pop(flag, None)
+        if revision is not None:
+            cache.committed(revision)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_changes(session):
+        session.info.pop(flag, None)
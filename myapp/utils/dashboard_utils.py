@@ -0,0 +1,118 @@
+from imports import *
+from run import *
+import json
+import threading
+from utils.link_utils import link_not_expired
+
+_refresh_lock = threading.Lock()
+
+####################################################################################################
+# 
+# 関数名：compute_dashboard_rollups
+# 引数：なし
+# 返却値：{集計キー: 集計値} の辞書
+# 詳細：ダッシュボードに表示する運用統計を集計SQLで計算します。全件走査を伴うため、
+#       リクエスト処理中ではなく refresh_dashboard_rollups から呼び出してください。
+# 
+####################################################################################################
+def compute_dashboard_rollups():
+    since = (datetime.now() - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    signup_day = func.date(User.created_at)
+    signups_per_day = db.session.execute(
+        select(signup_day, func.count(User.id))
+        .where(User.created_at >= since)
+        .group_by(signup_day)
+        .order_by(signup_day)
+    ).all()
+
+    projects_per_industry = db.session.execute(
+        select(Project.industry, func.count(Project.id).label('count'))
+        .group_by(Project.industry)
+        .order_by(desc('count'))
+        .limit(10)
+    ).all()
+
+    # 案件と個人開発の技術を合算して使用期間の長い順に並べる
+    all_technologies = db.union_all(
+        select(Technology.name.label('name'), Technology.duration_months.label('duration_months')),
+        select(IndividualTechnology.name.label('name'), IndividualTechnology.duration_months.label('duration_months'))
+    ).subquery()
+    total_months = func.coalesce(func.sum(all_technologies.c.duration_months), 0).label('total_months')
+    top_technologies = db.session.execute(
+        select(all_technologies.c.name, total_months)
+        .group_by(all_technologies.c.name)
+        .order_by(desc('total_months'))
+        .limit(10)
+    ).all()
+
+    return {
+        'total_users': db.session.scalar(select(func.count(User.id))),
+        'active_users': db.session.scalar(select(func.count(User.id)).where(User.is_active == True)),
+        'signups_per_day': [{'date': day, 'count': count} for day, count in signups_per_day],
+        'projects_per_industry': [{'industry': industry, 'count': count} for industry, count in projects_per_industry],
+        'top_technologies': [{'name': name, 'total_months': months} for name, months in top_technologies],
+        'active_links': db.session.scalar(select(func.count(Link.id)).where(Link.is_active == True, link_not_expired())),
+        'contacts_awaiting_reply': db.session.scalar(select(func.count(Contact.id)).where(Contact.replied_at.is_(None))),
+    }
+
+####################################################################################################
+# 
+# 関数名：refresh_dashboard_rollups
+# 引数：なし
+# 返却値：なし
+# 詳細：運用統計を再集計し、集計テーブルに保存します。同時に複数の再集計は実行しません。
+# 
+####################################################################################################
+def refresh_dashboard_rollups():
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        rollups = compute_dashboard_rollups()
+        now = datetime.now()
+        for key, value in rollups.items():
+            db.session.merge(DashboardRollup(key=key, value=json.dumps(value, ensure_ascii=False), refreshed_at=now))
+        db.session.commit()
+        app.logger.info('Dashboard rollups refreshed')
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error refreshing dashboard rollups - {str(e)}')
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_in_background():
+    with app.app_context():
+        refresh_dashboard_rollups()
+
+####################################################################################################
+# 
+# 関数名：get_dashboard_rollups
+# 引数：なし
+# 返却値：(集計値の辞書, 最終集計日時)。未集計の場合は ({}, None)
+# 詳細：集計テーブルから運用統計を読み込みます。DASHBOARD_ROLLUP_TTL 秒より古い場合や未集計の場合は
+#       バックグラウンドで再集計を開始し、今回は保存済みの値をそのまま返却します。
+# 
+####################################################################################################
+def get_dashboard_rollups():
+    rows = DashboardRollup.query.all()
+    rollups = {row.key: json.loads(row.value) for row in rows}
+    refreshed_at = min((row.refreshed_at for row in rows), default=None)
+
+    if refreshed_at is None or datetime.now() - refreshed_at > timedelta(seconds=app.config['DASHBOARD_ROLLUP_TTL']):
+        if not _refresh_lock.locked():
+            threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+    return rollups, refreshed_at
+
+####################################################################################################
+# 
+# 関数名：refresh_dashboard_command
+# 詳細：ダッシュボードの運用統計を再集計するCLIコマンドです（flask refresh-dashboard）。
+#       cronなどで定期的に実行すると、ダッシュボードの表示時に再集計が走らなくなります。
+# 
+####################################################################################################
+@app.cli.command('refresh-dashboard')
+def refresh_dashboard_command():
+    refresh_dashboard_rollups()
+    print('Dashboard rollups refreshed.')
@@ -0,0 +1,99 @@
+from imports import *
+from run import *
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+
+# エクスポート時に1回のフェッチで取得する行数
+EXPORT_BATCH_SIZE = 1000
+
+####################################################################################################
+# 
+# 関数名：_csv_lines / _jsonl_lines
+# 引数：columns (list) - 出力する列名のリスト
+#       rows (iterable) - 出力する行（辞書）のイテレータ
+# 返却値：出力する文字列を順に返すジェネレータ
+# 詳細：行を1件ずつ文字列に変換し、一定件数ごとにまとめて返却します。全件をメモリに保持しません。
+#       CSVのヘッダーは行を取得する前に単独で返却します。
+# 
+####################################################################################################
+def _csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    # Excelで文字化けしないようにBOMを付ける
+    buffer.write('\ufeff')
+    writer.writeheader()
+    # ヘッダーは最初の行の取得を待たずに送信し、ダウンロードをすぐに開始させる
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _jsonl_lines(columns, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False, default=str))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+####################################################################################################
+# 
+# 関数名：iter_keyset_batches
+# 引数：query - 絞り込み済みのクエリ
+#       key_column - 並び順に使うインデックス付きの一意な列（主キーなど）
+#       batch_size (int) - 1回に取得する行数（省略時は EXPORT_BATCH_SIZE）
+# 返却値：行のリストを順に返すジェネレータ
+# 詳細：前のバッチの最後のキーより後ろの行を batch_size 件ずつ取得します。
+#       バッチごとにクエリが完結するため、関連の一括読み込み（selectinload や IN 句）をバッチ単位で行えます。
+# 
+####################################################################################################
+def iter_keyset_batches(query, key_column, batch_size=None):
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    query = query.order_by(None).order_by(key_column)
+    last_key = None
+    while True:
+        batch_query = query if last_key is None else query.filter(key_column > last_key)
+        rows = batch_query.limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last_key = getattr(rows[-1], key_column.key)
+
+####################################################################################################
+# 
+# 関数名：export_response
+# 引数：filename (str) - ダウンロードするファイル名（拡張子なし）
+#       columns (list) - 出力する列名のリスト
+#       rows (iterable) - 出力する行（辞書）のイテレータ
+#       export_format (str) - 'csv' または 'jsonl'
+# 返却値：ストリーミングのレスポンス
+# 詳細：行を生成しながらクライアントに送信します。送信開始までに全件の取得を待つ必要がなく、
+#       件数に関係なくメモリ使用量は一定です。
+# 
+####################################################################################################
+def export_response(filename, columns, rows, export_format):
+    if export_format == 'jsonl':
+        lines = _jsonl_lines(columns, rows)
+        mimetype = 'application/x-ndjson'
+        extension = 'jsonl'
+    else:
+        lines = _csv_lines(columns, rows)
+        mimetype = 'text/csv'
+        extension = 'csv'
+
+    response = Response(stream_with_context(lines), content_type=f'{mimetype}; charset=utf-8')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{extension}'
+    return response
@@ -0,0 +1,144 @@
+from imports import *
+from run import *
+import threading
+import time
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# 集計する項目（LinkStat の列名）
+LINK_STAT_KINDS = ('views', 'pdf_downloads')
+
+
+####################################################################################################
+# 
+# クラス名：LinkStatsBuffer
+# 詳細：共有リンクの閲覧とPDFのダウンロードを (リンクID, ユーザーID, 時間帯) ごとにメモリ上で数え、
+#       LINK_STATS_FLUSH_INTERVAL 秒ごとと終了時に、まとめて link_stats テーブルに加算します。
+#       リクエスト処理中はカウンタを増やすだけで、DBへの書き込みは行いません。
+# 
+####################################################################################################
+class LinkStatsBuffer:
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.counts = {}  # {(リンクID, ユーザーID, 時間帯): {'views': 件数, 'pdf_downloads': 件数}}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+
+    def record(self, link, kind):
+        key = (link.link_id, link.user_id, datetime.now().replace(minute=0, second=0, microsecond=0))
+        with self.lock:
+            counts = self.counts.setdefault(key, dict.fromkeys(LINK_STAT_KINDS, 0))
+            counts[kind] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='link-stats-flusher', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                counts, self.counts = self.counts, {}
+            if not counts:
+                return
+            rows = [
+                {'link_id': link_id, 'user_id': user_id, 'hour': hour, **values}
+                for (link_id, user_id, hour), values in counts.items()
+            ]
+            statement = sqlite_insert(LinkStat.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['link_id', 'hour'],
+                set_={kind: getattr(LinkStat.__table__.c, kind) + getattr(statement.excluded, kind) for kind in LINK_STAT_KINDS},
+            )
+            try:
+                with app.app_context():
+                    with db.engine.begin() as connection:
+                        connection.execute(statement, rows)
+            except Exception as e:
+                # 書き込めなかった件数は次回に持ち越す
+                self.restore(counts)
+                app.logger.error(f'Error flushing link stats - {str(e)}')
+
+    def restore(self, counts):
+        with self.lock:
+            for key, values in counts.items():
+                current = self.counts.setdefault(key, dict.fromkeys(LINK_STAT_KINDS, 0))
+                for kind in LINK_STAT_KINDS:
+                    current[kind] += values[kind]
+
+    def pending_for_user(self, user_id):
+        with self.lock:
+            return {key: dict(values) for key, values in self.counts.items() if key[1] == user_id}
+
+
+link_stats_buffer = LinkStatsBuffer(app.config['LINK_STATS_FLUSH_INTERVAL'])
+atexit.register(link_stats_buffer.flush)
+
+
+####################################################################################################
+# 
+# 関数名：get_link_stats
+# 引数：user_id (int) - ユーザーID
+#       days (int) - 日ごとの集計を表示する日数
+# 返却値：{'links': リンクごとの集計のリスト, 'daily': 日ごとの集計のリスト, 'total': 全体の集計}
+# 詳細：ユーザーの共有リンクの閲覧数とPDFのダウンロード数を集計します。まだDBに書き込んでいない件数も含みます。
+# 
+####################################################################################################
+def get_link_stats(user_id, days=14):
+    links = {}
+    rows = db.session.execute(
+        select(
+            LinkStat.link_id,
+            func.sum(LinkStat.views),
+            func.sum(LinkStat.pdf_downloads),
+            func.max(db.case((LinkStat.views > 0, LinkStat.hour))),
+        ).where(LinkStat.user_id == user_id).group_by(LinkStat.link_id)
+    ).all()
+    for link_id, views, pdf_downloads, last_viewed in rows:
+        links[link_id] = {'link_id': link_id, 'views': views or 0, 'pdf_downloads': pdf_downloads or 0, 'last_viewed': last_viewed}
+
+    since = (datetime.now() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    daily = {}
+    day = func.date(LinkStat.hour)
+    for date, views, pdf_downloads in db.session.execute(
+        select(day, func.sum(LinkStat.views), func.sum(LinkStat.pdf_downloads))
+        .where(LinkStat.user_id == user_id, LinkStat.hour >= since).group_by(day)
+    ):
+        daily[date] = {'date': date, 'views': views or 0, 'pdf_downloads': pdf_downloads or 0}
+
+    # まだ書き込んでいない件数を加算
+    for (link_id, _, hour), values in link_stats_buffer.pending_for_user(user_id).items():
+        entry = links.setdefault(link_id, {'link_id': link_id, 'views': 0, 'pdf_downloads': 0, 'last_viewed': None})
+        entry['views'] += values['views']
+        entry['pdf_downloads'] += values['pdf_downloads']
+        if values['views'] and (entry['last_viewed'] is None or hour > entry['last_viewed']):
+            entry['last_viewed'] = hour
+        if hour >= since:
+            date = hour.strftime('%Y-%m-%d')
+            day_entry = daily.setdefault(date, {'date': date, 'views': 0, 'pdf_downloads': 0})
+            day_entry['views'] += values['views']
+            day_entry['pdf_downloads'] += values['pdf_downloads']
+
+    # リンクの作成日時・有効期限と状態を付加（削除済みのリンクは None）
+    link_rows = {
+        link.id: link for link in Link.query.filter(Link.id.in_(list(links))).all()
+    } if links else {}
+    now = datetime.now()
+    for link_id, entry in links.items():
+        link = link_rows.get(link_id)
+        entry['created_at'] = link.created_at if link else None
+        entry['expires_at'] = link.expires_at if link else None
+        entry['is_active'] = link.is_active if link else None
+        entry['is_expired'] = entry['expires_at'] is not None and entry['expires_at'] <= now
+
+    return {
+        'links': sorted(links.values(), key=lambda entry: entry['link_id'], reverse=True),
+        'daily': sorted(daily.values(), key=lambda entry: entry['date'], reverse=True),
+        'total': {
+            'views': sum(entry['views'] for entry in links.values()),
+            'pdf_downloads': sum(entry['pdf_downloads'] for entry in links.values()),
+        },
+    }
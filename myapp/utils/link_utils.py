@@ -0,0 +1,229 @@
+from imports import *
+from run import *
+import threading
+import time
+from collections import namedtuple
+from itsdangerous import BadSignature
+from sqlalchemy import or_
+from utils.cache_utils import RevisionedCache, track_cache_revision
+from utils.snapshot_utils import remove_orphaned_snapshots
+
+
+def link_not_expired(now=None):
+    # 有効期限が未設定か、期限前のリンクを表す条件
+    return or_(Link.expires_at.is_(None), Link.expires_at > (now or datetime.now()))
+
+####################################################################################################
+# 
+# 関数名：latest_active_link_subquery
+# 引数：user_ids (list) - 対象のユーザーIDのリスト（省略時は全ユーザー）
+# 返却値：user_id と link_code を列に持つサブクエリ
+# 詳細：ユーザーごとの最新の有効なリンクを、ウィンドウ関数で1回のクエリとして求めるサブクエリを作成します。
+#       ユーザーの一覧に外部結合することで、ユーザーごとにリンクを問い合わせる必要がなくなります。
+# 
+####################################################################################################
+def latest_active_link_subquery(user_ids=None):
+    ranked = select(
+        Link.user_id,
+        Link.link_code,
+        func.row_number().over(
+            partition_by=Link.user_id,
+            order_by=(Link.created_at.desc(), Link.id.desc())
+        ).label('link_rank')
+    ).where(Link.is_active == True, link_not_expired())
+
+    if user_ids is not None:
+        ranked = ranked.where(Link.user_id.in_(user_ids))
+
+    ranked = ranked.subquery()
+    return select(ranked.c.user_id, ranked.c.link_code).where(ranked.c.link_rank == 1).subquery('latest_active_link')
+
+####################################################################################################
+# 
+# 関数名：get_latest_active_link_codes
+# 引数：user_ids (list) - 対象のユーザーIDのリスト
+# 返却値：{ユーザーID: リンクコード} の辞書
+# 詳細：複数ユーザーの最新の有効なリンクコードを1回のクエリでまとめて取得します。
+# 
+####################################################################################################
+def get_latest_active_link_codes(user_ids):
+    if not user_ids:
+        return {}
+    latest = latest_active_link_subquery(user_ids)
+    return dict(db.session.execute(select(latest.c.user_id, latest.c.link_code)).all())
+
+####################################################################################################
+# 
+# 関数名：get_latest_active_link_url
+# 引数：user_id (int) - ユーザーID
+# 返却値：最新の有効なスキルシートのURL。有効なリンクがない場合は None
+# 詳細：ユーザーの最新の有効なリンクコードを取得し、閲覧用のフルURLに変換します。
+# 
+####################################################################################################
+def get_latest_active_link_url(user_id):
+    link_code = get_latest_active_link_codes([user_id]).get(user_id)
+    return url_for('view_sheet', link_code=link_code, _external=True) if link_code else None
+
+
+# リンクコードから引いたリンクの情報
+LinkTarget = namedtuple('LinkTarget', ['link_id', 'user_id', 'is_active', 'expires_at', 'snapshot_digest'])
+
+# リンクコード → LinkTarget（存在しないリンクコードは None）のキャッシュ
+link_code_cache = RevisionedCache(
+    'link',
+    max_size=app.config['LINK_CACHE_SIZE'],
+    ttl=app.config['LINK_CACHE_TTL'],
+    negative_ttl=app.config['LINK_CACHE_NEGATIVE_TTL'],
+)
+track_cache_revision(link_code_cache, (Link,))
+
+# 移行前に発行したUUID形式のリンクコード
+LEGACY_LINK_CODE_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+LINK_CODE_SALT = 'link-code-salt'
+
+####################################################################################################
+# 
+# 関数名：generate_link_code
+# 引数：link (Link) - IDが採番済みのリンク
+# 返却値：リンクコード（str）
+# 詳細：ユーザーIDとリンクIDを埋め込み、パスワードリセットと同じシリアライザで署名したリンクコードを作成します。
+# 
+####################################################################################################
+def generate_link_code(link):
+    return serializer.dumps([link.user_id, link.id], salt=LINK_CODE_SALT)
+
+####################################################################################################
+# 
+# 関数名：verify_link_code
+# 引数：link_code (str) - リンクコード
+# 返却値：署名付きのリンクコードの場合は (ユーザーID, リンクID)、移行前のUUID形式の場合は None
+#         署名が正しくない場合は False
+# 詳細：DBに問い合わせずにリンクコードの形式と署名を検証します。
+# 
+####################################################################################################
+def verify_link_code(link_code):
+    if LEGACY_LINK_CODE_PATTERN.match(link_code):
+        return None if app.config['LEGACY_LINK_CODES_ENABLED'] else False
+    try:
+        user_id, link_id = serializer.loads(link_code, salt=LINK_CODE_SALT)
+    except (BadSignature, TypeError, ValueError):
+        return False
+    return user_id, link_id
+
+####################################################################################################
+# 
+# 関数名：resolve_link_code
+# 引数：link_code (str) - リンクコード
+# 返却値：有効なリンクの場合は LinkTarget、存在しないか無効化された、または期限切れのリンクの場合は None
+# 詳細：署名が正しくないリンクコードはDBにもキャッシュにも触れずに拒否します。
+#       署名が正しいリンクコードと移行前のUUID形式のリンクコードは、キャッシュにない場合のみDBに問い合わせ、
+#       無効化（Linkテーブルの is_active）と有効期限を確認します。存在しないリンクコードも一定時間キャッシュします。
+#       有効期限はキャッシュした値に対しても毎回確認するため、キャッシュの有効期間中に期限切れになったリンクも拒否します。
+# 
+####################################################################################################
+def resolve_link_code(link_code):
+    claims = verify_link_code(link_code)
+    if claims is False:
+        return None
+
+    hit, target = link_code_cache.get(link_code)
+    if not hit:
+        row = db.session.execute(
+            select(Link.id, Link.user_id, Link.is_active, Link.expires_at, Link.snapshot_digest).where(Link.link_code == link_code)
+        ).first()
+        target = LinkTarget(*row) if row else None
+        link_code_cache.set(link_code, target)
+    if target is None or not target.is_active:
+        return None
+    if target.expires_at is not None and target.expires_at <= datetime.now():
+        return None
+    # 署名に埋め込んだユーザーIDとリンクIDがDBの内容と一致することを確認
+    if claims is not None and tuple(claims) != (target.user_id, target.link_id):
+        return None
+    return target
+
+####################################################################################################
+# 
+# 関数名：sweep_links
+# 引数：batch_size (int) - 1回の DELETE 文で削除する件数
+#       max_batches (int) - 実行する DELETE 文の最大数
+# 返却値：削除したリンクの件数
+# 詳細：期限切れのリンクと無効化済みのリンクを、batch_size 件ずつ別々のトランザクションで削除します。
+#       1回のトランザクションを短く保つことで、削除中も閲覧やリンク作成の書き込みを長時間待たせません。
+#       削除しきれなかったリンクは次回の実行で削除します。閲覧数（link_stats）は削除したリンクの分も残ります。
+# 
+####################################################################################################
+def sweep_links(batch_size=None, max_batches=None):
+    batch_size = batch_size or app.config['LINK_SWEEP_BATCH_SIZE']
+    max_batches = max_batches or app.config['LINK_SWEEP_MAX_BATCHES']
+    now = datetime.now()
+    deleted = 0
+    for _ in range(max_batches):
+        link_ids = db.session.scalars(
+            select(Link.id)
+            .where(or_(Link.is_active == False, Link.expires_at <= now))
+            .limit(batch_size)
+        ).all()
+        if not link_ids:
+            break
+        db.session.execute(delete(Link).where(Link.id.in_(link_ids)), execution_options={'synchronize_session': False})
+        db.session.commit()
+        deleted += len(link_ids)
+        if len(link_ids) < batch_size:
+            break
+    return deleted
+
+
+####################################################################################################
+# 
+# クラス名：LinkSweeper
+# 詳細：LINK_SWEEP_INTERVAL 秒ごとにバックグラウンドのスレッドで sweep_links を実行し、
+#       どのリンクからも参照されなくなったスナップショットを削除します。
+#       スレッドは最初のリクエストの処理時に開始するため、flask db upgrade などのコマンドでは動作しません。
+# 
+####################################################################################################
+class LinkSweeper:
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='link-sweeper', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with app.app_context():
+                    deleted = sweep_links()
+                    removed = remove_orphaned_snapshots()
+                if deleted or removed:
+                    app.logger.info(f'Swept {deleted} expired or inactive links and {removed} snapshots')
+            except Exception as e:
+                app.logger.error(f'Error sweeping links - {str(e)}')
+
+
+link_sweeper = LinkSweeper(app.config['LINK_SWEEP_INTERVAL'])
+
+
+@app.before_request
+def start_link_sweeper():
+    if link_sweeper.thread is None:
+        link_sweeper.start()
+
+####################################################################################################
+# 
+# 関数名：sweep_links_command
+# 詳細：期限切れ・無効化済みのリンクと、参照されていないスナップショットを削除するCLIコマンドです（flask sweep-links）。
+#       溜まったリンクを一度に削除する場合は、残りがなくなるまで繰り返し実行します。
+# 
+####################################################################################################
+@app.cli.command('sweep-links')
+def sweep_links_command():
+    deleted = sweep_links()
+    removed = remove_orphaned_snapshots()
+    print(f'{deleted} links and {removed} snapshots deleted.')
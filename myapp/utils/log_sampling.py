@@ -0,0 +1,117 @@
+from imports import *
+from run import *
+import threading
+import time
+from flask import g, has_request_context
+
+
+####################################################################################################
+# 
+# クラス名：LogSamplingRule
+# 詳細：ロガー名とメッセージの正規表現に一致するログに対して、間引き（sample_rate の割合だけ残す）と
+#       トークンバケットによる流量制限（1秒あたり rate 件、最大 burst 件まで連続で許可）を行います。
+#       リクエスト処理中の間引きはリクエスト単位で判定し、1つのリクエストのログはまとめて残すか捨てるかのどちらかになります。
+# 
+####################################################################################################
+class LogSamplingRule:
+    def __init__(self, message=None, logger=None, sample_rate=None, rate=None, burst=None):
+        self.pattern = message
+        self.message = re.compile(message) if message else None
+        self.logger = logger
+        self.sample_every = max(1, round(1 / sample_rate)) if sample_rate else 1
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.seen = 0
+        self.suppressed = 0
+
+    def matches(self, record):
+        if self.logger and record.name != self.logger:
+            return False
+        return self.message is None or bool(self.message.search(record.getMessage()))
+
+    def sample(self):
+        self.seen += 1
+        return (self.seen - 1) % self.sample_every == 0
+
+    def take_token(self):
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def describe(self):
+        return ' '.join(part for part in (self.logger, f'"{self.pattern}"' if self.pattern else None) if part)
+
+
+####################################################################################################
+# 
+# クラス名：LogSamplingFilter
+# 詳細：LOG_SAMPLING_RULES に一致する INFO 以下のログを間引き・流量制限します。WARNING 以上のログは常に出力します。
+#       捨てたログの件数はルールごとに数え、LOG_SAMPLING_SUMMARY_INTERVAL 秒ごとと終了時に
+#       「Suppressed N similar messages」の1行にまとめて出力します。
+# 
+####################################################################################################
+class LogSamplingFilter(logging.Filter):
+    def __init__(self, rules, summary_interval):
+        super().__init__()
+        self.rules = [LogSamplingRule(**rule) for rule in rules]
+        self.summary_interval = summary_interval
+        self.next_summary = time.monotonic() + summary_interval
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if getattr(record, 'log_summary', False):
+            return True
+        if time.monotonic() >= self.next_summary:
+            self.flush_summaries()
+        if record.levelno >= logging.WARNING:
+            return True
+
+        for index, rule in enumerate(self.rules):
+            if not rule.matches(record):
+                continue
+            with self.lock:
+                allowed = self.sampled(index, rule) and rule.take_token()
+                if not allowed:
+                    rule.suppressed += 1
+            return allowed
+        return True
+
+    def sampled(self, index, rule):
+        if rule.sample_every == 1:
+            return True
+        if not has_request_context():
+            return rule.sample()
+        # 同じリクエストのログは最初の判定に従う
+        decisions = g.setdefault('log_sampling_decisions', {})
+        if index not in decisions:
+            decisions[index] = rule.sample()
+        return decisions[index]
+
+    def flush_summaries(self):
+        with self.lock:
+            self.next_summary = time.monotonic() + self.summary_interval
+            summaries = []
+            for rule in self.rules:
+                if rule.suppressed:
+                    summaries.append((rule, rule.suppressed))
+                    rule.suppressed = 0
+        for rule, count in summaries:
+            logging.getLogger(rule.logger or app.logger.name).info(
+                f'Suppressed {count:,} similar messages ({rule.describe()})',
+                extra={'log_summary': True},
+            )
+
+
+# アプリケーションのログとアクセスログに間引き・流量制限を適用
+log_sampling_filter = LogSamplingFilter(app.config['LOG_SAMPLING_RULES'], app.config['LOG_SAMPLING_SUMMARY_INTERVAL'])
+app.logger.addFilter(log_sampling_filter)
+access_logger.addFilter(log_sampling_filter)
+atexit.register(log_sampling_filter.flush_summaries)
@@ -0,0 +1,283 @@
+from imports import *
+from run import *
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from flask import g, has_request_context
+
+# ログの重要度（画面の絞り込みで使用）
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# ログストアのテーブルとインデックス
+LOG_STORE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS log_record (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        level TEXT NOT NULL,
+        level_no INTEGER NOT NULL,
+        logger TEXT NOT NULL,
+        message TEXT NOT NULL,
+        endpoint TEXT,
+        user_id INTEGER,
+        request_id TEXT,
+        duration_ms REAL
+    )''',
+    'CREATE INDEX IF NOT EXISTS ix_log_record_created_at ON log_record (created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_log_record_level_no_created_at ON log_record (level_no, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_log_record_user_id_created_at ON log_record (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_log_record_endpoint_created_at ON log_record (endpoint, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_log_record_request_id ON log_record (request_id)',
+]
+
+LOG_RECORD_COLUMNS = ['created_at', 'level', 'level_no', 'logger', 'message', 'endpoint', 'user_id', 'request_id', 'duration_ms']
+
+# 保存期間を過ぎたログを削除する間隔（秒）と、1回の DELETE 文で削除する件数
+LOG_STORE_PURGE_INTERVAL = 3600
+LOG_STORE_PURGE_BATCH = 5000
+
+
+def connect_log_store(path):
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+####################################################################################################
+# 
+# クラス名：LogStoreWriter
+# 詳細：構造化ログをキューから取り出し、バックグラウンドのスレッドでログストア（SQLite）にまとめて書き込みます。
+#       LOG_STORE_BATCH_SIZE 件たまるか LOG_STORE_FLUSH_INTERVAL 秒経過するごとに1回のトランザクションで挿入し、
+#       保存期間を過ぎたログは定期的に少しずつ削除します。キューがあふれた場合はログを破棄して件数を数えます。
+# 
+####################################################################################################
+class LogStoreWriter:
+    def __init__(self, path, batch_size, flush_interval, retention_days, max_queue_size=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping.clear()
+                self.thread = threading.Thread(target=self.run, name='log-store-writer', daemon=True)
+                self.thread.start()
+
+    def put(self, row):
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        connection = connect_log_store(self.path)
+        try:
+            for statement in LOG_STORE_SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+            last_purge = 0.0
+            while not (self.stopping.is_set() and self.queue.empty()):
+                batch = self.take_batch()
+                if batch:
+                    self.write(connection, batch)
+                if time.monotonic() - last_purge >= LOG_STORE_PURGE_INTERVAL:
+                    self.purge(connection)
+                    last_purge = time.monotonic()
+        finally:
+            connection.close()
+
+    def take_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or self.stopping.is_set() and self.queue.empty():
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(timeout, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def write(self, connection, batch):
+        placeholders = ', '.join('?' for _ in LOG_RECORD_COLUMNS)
+        try:
+            with connection:
+                connection.executemany(f'INSERT INTO log_record ({", ".join(LOG_RECORD_COLUMNS)}) VALUES ({placeholders})', batch)
+        except sqlite3.Error:
+            # ログの書き込みに失敗してもアプリケーションは止めない
+            self.dropped += len(batch)
+
+    def purge(self, connection):
+        threshold = time.time() - self.retention_days * 86400
+        try:
+            while True:
+                with connection:
+                    deleted = connection.execute(
+                        'DELETE FROM log_record WHERE id IN (SELECT id FROM log_record WHERE created_at < ? LIMIT ?)',
+                        (threshold, LOG_STORE_PURGE_BATCH),
+                    ).rowcount
+                if deleted < LOG_STORE_PURGE_BATCH:
+                    break
+        except sqlite3.Error:
+            pass
+
+    def stop(self, timeout=5.0):
+        # キューに残ったログを書き込んでからスレッドを終了
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+####################################################################################################
+# 
+# クラス名：StructuredLogHandler
+# 詳細：ログを (日時, 重要度, ロガー名, メッセージ, エンドポイント, ユーザーID, リクエストID, 処理時間) の
+#       構造化レコードに変換し、LogStoreWriter のキューに追加します。リクエスト処理中のスレッドはキューに追加するだけです。
+# 
+####################################################################################################
+class StructuredLogHandler(logging.Handler):
+    def __init__(self, writer, level=logging.INFO):
+        super().__init__(level)
+        self.writer = writer
+        self.exception_formatter = logging.Formatter()
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message = f'{message}\n{self.exception_formatter.formatException(record.exc_info)}'
+            endpoint = getattr(record, 'endpoint', None)
+            user_id = getattr(record, 'user_id', None)
+            request_id = getattr(record, 'request_id', None)
+            if has_request_context():
+                endpoint = endpoint or request.endpoint
+                request_id = request_id or g.get('request_id')
+                # current_user を参照するとユーザーの読み込みが発生するため、読み込み済みの場合のみ使用
+                login_user = g.get('_login_user')
+                if user_id is None and login_user is not None and login_user.is_authenticated:
+                    user_id = login_user.id
+            self.writer.put((
+                record.created, record.levelname, record.levelno, record.name, message,
+                endpoint, user_id, request_id, getattr(record, 'duration_ms', None),
+            ))
+        except Exception:
+            self.handleError(record)
+
+
+# 構造化ログの書き込み
+log_store_writer = LogStoreWriter(
+    app.config['LOG_STORE_PATH'],
+    batch_size=app.config['LOG_STORE_BATCH_SIZE'],
+    flush_interval=app.config['LOG_STORE_FLUSH_INTERVAL'],
+    retention_days=app.config['LOG_STORE_RETENTION_DAYS'],
+)
+structured_log_handler = StructuredLogHandler(log_store_writer)
+app.logger.addHandler(structured_log_handler)
+atexit.register(log_store_writer.stop)
+
+# リクエストごとのアクセスログ（構造化ログにのみ記録）
+access_logger = logging.getLogger('skill_canvas.access')
+access_logger.addHandler(structured_log_handler)
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
+
+####################################################################################################
+# 
+# 関数名：start_request_log / finish_request_log
+# 詳細：リクエストごとにリクエストIDを採番して X-Request-ID ヘッダーで返却し、
+#       処理時間とステータスコードをアクセスログとして構造化ログに記録します。
+# 
+####################################################################################################
+@app.before_request
+def start_request_log():
+    g.request_id = uuid.uuid4().hex[:16]
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def finish_request_log(response):
+    started = g.get('request_started')
+    if started is not None:
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        access_logger.info(f'{request.method} {request.path} {response.status_code}', extra={'duration_ms': duration_ms})
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+
+####################################################################################################
+# 
+# 関数名：query_log_records
+# 引数：level (str) - 表示する最低の重要度（'INFO' の場合は INFO 以上）
+#       user_id (int) - ユーザーID
+#       endpoint (str) - エンドポイント名
+#       since / until (datetime) - 期間
+#       request_id (str) - リクエストID
+#       before_id (int) - 前のページの最後のログのID（最初のページは省略）
+#       per_page (int) - 1ページあたりの件数
+# 返却値：(新しい順のログのリスト, 次のページのカーソル)
+# 詳細：ログストアから条件に一致するログをIDの降順で取得します。
+# 
+####################################################################################################
+def query_log_records(level=None, user_id=None, endpoint=None, since=None, until=None, request_id=None, before_id=None, per_page=100):
+    conditions = []
+    parameters = []
+    if level in LOG_LEVELS:
+        conditions.append('level_no >= ?')
+        parameters.append(getattr(logging, level))
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        parameters.append(user_id)
+    if endpoint:
+        conditions.append('endpoint = ?')
+        parameters.append(endpoint)
+    if since:
+        conditions.append('created_at >= ?')
+        parameters.append(since.timestamp())
+    if until:
+        conditions.append('created_at < ?')
+        parameters.append(until.timestamp())
+    if request_id:
+        conditions.append('request_id = ?')
+        parameters.append(request_id)
+    if before_id:
+        conditions.append('id < ?')
+        parameters.append(before_id)
+
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+    sql = f'SELECT id, {", ".join(LOG_RECORD_COLUMNS)} FROM log_record {where} ORDER BY id DESC LIMIT ?'
+    parameters.append(per_page + 1)
+
+    if not os.path.exists(app.config['LOG_STORE_PATH']):
+        return [], None
+    connection = connect_log_store(app.config['LOG_STORE_PATH'])
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = [dict(row) for row in connection.execute(sql, parameters)]
+    except sqlite3.OperationalError:
+        # 書き込みスレッドがテーブルを作成する前
+        rows = []
+    finally:
+        connection.close()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1]['id']
+    for row in rows:
+        row['created_at'] = datetime.fromtimestamp(row['created_at'])
+    return rows, next_cursor
@@ -0,0 +1,195 @@
+from imports import *
+from run import *
+import time
+
+# 末尾から読み込む際のブロックサイズ（バイト）
+LOG_READ_BLOCK_SIZE = 64 * 1024
+
+
+####################################################################################################
+# 
+# 関数名：log_file_paths
+# 引数：handler - RotatingFileHandler
+# 返却値：新しい順のログファイルのパスのリスト
+# 詳細：現在のログファイルと、ローテーションされた .1〜.N のファイルのうち存在するものを新しい順に返却します。
+# 
+####################################################################################################
+def log_file_paths(handler):
+    paths = [handler.baseFilename] + [f'{handler.baseFilename}.{index}' for index in range(1, handler.backupCount + 1)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+####################################################################################################
+# 
+# 関数名：iter_lines_reversed
+# 引数：path (str) - ファイルのパス
+#       block_size (int) - 1回に読み込むバイト数
+# 返却値：末尾から順に1行ずつ返すジェネレータ
+# 詳細：ファイルの末尾からブロック単位で逆向きに読み込み、行を新しい順に返却します。
+#       読み込むのは呼び出し元が必要とした行を含むブロックだけです。
+# 
+####################################################################################################
+def iter_lines_reversed(path, block_size=LOG_READ_BLOCK_SIZE):
+    with open(path, 'rb') as log_file:
+        position = log_file.seek(0, os.SEEK_END)
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            log_file.seek(position)
+            lines = (log_file.read(read_size) + remainder).split(b'\n')
+            # 先頭の行はさらに前のブロックに続いている可能性があるため持ち越す
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode('utf-8', errors='replace')
+        if remainder:
+            yield remainder.decode('utf-8', errors='replace')
+
+
+def parse_log_timestamp(line):
+    # 'YYYY-MM-DD HH:MM:SS,fff LEVEL: ...' の先頭19文字（秒まで）だけを解析
+    try:
+        return datetime.fromisoformat(line[:19])
+    except ValueError:
+        return None
+
+
+####################################################################################################
+# 
+# 関数名：iter_log_records_reversed
+# 引数：paths (list) - 新しい順のログファイルのパス
+# 返却値：(タイムスタンプ, ログの文字列) を新しい順に返すジェネレータ
+# 詳細：トレースバックなどタイムスタンプを持たない行は、直前のタイムスタンプを持つ行と合わせて1件のログとして扱います。
+# 
+####################################################################################################
+def iter_log_records_reversed(paths):
+    for path in paths:
+        continuation = []
+        try:
+            for line in iter_lines_reversed(path):
+                timestamp = parse_log_timestamp(line)
+                if timestamp is None:
+                    continuation.append(line)
+                    continue
+                yield timestamp, '\n'.join([line] + continuation[::-1])
+                continuation = []
+        except FileNotFoundError:
+            # 読み込み中にローテーションされたファイルは読み飛ばす
+            continue
+
+
+####################################################################################################
+# 
+# 関数名：read_recent_logs
+# 引数：handler - RotatingFileHandler
+#       days (int) - 表示する期間（日）
+#       page (int) - ページ番号（1始まり）
+#       per_page (int) - 1ページあたりの件数
+# 返却値：(新しい順のログのリスト, 次のページがあるかどうか)
+# 詳細：最新のログファイルから古いローテーション済みファイルへ向かって逆順に読み込み、
+#       指定したページ分のログが揃うか、期間より古いログに達した時点で読み込みを終了します。
+# 
+####################################################################################################
+def read_recent_logs(handler, days=10, page=1, per_page=100):
+    now = datetime.now()
+    since = now - timedelta(days=days)
+    skip = (page - 1) * per_page
+
+    logs = []
+    for timestamp, record in iter_log_records_reversed(log_file_paths(handler)):
+        if timestamp > now:
+            continue
+        if timestamp < since:
+            break
+        if skip > 0:
+            skip -= 1
+            continue
+        if len(logs) == per_page:
+            return logs, True
+        logs.append(record)
+    return logs, False
+
+
+# 'YYYY-MM-DD HH:MM:SS,fff LEVEL: ...' 形式の行から重要度を取り出す
+_LOG_LEVEL_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} ([A-Z]+):')
+
+
+####################################################################################################
+# 
+# 関数名：follow_log_file
+# 引数：path (str) - 追跡するログファイルのパス
+#       inode (int) - 前回読み込んだファイルの inode（省略可）
+#       offset (int) - 前回読み込んだ位置（バイト）。省略した場合はファイルの末尾から
+#       poll_interval (float) - 新しい行がない場合に待機する秒数
+#       heartbeat_interval (float) - 新しい行がない場合に None を返す間隔（秒）
+#       max_seconds (float) - 追跡を終了するまでの秒数
+# 返却値：(行, inode, 行の直後の位置) を返すジェネレータ。新しい行がない状態が続いた場合は None
+# 詳細：ログファイルに追記された行だけを順に返却します。新しい行がない間は os.stat で inode とサイズを確認して待機するだけです。
+#       inode が変わった場合はローテーションされたとみなし、元のファイルを最後まで読んでから新しいファイルの先頭に切り替えます。
+#       前回と同じファイル（inode）であれば offset の位置から再開します。
+# 
+####################################################################################################
+def follow_log_file(path, inode=None, offset=None, poll_interval=1.0, heartbeat_interval=15.0, max_seconds=300.0):
+    started = time.monotonic()
+    last_yield = started
+    log_file = None
+    current_inode = None
+    pending = b''
+    try:
+        while time.monotonic() - started < max_seconds:
+            if log_file is None:
+                try:
+                    log_file = open(path, 'rb')
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                stat = os.fstat(log_file.fileno())
+                if offset is None:
+                    log_file.seek(0, os.SEEK_END)
+                elif inode == stat.st_ino and offset <= stat.st_size:
+                    log_file.seek(offset)
+                # ローテーション後に開いたファイルは先頭から読み込む
+                current_inode = stat.st_ino
+                offset = 0
+                pending = b''
+
+            chunk = log_file.read(LOG_READ_BLOCK_SIZE)
+            if chunk:
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                # 各行の直後の位置（再接続時の再開位置）を計算
+                position = log_file.tell() - len(pending) - sum(len(line) + 1 for line in lines)
+                for line in lines:
+                    position += len(line) + 1
+                    if line:
+                        yield line.decode('utf-8', errors='replace'), current_inode, position
+                last_yield = time.monotonic()
+                continue
+
+            # 追記がない場合はローテーションと切り詰めを確認してから待機
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_ino != current_inode:
+                log_file.close()
+                log_file = None
+                continue
+            if stat is not None and stat.st_size < log_file.tell():
+                log_file.seek(0)
+                pending = b''
+                continue
+
+            if time.monotonic() - last_yield >= heartbeat_interval:
+                yield None
+                last_yield = time.monotonic()
+            time.sleep(poll_interval)
+    finally:
+        if log_file is not None:
+            log_file.close()
+
+
+def log_line_level(line):
+    match = _LOG_LEVEL_PATTERN.match(line)
+    return match.group(1) if match else None
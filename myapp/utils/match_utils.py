@@ -0,0 +1,181 @@
+from imports import *
+from run import *
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from utils.skill_index import skill_index, normalize_skill_name
+
+# 重みを省略した場合の既定値（必須スキル / 歓迎スキル）
+DEFAULT_REQUIRED_WEIGHT = 2.0
+DEFAULT_PREFERRED_WEIGHT = 1.0
+
+# スキル行列の内容（構築後は変更しない）
+#   catalog: {正規化した技術名: 列番号}、tech_names: 列番号ごとの表示用の技術名、user_ids: 行番号ごとのユーザーID
+#   rows: 列番号ごとの行番号の配列、months: 列番号ごとの使用期間の配列
+SkillMatrixData = namedtuple('SkillMatrixData', ['catalog', 'tech_names', 'user_ids', 'rows', 'months'])
+
+
+####################################################################################################
+# 
+# クラス名：SkillMatrix
+# 詳細：ユーザー × 技術の使用期間を、技術カタログの番号で引ける配列としてプロセス内に保持します。
+#       技術ごとに (ユーザーの行番号, 使用期間) の配列を持つ列方向の疎行列で、
+#       採点時は条件に含まれる技術の列だけをまとめて加算するため、ORM のオブジェクトは生成しません。
+#       再構築した内容は SkillMatrixData として1回の代入で差し替えるため、採点中に再構築されても
+#       古い内容と新しい内容が混ざることはありません。
+# 
+####################################################################################################
+class SkillMatrix:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None  # 元にしたスキル索引の世代番号
+        self.data = SkillMatrixData({}, [], array('q'), [], [])
+
+    def load(self, user_months, tech_names):
+        catalog = {key: column for column, key in enumerate(sorted(tech_names))}
+        user_ids = array('q', sorted(user_months))
+        rows = [array('I') for _ in catalog]
+        months = [array('H') for _ in catalog]
+        for row, user_id in enumerate(user_ids):
+            for key, value in user_months[user_id].items():
+                column = catalog[key]
+                rows[column].append(row)
+                months[column].append(min(max(value, 0), 0xFFFF))
+
+        self.data = SkillMatrixData(catalog, [tech_names[key] for key in sorted(tech_names)], user_ids, rows, months)
+
+    def ensure_current(self):
+        skill_index.ensure_built()
+        if self.generation != skill_index.generation:
+            with self.lock:
+                if self.generation != skill_index.generation:
+                    with skill_index.lock:
+                        generation = skill_index.generation
+                        user_months = skill_index.user_months
+                        tech_names = skill_index.tech_names
+                    self.load(user_months, tech_names)
+                    self.generation = generation
+
+    ####################################################################################################
+    # 
+    # 関数名：score
+    # 引数：requirements (list) - 条件のリスト [{'name': 技術名, 'months': 必要な使用期間, 'weight': 重み, 'required': 必須か}]
+    #       limit (int) - 返却する候補者数
+    # 返却値：スコアの高い順の候補者のリスト [{'user_id', 'score', 'skills', 'missing_required'}]
+    # 詳細：技術ごとに min(使用期間 / 必要な使用期間, 1) × 重み を加算し、重みの合計に対する割合（0〜100）をスコアとします。
+    #       必須スキルをすべて満たす候補者を優先し、上位 limit 件をヒープで選びます。
+    # 
+    ####################################################################################################
+    def score(self, requirements, limit=20):
+        data = self.data
+        terms = [term for term in requirements if normalize_skill_name(term['name'])]
+        total_weight = sum(term['weight'] for term in terms)
+        if not terms or total_weight <= 0:
+            return []
+        required_count = sum(1 for term in terms if term['required'])
+
+        scores = {}  # {行番号: 加算した重み}
+        required_hits = {}  # {行番号: 満たした必須スキルの数}
+        for term in terms:
+            column = data.catalog.get(normalize_skill_name(term['name']))
+            if column is None:
+                continue
+            target = max(term['months'], 1)
+            weight = term['weight']
+            for row, value in zip(data.rows[column], data.months[column]):
+                scores[row] = scores.get(row, 0.0) + weight * min(value / target, 1.0)
+                if term['required'] and value >= term['months']:
+                    required_hits[row] = required_hits.get(row, 0) + 1
+
+        top_rows = heapq.nlargest(
+            limit, scores,
+            key=lambda row: (required_hits.get(row, 0) == required_count, scores[row], -row),
+        )
+
+        results = []
+        for row in top_rows:
+            skills = {}
+            missing_required = []
+            for term in terms:
+                column = data.catalog.get(normalize_skill_name(term['name']))
+                value = _months_of(data, column, row) if column is not None else 0
+                if value:
+                    skills[data.tech_names[column]] = value
+                if term['required'] and value < term['months']:
+                    missing_required.append(term['name'])
+            results.append({
+                'user_id': data.user_ids[row],
+                'score': round(scores[row] / total_weight * 100, 1),
+                'skills': skills,
+                'missing_required': missing_required,
+            })
+        return results
+
+
+def _months_of(data, column, row):
+    rows = data.rows[column]
+    position = bisect_left(rows, row)
+    if position < len(rows) and rows[position] == row:
+        return data.months[column][position]
+    return 0
+
+
+# プロセス内で共有するスキル行列
+skill_matrix = SkillMatrix()
+
+
+####################################################################################################
+# 
+# 関数名：parse_requirement_lines
+# 引数：text (str) - 1行に「技術名, 必要な使用期間（月）, 重み」を記述した条件（使用期間と重みは省略可）
+#       required (bool) - 必須スキルかどうか
+# 返却値：条件のリスト
+# 詳細：案件の必須スキル・歓迎スキルの入力欄を条件のリストに変換します。
+#       数値として読めない使用期間と重みは既定値とし、有限でない値（nan、inf）の場合は ValueError を送出します。
+# 
+####################################################################################################
+def parse_requirement_lines(text, required):
+    requirements = []
+    for line in (text or '').splitlines():
+        parts = [part.strip() for part in re.split(r'[,、，\t]', line)]
+        if not parts or not parts[0]:
+            continue
+        requirements.append(build_requirement(parts[0], parts[1] if len(parts) > 1 else None, parts[2] if len(parts) > 2 else None, required))
+    return requirements
+
+
+def _parse_number(value, default):
+    if value in (None, ''):
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    # 'nan' や 'inf' はスコアが NaN になり JSON で返却できないため、条件の形式の誤りとして扱う
+    if not math.isfinite(number):
+        raise ValueError(f'Non-finite requirement value: {value!r}')
+    return number
+
+
+def build_requirement(name, months, weight, required):
+    months = max(int(_parse_number(months, 1)), 0)
+    default_weight = DEFAULT_REQUIRED_WEIGHT if required else DEFAULT_PREFERRED_WEIGHT
+    weight = max(_parse_number(weight, default_weight), 0.0)
+    return {'name': str(name).strip(), 'months': months, 'weight': weight, 'required': required}
+
+
+####################################################################################################
+# 
+# 関数名：match_candidates
+# 引数：requirements (list) - 条件のリスト
+#       limit (int) - 返却する候補者数
+# 返却値：スコアの高い順の候補者のリスト
+# 詳細：スキル行列を最新の状態にしてから、条件に対する全ユーザーのスコアを計算します。
+# 
+####################################################################################################
+def match_candidates(requirements, limit=20):
+    skill_matrix.ensure_current()
+    return skill_matrix.score(requirements, limit)
@@ -0,0 +1,126 @@
+from imports import *
+from run import *
+import threading
+import time
+from collections import OrderedDict
+from itsdangerous import URLSafeSerializer, BadSignature
+
+# カーソルトークン用のシリアライザ（改ざんされたトークンは無効として扱う）
+cursor_serializer = URLSafeSerializer(app.secret_key, salt='pagination-cursor')
+
+# 件数のキャッシュ {キャッシュキー: (取得時刻, 件数)}
+_count_cache = OrderedDict()
+_COUNT_CACHE_SIZE = 256
+# 複数のスレッドから参照・更新されるため、取得・保存・破棄はロックの中で行う（COUNT(*) の実行中はロックしない）
+_count_cache_lock = threading.Lock()
+# clear_count_cache の呼び出し回数（破棄する前に数え始めた件数を保存しないために使用）
+_count_cache_generation = 0
+
+####################################################################################################
+# 
+# 関数名：encode_cursor / decode_cursor
+# 引数：key - ページの境界となる行のキー、direction (str) - 'next' または 'prev'
+#       token (str) - クライアントから受け取ったカーソルトークン
+# 返却値：カーソルトークン / (キー, 方向)。トークンがない、または不正な場合は (None, 'next')
+# 詳細：ページの境界となるキーを不透明なトークンに変換します。
+# 
+####################################################################################################
+def encode_cursor(key, direction):
+    return cursor_serializer.dumps({'key': key, 'direction': direction})
+
+
+def decode_cursor(token):
+    if not token:
+        return None, 'next'
+    try:
+        data = cursor_serializer.loads(token)
+    except BadSignature:
+        return None, 'next'
+    direction = 'prev' if data.get('direction') == 'prev' else 'next'
+    return data.get('key'), direction
+
+####################################################################################################
+# 
+# 関数名：keyset_paginate
+# 引数：query - 絞り込み済みのクエリ
+#       key_column - 並び順に使うインデックス付きの一意な列（主キーなど）
+#       key_of (function) - 結果の行からキーを取り出す関数
+#       cursor (str) - カーソルトークン（最初のページの場合は None）
+#       per_page (int) - 1ページあたりの件数
+# 返却値：(行のリスト, 次ページのカーソル, 前ページのカーソル)
+# 詳細：OFFSETを使わず、前ページの境界のキーより後ろ（前）の行をインデックスで直接取得します。
+#       ページが深くなっても読み飛ばす行が増えないため、取得時間は一定です。
+# 
+####################################################################################################
+def keyset_paginate(query, key_column, key_of, cursor, per_page):
+    key, direction = decode_cursor(cursor)
+
+    if direction == 'prev' and key is not None:
+        rows = query.filter(key_column < key).order_by(key_column.desc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        next_cursor = encode_cursor(key_of(rows[-1]), 'next') if rows else None
+        prev_cursor = encode_cursor(key_of(rows[0]), 'prev') if rows and has_more else None
+    else:
+        if key is not None:
+            query = query.filter(key_column > key)
+        rows = query.order_by(key_column.asc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(key_of(rows[-1]), 'next') if rows and has_more else None
+        prev_cursor = encode_cursor(key_of(rows[0]), 'prev') if rows and key is not None else None
+
+    return rows, next_cursor, prev_cursor
+
+####################################################################################################
+# 
+# 関数名：cached_count
+# 引数：cache_key (tuple) - 絞り込み条件を表すキャッシュキー
+#       query - 絞り込み済みのクエリ
+# 返却値：件数
+# 詳細：絞り込み条件ごとの件数を PAGINATION_COUNT_TTL 秒間キャッシュし、ページ移動のたびに
+#       COUNT(*) を実行しないようにします。
+# 
+####################################################################################################
+def cached_count(cache_key, query):
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(cache_key)
+        if cached and now - cached[0] < app.config['PAGINATION_COUNT_TTL']:
+            return cached[1]
+        generation = _count_cache_generation
+
+    total = query.order_by(None).count()
+    with _count_cache_lock:
+        if generation == _count_cache_generation:
+            _count_cache[cache_key] = (now, total)
+            _count_cache.move_to_end(cache_key)
+            while len(_count_cache) > _COUNT_CACHE_SIZE:
+                _count_cache.popitem(last=False)
+    return total
+
+####################################################################################################
+# 
+# 関数名：pagination_cache_key
+# 引数：args - リクエストのクエリ引数
+# 返却値：キャッシュキー（タプル）
+# 詳細：ページ位置に関係しない絞り込み条件だけを使って、件数キャッシュのキーを作成します。
+# 
+####################################################################################################
+def pagination_cache_key(args):
+    filters = tuple(sorted((name, value) for name, value in args.items() if name not in ('cursor', 'per_page', 'total') and value))
+    return (request.endpoint, filters)
+
+####################################################################################################
+# 
+# 関数名：clear_count_cache
+# 引数：なし
+# 返却値：なし
+# 詳細：一括操作などで件数が大きく変わった場合に、キャッシュした件数を破棄します。
+# 
+####################################################################################################
+def clear_count_cache():
+    global _count_cache_generation
+    with _count_cache_lock:
+        _count_cache_generation += 1
+        _count_cache.clear()
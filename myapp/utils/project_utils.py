@@ -0,0 +1,115 @@
+from imports import *
+from run import *
+
+# 技術の種類（フォームのフィールド名の接頭辞と一致）
+TECH_TYPES = ['os', 'language', 'framework', 'database', 'containertech', 'cicd', 'logging', 'tools']
+
+####################################################################################################
+# 
+# 関数名：load_project_skills
+# 引数：project_id (int) - プロジェクトのID
+# 返却値：(技術のリスト, 工程のリスト)
+# 詳細：プロジェクトに紐づく技術と工程を、それぞれ1回のクエリでまとめて取得します。
+#       ORMオブジェクトではなく行データを返すため、一括更新後のセッションと状態が食い違いません。
+# 
+####################################################################################################
+def load_project_skills(project_id):
+    technologies = db.session.execute(
+        select(Technology.id, Technology.type, Technology.name, Technology.duration_months)
+        .where(Technology.project_id == project_id)
+        .order_by(Technology.id)
+    ).all()
+    processes = db.session.execute(
+        select(Process.id, Process.name)
+        .where(Process.project_id == project_id)
+        .order_by(Process.id)
+    ).all()
+    return technologies, processes
+
+####################################################################################################
+# 
+# 関数名：group_technologies_by_type
+# 引数：technologies (list) - load_project_skills が返す技術のリスト
+# 返却値：技術の種類ごとの辞書
+# 詳細：取得済みの技術を種類ごとに振り分けます。種類ごとにクエリを発行する必要はありません。
+# 
+####################################################################################################
+def group_technologies_by_type(technologies):
+    grouped = {tech_type: [] for tech_type in TECH_TYPES}
+    for tech in technologies:
+        grouped.setdefault(tech.type, []).append(tech)
+    return grouped
+
+####################################################################################################
+# 
+# 関数名：sync_project_skills
+# 引数：project_id (int) - プロジェクトのID
+#       tech_data (dict) - {技術の種類: {技術名: 使用期間(月)}} の形式で送信された技術
+#       process_names (list) - 送信された工程名のリスト
+# 返却値：追加/更新/削除した件数の辞書
+# 詳細：既存の技術と工程を1回ずつ読み込み、(種類, 技術名) をキーにして追加/更新/削除の差分を求め、
+#       それぞれを一括のSQL文として実行します。コミットは呼び出し側で1回だけ行ってください。
+# 
+####################################################################################################
+def sync_project_skills(project_id, tech_data, process_names):
+    existing_techs, existing_processes = load_project_skills(project_id)
+
+    # 技術の差分を計算
+    desired_techs = {
+        (tech_type, name): int(duration)
+        for tech_type, techs in tech_data.items()
+        for name, duration in techs.items()
+    }
+    existing_by_key = {}
+    tech_deletes = []
+    for tech in existing_techs:
+        key = (tech.type, tech.name)
+        # 同じキーの重複行や送信されなかった技術は削除対象
+        if key in existing_by_key or key not in desired_techs:
+            tech_deletes.append(tech.id)
+        else:
+            existing_by_key[key] = tech
+
+    tech_inserts = []
+    tech_updates = []
+    for (tech_type, name), duration in desired_techs.items():
+        tech = existing_by_key.get((tech_type, name))
+        if tech is None:
+            tech_inserts.append({'project_id': project_id, 'type': tech_type, 'name': name, 'duration_months': duration})
+        elif tech.duration_months != duration:
+            tech_updates.append({'id': tech.id, 'duration_months': duration})
+
+    # 工程の差分を計算
+    desired_processes = dict.fromkeys(process_names)
+    existing_process_names = set()
+    process_deletes = []
+    for process in existing_processes:
+        if process.name in existing_process_names or process.name not in desired_processes:
+            process_deletes.append(process.id)
+        else:
+            existing_process_names.add(process.name)
+
+    process_inserts = [
+        {'project_id': project_id, 'name': name}
+        for name in desired_processes if name not in existing_process_names
+    ]
+
+    # 差分を一括で反映
+    if tech_deletes:
+        db.session.execute(delete(Technology).where(Technology.id.in_(tech_deletes)), execution_options={'synchronize_session': False})
+    if tech_updates:
+        db.session.execute(update(Technology), tech_updates)
+    if tech_inserts:
+        db.session.execute(insert(Technology), tech_inserts)
+    if process_deletes:
+        db.session.execute(delete(Process).where(Process.id.in_(process_deletes)), execution_options={'synchronize_session': False})
+    if process_inserts:
+        db.session.execute(insert(Process), process_inserts)
+
+    return {
+        'technologies_added': len(tech_inserts),
+        'technologies_updated': len(tech_updates),
+        'technologies_deleted': len(tech_deletes),
+        'processes_added': len(process_inserts),
+        'processes_deleted': len(process_deletes),
+    }
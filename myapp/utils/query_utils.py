@@ -0,0 +1,227 @@
+from imports import *
+from run import *
+import json
+import time
+from collections import deque
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# SQL文ごとに保持するパラメータの種類数の上限（大量に実行されるSQL文でリクエスト中のメモリが増え続けないようにする）
+QUERY_PARAMETER_SAMPLES = 20
+
+
+####################################################################################################
+# 
+# クラス名：QueryBudgetExceeded
+# 詳細：厳格モードでエンドポイントごとのクエリ数の上限を超えた場合に送出される例外です。
+# 
+####################################################################################################
+class QueryBudgetExceeded(Exception):
+    pass
+
+####################################################################################################
+# 
+# 関数名：get_query_stats
+# 引数：なし
+# 返却値：現在のリクエストのクエリ統計（辞書）。リクエスト外の場合は None
+# 詳細：リクエストごとに、クエリ数・DB時間の合計・SQL文ごとの実行回数とパラメータ（最大 QUERY_PARAMETER_SAMPLES 種類）を保持します。
+# 
+####################################################################################################
+def get_query_stats():
+    if not has_request_context():
+        return None
+    if 'query_stats' not in g:
+        g.query_stats = {'count': 0, 'duration': 0.0, 'statements': {}}
+    return g.query_stats
+
+####################################################################################################
+# 
+# 関数名：find_repeated_statements
+# 引数：stats (dict) - get_query_stats が返すクエリ統計
+#       threshold (int) - 繰り返しとみなす実行回数
+# 返却値：[(SQL文, 実行回数, パラメータの種類数)] のリスト
+# 詳細：同じSQL文が異なるパラメータで threshold 回を超えて実行されたもの（N+1の疑い）を抽出します。
+# 
+####################################################################################################
+def find_repeated_statements(stats, threshold):
+    repeated = []
+    for statement, entry in stats['statements'].items():
+        if entry['count'] > threshold and len(entry['parameters']) > 1:
+            repeated.append((statement, entry['count'], len(entry['parameters'])))
+    repeated.sort(key=lambda item: item[1], reverse=True)
+    return repeated
+
+
+####################################################################################################
+# 
+# 関数名：redact_parameters
+# 引数：parameters - SQL文に渡されたパラメータ
+# 返却値：ログに出力できる形式に伏字化したパラメータ
+# 詳細：文字列やバイト列は個人情報やパスワードを含み得るため、型と長さだけを残します。
+# 
+####################################################################################################
+def redact_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    if isinstance(parameters, (str, bytes)):
+        return f'<{type(parameters).__name__} len={len(parameters)}>'
+    if parameters is None or isinstance(parameters, (bool, int, float)):
+        return parameters
+    return f'<{type(parameters).__name__}>'
+
+####################################################################################################
+# 
+# 関数名：explain_query_plan
+# 引数：conn - SQLAlchemyのコネクション
+#       cursor - DBAPIのカーソル
+#       statement (str) - 実行されたSQL文
+#       parameters - SQL文に渡されたパラメータ
+# 返却値：EXPLAIN QUERY PLAN の結果（行のリスト）。取得できない場合は None
+# 詳細：SQLiteの場合のみ、DBAPIのコネクションで直接 EXPLAIN QUERY PLAN を実行します。
+#       SQLAlchemyを経由しないため、クエリ計測のイベントは再度発火しません。
+# 
+####################################################################################################
+def explain_query_plan(conn, cursor, statement, parameters):
+    if conn.dialect.name != 'sqlite':
+        return None
+    try:
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+            return [row[-1] for row in explain_cursor.fetchall()]
+        finally:
+            explain_cursor.close()
+    except Exception as e:
+        return [f'EXPLAIN QUERY PLAN failed: {e}']
+
+####################################################################################################
+# 
+# 関数名：log_slow_query
+# 引数：conn, cursor, statement, parameters, executemany - after_cursor_execute の引数
+#       duration (float) - 実行時間（秒）
+# 返却値：なし
+# 詳細：スロークエリを伏字化したパラメータ、実行時間、エンドポイント、実行計画とともに専用ログに記録します。
+# 
+####################################################################################################
+def log_slow_query(conn, cursor, statement, parameters, executemany, duration):
+    entry = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'duration_ms': round(duration * 1000, 1),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'statement': ' '.join(statement.split()),
+        'parameters': redact_parameters(parameters),
+        'executemany': executemany,
+        'query_plan': None if executemany else explain_query_plan(conn, cursor, statement, parameters),
+    }
+    slow_query_logger.info(json.dumps(entry, ensure_ascii=False))
+
+####################################################################################################
+# 
+# 関数名：read_slow_queries
+# 引数：limit (int) - 取得する件数
+# 返却値：新しい順に並べたスロークエリのリスト
+# 詳細：スロークエリログの末尾から指定件数を読み込みます。
+# 
+####################################################################################################
+def read_slow_queries(limit=100):
+    entries = []
+    try:
+        with open(slow_query_handler.baseFilename, 'r') as log_file:
+            for line in deque(log_file, maxlen=limit):
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    entries.reverse()
+    return entries
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+
+    threshold = app.config['SLOW_QUERY_THRESHOLD']
+    if threshold is not None and duration > threshold:
+        log_slow_query(conn, cursor, statement, parameters, executemany, duration)
+
+    stats = get_query_stats()
+    if stats is None:
+        return
+
+    stats['count'] += 1
+    stats['duration'] += duration
+    entry = stats['statements'].setdefault(statement, {'count': 0, 'parameters': set()})
+    entry['count'] += 1
+    if len(entry['parameters']) < QUERY_PARAMETER_SAMPLES:
+        entry['parameters'].add(repr(parameters))
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # 失敗したSQL文は after_cursor_execute が呼ばれないため、ここで開始時刻を取り除く
+    # （結果の取得中の失敗など、開始時刻が取り除き済みの場合は何もしない）
+    conn = exception_context.connection
+    if conn is None:
+        return
+    start_times = conn.info.get('query_start_time')
+    if start_times:
+        start_times.pop()
+
+####################################################################################################
+# 
+# 関数名：check_query_stats
+# 引数：endpoint (str) - エンドポイント名
+#       stats (dict) - get_query_stats が返すクエリ統計
+# 返却値：なし
+# 詳細：リクエストのクエリ数とDB時間を設定に応じてログに出力し、N+1の疑いを警告します。
+#       厳格モードでは、設定されたエンドポイントごとのクエリ数の上限を超えると QueryBudgetExceeded を送出します。
+# 
+####################################################################################################
+def check_query_stats(endpoint, stats):
+    duration_ms = stats['duration'] * 1000
+    if app.config['SQL_QUERY_STATS_LOG']:
+        app.logger.info(f'{endpoint}: {stats["count"]} queries in {duration_ms:.1f} ms')
+
+    for statement, count, distinct in find_repeated_statements(stats, app.config['SQL_N_PLUS_ONE_THRESHOLD']):
+        distinct = f'{distinct}+' if distinct >= QUERY_PARAMETER_SAMPLES else distinct
+        app.logger.warning(f'Possible N+1 in {endpoint}: statement executed {count} times with {distinct} different parameters: {" ".join(statement.split())}')
+
+    budget = app.config['SQL_QUERY_BUDGETS'].get(endpoint)
+    if app.config['SQL_QUERY_BUDGET_STRICT'] and budget is not None and stats['count'] > budget:
+        raise QueryBudgetExceeded(f'{endpoint} ran {stats["count"]} queries (budget: {budget})')
+
+####################################################################################################
+# 
+# 関数名：report_query_stats
+# 引数：response - レスポンスオブジェクト
+# 返却値：レスポンスオブジェクト
+# 詳細：リクエストごとのクエリ数とDB時間を、設定に応じてレスポンスヘッダーに出力し、check_query_stats で検査します。
+#       ストリーミングのレスポンス（エクスポートやSSE）は本文の生成中にもクエリを実行するため、
+#       検査はレスポンスを閉じるときまで遅らせます。この場合のレスポンスヘッダーは本文の生成前の値です。
+# 
+####################################################################################################
+@app.after_request
+def report_query_stats(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+
+    if app.config['SQL_QUERY_STATS_HEADER']:
+        response.headers['X-Query-Count'] = str(stats['count'])
+        response.headers['X-Query-Time-Ms'] = f'{stats["duration"] * 1000:.1f}'
+
+    endpoint = request.endpoint
+    if response.is_streamed:
+        response.call_on_close(lambda: check_query_stats(endpoint, stats))
+    else:
+        check_query_stats(endpoint, stats)
+    return response
@@ -0,0 +1,105 @@
+from imports import *
+from run import *
+from sqlalchemy import column, literal_column, table, text
+
+# FTS5の仮想テーブル（マイグレーションで作成し、トリガーで project と同期する）
+project_fts = table('project_fts', column('rowid'), column('project_fts'))
+
+# 全文検索の対象となる列
+PROJECT_FTS_COLUMNS = ['project_name', 'industry', 'project_summary', 'responsibilities']
+
+# trigramトークナイザーで一致させるのに必要な最小文字数
+FTS_MIN_TERM_LENGTH = 3
+
+_fts_available = None
+
+####################################################################################################
+# 
+# 関数名：project_fts_available
+# 引数：なし
+# 返却値：全文検索用の仮想テーブルが使用できる場合は True
+# 詳細：SQLiteで project_fts テーブルが作成済みかどうかを初回のみ確認し、結果を保持します。
+# 
+####################################################################################################
+def project_fts_available():
+    global _fts_available
+    if _fts_available is None:
+        if db.engine.dialect.name != 'sqlite':
+            _fts_available = False
+        else:
+            _fts_available = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'project_fts'")
+            ).first() is not None
+    return _fts_available
+
+####################################################################################################
+# 
+# 関数名：fts_phrase
+# 引数：term (str) - 検索語
+#       column_name (str) - 対象の列名（省略時は全列）
+# 返却値：FTS5のMATCH式
+# 詳細：検索語をフレーズとして引用符で囲み、演算子として解釈されないようにします。
+# 
+####################################################################################################
+def fts_phrase(term, column_name=None):
+    phrase = '"' + term.replace('"', '""') + '"'
+    return f'{column_name} : {phrase}' if column_name else phrase
+
+####################################################################################################
+# 
+# 関数名：filter_projects_by_text
+# 引数：query - プロジェクトのクエリ
+#       terms (dict) - {列名: 検索語}
+# 返却値：絞り込み後のクエリ
+# 詳細：全文検索が使える場合は、3文字以上の検索語を1つのMATCH式にまとめてインデックスで絞り込みます。
+#       trigramで扱えない短い検索語や、全文検索が使えない環境では LIKE による部分一致で絞り込みます。
+# 
+####################################################################################################
+def filter_projects_by_text(query, terms):
+    use_fts = project_fts_available()
+    match_expressions = []
+    for column_name, term in terms.items():
+        if not term:
+            continue
+        if use_fts and len(term) >= FTS_MIN_TERM_LENGTH:
+            match_expressions.append(fts_phrase(term, column_name))
+        else:
+            query = query.filter(getattr(Project, column_name).like(f'%{term}%'))
+
+    if match_expressions:
+        matched_ids = select(project_fts.c.rowid).where(project_fts.c.project_fts.match(' AND '.join(match_expressions)))
+        query = query.filter(Project.id.in_(matched_ids))
+    return query
+
+####################################################################################################
+# 
+# 関数名：search_projects
+# 引数：keyword (str) - 検索語
+#       limit (int) - 取得する件数
+# 返却値：[(Project, スコア)] のリスト（関連度の高い順）
+# 詳細：全文検索の対象列すべてから検索語を探し、bm25の関連度順にプロジェクトを返却します。
+#       全文検索が使えない場合や検索語が短い場合は、LIKE で一致したものをID順に返却します（スコアは None）。
+# 
+####################################################################################################
+def search_projects(keyword, limit=50):
+    if not keyword:
+        return []
+
+    if project_fts_available() and len(keyword) >= FTS_MIN_TERM_LENGTH:
+        rank = literal_column('bm25(project_fts)').label('rank')
+        ranked = (
+            select(project_fts.c.rowid.label('project_id'), rank)
+            .where(project_fts.c.project_fts.match(fts_phrase(keyword)))
+            .order_by(rank)
+            .limit(limit)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(Project, ranked.c.rank).join(ranked, ranked.c.project_id == Project.id).order_by(ranked.c.rank)
+        ).all()
+        # bm25は関連度が高いほど小さい値になるため、符号を反転してスコアとする
+        return [(project, -score) for project, score in rows]
+
+    conditions = [getattr(Project, column_name).like(f'%{keyword}%') for column_name in PROJECT_FTS_COLUMNS]
+    projects = Project.query.filter(db.or_(*conditions)).order_by(Project.id).limit(limit).all()
+    return [(project, None) for project in projects]
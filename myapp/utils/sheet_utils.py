@@ -0,0 +1,111 @@
+from imports import *
+from run import *
+
+# 技術の種類と表示名の対応
+TECH_TYPE_LABELS = {
+    'os': 'OS',
+    'language': '言語',
+    'framework': 'フレームワーク',
+    'database': 'データベース',
+    'containertech': 'コンテナ技術',
+    'cicd': 'CI/CD',
+    'logging': 'ログ',
+    'tools': 'その他ツール'
+}
+
+####################################################################################################
+# 
+# 関数名：build_view_sheet_context
+# 引数：user_id (int) - ユーザーID
+# 返却値：view_sheet.html に渡すデータの辞書
+# 詳細：閲覧用のスキルシートに表示するユーザー、プロジェクト、個人開発と、技術の種類ごとの使用期間の合計を取得します。
+# 
+####################################################################################################
+def build_view_sheet_context(user_id):
+    user = User.query.get_or_404(user_id)
+    projects = Project.query.filter_by(user_id=user_id).all()
+    individual_developments = IndividualDevelopment.query.filter_by(user_id=user_id).all()
+
+    project_data = []
+    individual_dev_data = []
+    skills_by_category = {}
+
+    for project in projects:
+        technologies = Technology.query.filter_by(project_id=project.id).all()
+        processes = Process.query.filter_by(project_id=project.id).all()
+
+        for tech in technologies:
+            tech_type = TECH_TYPE_LABELS[tech.type]
+            if tech_type not in skills_by_category:
+                skills_by_category[tech_type] = {}
+
+            if tech.name not in skills_by_category[tech_type]:
+                skills_by_category[tech_type][tech.name] = tech.duration_months
+            else:
+                skills_by_category[tech_type][tech.name] += tech.duration_months
+
+        project_data.append({
+            'project': project,
+            'technologies': technologies,
+            'processes': processes
+        })
+
+    # 個人開発データの取得
+    for dev in individual_developments:
+        processes = IndividualProcess.query.filter_by(individual_development_id=dev.id).all()
+        technologies = IndividualTechnology.query.filter_by(individual_development_id=dev.id).all()
+
+        for tech in technologies:
+            tech_type = TECH_TYPE_LABELS[tech.type]
+            if tech_type not in skills_by_category:
+                skills_by_category[tech_type] = {}
+
+            if tech.name not in skills_by_category[tech_type]:
+                skills_by_category[tech_type][tech.name] = tech.duration_months
+            else:
+                skills_by_category[tech_type][tech.name] += tech.duration_months
+
+        individual_dev_data.append({
+            'individual_development': dev,
+            'processes': processes,
+            'technologies': technologies
+        })
+
+    skills_by_category_formatted = {}
+    for category, skills in skills_by_category.items():
+        skills_list = [{'name': name, 'duration_months': duration} for name, duration in skills.items()]
+        skills_by_category_formatted[category] = skills_list
+
+    return {
+        'user': user,
+        'projects': project_data,
+        'individual_developments': individual_dev_data,
+        'skills_by_category': skills_by_category_formatted,
+    }
+
+####################################################################################################
+# 
+# 関数名：build_pdf_project_data
+# 引数：user_id (int) - ユーザーID
+# 返却値：(ユーザー, PDFに出力するプロジェクトのリスト)
+# 詳細：スキルシートのPDFに出力するユーザーと、プロジェクトごとの技術と工程を取得します。
+# 
+####################################################################################################
+def build_pdf_project_data(user_id):
+    user = User.query.get_or_404(user_id)
+    projects = Project.query.filter_by(user_id=user_id).all()
+    project_data = []
+
+    for project in projects:
+        technologies = Technology.query.filter_by(project_id=project.id).all()
+        processes = Process.query.filter_by(project_id=project.id).all()
+        project_data.append({
+            'project': project,
+            'technologies': technologies,
+            'processes': processes
+        })
+
+    return user, project_data
+
+def pdf_download_name(user):
+    return 'スキルシート_' + user.username + '.pdf'
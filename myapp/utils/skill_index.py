@@ -0,0 +1,324 @@
+from imports import *
+from run import *
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.cache_utils import read_cache_revision, track_cache_revision
+
+# スキル索引の元になるモデル（変更されると、変更されたユーザーの分を索引に反映する）
+SKILL_SOURCE_MODELS = (Project, Technology, Process, IndividualDevelopment, IndividualTechnology, IndividualProcess)
+
+# 検索条件の書式
+#   Java >= 36 / Java ≥ 36ヶ月 ... 技術名と最低使用期間（月）
+#   工程:基本設計 / process includes 基本設計 ... 担当工程
+#   Python ... 技術名のみ（使用期間は問わない）
+_PROCESS_TERM = re.compile(r'^(?:process|工程)\s*(?:includes|:|：|=)\s*(.+)$', re.IGNORECASE)
+_TECH_TERM = re.compile(r'^(.+?)\s*(?:>=|≥|＞＝)\s*(\d+)\s*(?:months?|ヶ月|か月|ヵ月)?$', re.IGNORECASE)
+_TERM_SEPARATOR = re.compile(r'\s+AND\s+|\s*&&?\s*|\s*[,、]\s*', re.IGNORECASE)
+
+
+def normalize_skill_name(name):
+    return name.strip().casefold() if name else ''
+
+####################################################################################################
+# 
+# 関数名：parse_skill_query
+# 引数：query (str) - 検索条件（例：「Java >= 36 AND AWS >= 12 AND 工程:基本設計」）
+# 返却値：(技術の条件のリスト [(正規化した技術名, 最低使用期間)], 工程の条件のリスト [工程名])
+# 詳細：AND、&、カンマで区切られた検索条件を技術と工程の条件に分解します。
+# 
+####################################################################################################
+def parse_skill_query(query):
+    tech_terms = []
+    process_terms = []
+    for term in _TERM_SEPARATOR.split(query or ''):
+        term = term.strip()
+        if not term:
+            continue
+        process_match = _PROCESS_TERM.match(term)
+        if process_match:
+            process_terms.append(normalize_skill_name(process_match.group(1)))
+            continue
+        tech_match = _TECH_TERM.match(term)
+        if tech_match:
+            tech_terms.append((normalize_skill_name(tech_match.group(1)), int(tech_match.group(2))))
+        else:
+            tech_terms.append((normalize_skill_name(term), 1))
+    return tech_terms, process_terms
+
+
+####################################################################################################
+# 
+# クラス名：SkillIndex
+# 詳細：ユーザーごとの技術の合計使用期間と担当工程を集計し、転置索引としてプロセス内に保持します。
+#       技術ごとの索引は (使用期間, ユーザーID) の昇順リストで、最低使用期間以上のユーザーを二分探索で取り出せます。
+#       複数の条件は、件数の少ない索引から順に集合の積を取って絞り込みます。
+#       このワーカーでスキルが変更されたユーザーは、次回の検索時にそのユーザーの分だけ読み込み直します。
+#       他のワーカーでの変更は CACHE_REVISION_CHECK_INTERVAL 秒ごとに世代番号（cache_revision）を確認し、
+#       変わっていれば次回の検索時に全体を作り直します。
+# 
+####################################################################################################
+class SkillIndex:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.RLock()
+        self.built = False
+        self.generation = 0  # 構築・更新するたびに増える世代番号
+        self.revision = None  # 索引に反映済みの cache_revision の世代番号
+        self.checked_at = 0.0
+        self.stale_users = set()  # 次回の検索時に読み込み直すユーザーID
+        self.tech_names = {}  # {正規化した技術名: 表示用の技術名}
+        self.user_months = {}  # {ユーザーID: {正規化した技術名: 合計使用期間}}
+        self.user_processes = {}  # {ユーザーID: {正規化した工程名}}
+        self.tech_postings = {}  # {正規化した技術名: [(合計使用期間, ユーザーID)]}
+        self.process_postings = {}  # {正規化した工程名: [ユーザーID]}
+
+    def _load(self, user_ids=None):
+        project_techs = (
+            select(Project.user_id, Technology.name, func.sum(Technology.duration_months))
+            .join(Technology, Technology.project_id == Project.id)
+            .group_by(Project.user_id, Technology.name)
+        )
+        individual_techs = (
+            select(IndividualDevelopment.user_id, IndividualTechnology.name, func.sum(IndividualTechnology.duration_months))
+            .join(IndividualTechnology, IndividualTechnology.individual_development_id == IndividualDevelopment.id)
+            .group_by(IndividualDevelopment.user_id, IndividualTechnology.name)
+        )
+        project_processes = (
+            select(Project.user_id, Process.name)
+            .join(Process, Process.project_id == Project.id)
+            .distinct()
+        )
+        individual_processes = (
+            select(IndividualDevelopment.user_id, IndividualProcess.name)
+            .join(IndividualProcess, IndividualProcess.individual_development_id == IndividualDevelopment.id)
+            .distinct()
+        )
+        if user_ids is not None:
+            project_techs = project_techs.where(Project.user_id.in_(user_ids))
+            individual_techs = individual_techs.where(IndividualDevelopment.user_id.in_(user_ids))
+            project_processes = project_processes.where(Project.user_id.in_(user_ids))
+            individual_processes = individual_processes.where(IndividualDevelopment.user_id.in_(user_ids))
+
+        tech_names = {}
+        user_months = {}
+        for user_id, name, months in db.session.execute(db.union_all(project_techs, individual_techs)):
+            key = normalize_skill_name(name)
+            if not key:
+                continue
+            tech_names.setdefault(key, name.strip())
+            skills = user_months.setdefault(user_id, {})
+            skills[key] = skills.get(key, 0) + (months or 0)
+
+        user_processes = {}
+        for user_id, name in db.session.execute(db.union(project_processes, individual_processes)):
+            key = normalize_skill_name(name)
+            if key:
+                user_processes.setdefault(user_id, set()).add(key)
+        return tech_names, user_months, user_processes
+
+    def build(self):
+        # 行より先に世代番号を読み、読み込み中の変更は次回の確認で検出する
+        revision = read_cache_revision(self.name)
+        tech_names, user_months, user_processes = self._load()
+
+        tech_postings = {}
+        for user_id, skills in user_months.items():
+            for key, months in skills.items():
+                tech_postings.setdefault(key, []).append((months, user_id))
+        for postings in tech_postings.values():
+            postings.sort()
+
+        process_postings = {}
+        for user_id, keys in user_processes.items():
+            for key in keys:
+                process_postings.setdefault(key, []).append(user_id)
+        for postings in process_postings.values():
+            postings.sort()
+
+        with self.lock:
+            self.tech_names = tech_names
+            self.user_months = user_months
+            self.user_processes = user_processes
+            self.tech_postings = tech_postings
+            self.process_postings = process_postings
+            self.stale_users = set()
+            self.revision = revision
+            self.checked_at = time.monotonic()
+            self.generation += 1
+            self.built = True
+        app.logger.info(f'Skill index built with {len(user_months)} users and {len(tech_names)} technologies')
+
+    def _remove_postings(self, user_id):
+        for key, months in self.user_months.get(user_id, {}).items():
+            postings = self.tech_postings[key]
+            position = bisect_left(postings, (months, user_id))
+            if position < len(postings) and postings[position] == (months, user_id):
+                del postings[position]
+        for key in self.user_processes.pop(user_id, ()):
+            postings = self.process_postings[key]
+            position = bisect_left(postings, user_id)
+            if position < len(postings) and postings[position] == user_id:
+                del postings[position]
+
+    def refresh_users(self, user_ids):
+        tech_names, user_months, user_processes = self._load(user_ids)
+        with self.lock:
+            if not self.built:
+                return
+            # user_months と tech_names はスキル行列がロックの外で読むため、変更せずに新しい辞書に差し替える
+            all_user_months = dict(self.user_months)
+            for user_id in user_ids:
+                self._remove_postings(user_id)
+                all_user_months.pop(user_id, None)
+            for user_id, skills in user_months.items():
+                all_user_months[user_id] = skills
+                for key, months in skills.items():
+                    insort(self.tech_postings.setdefault(key, []), (months, user_id))
+            for user_id, keys in user_processes.items():
+                self.user_processes[user_id] = keys
+                for key in keys:
+                    insort(self.process_postings.setdefault(key, []), user_id)
+            if not tech_names.keys() <= self.tech_names.keys():
+                self.tech_names = {**tech_names, **self.tech_names}
+            self.user_months = all_user_months
+            self.generation += 1
+
+    def check_revision(self):
+        now = time.monotonic()
+        if not self.built or now - self.checked_at < app.config['CACHE_REVISION_CHECK_INTERVAL']:
+            return
+        revision = read_cache_revision(self.name)
+        with self.lock:
+            if revision != self.revision:
+                self.built = False
+            self.checked_at = now
+
+    def committed(self, revision):
+        # このワーカーの変更は対象のユーザーを読み込み直して反映する。変更前の世代番号が反映済みの番号と
+        # 一致しない場合は、他のワーカーの変更も含まれるため全体を作り直す
+        with self.lock:
+            if self.built and self.revision == revision - 1:
+                self.revision = revision
+            else:
+                self.built = False
+
+    def mark_users_stale(self, user_ids):
+        with self.lock:
+            if self.built:
+                self.stale_users.update(user_ids)
+
+    def ensure_built(self):
+        self.check_revision()
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.build()
+        if self.stale_users:
+            with self.lock:
+                user_ids, self.stale_users = self.stale_users, set()
+            if user_ids:
+                try:
+                    self.refresh_users(user_ids)
+                except Exception:
+                    # 読み込み直せなかったユーザーを取りこぼさないよう、次回は全体を作り直す
+                    self.invalidate()
+                    raise
+
+    def invalidate(self):
+        with self.lock:
+            self.built = False
+
+    def _users_with_tech(self, key, min_months):
+        postings = self.tech_postings.get(key, [])
+        start = bisect_left(postings, (min_months, -1))
+        return {user_id for _, user_id in postings[start:]}
+
+    def search(self, query, limit=50):
+        self.ensure_built()
+        tech_terms, process_terms = parse_skill_query(query)
+        if not tech_terms and not process_terms:
+            return []
+
+        with self.lock:
+            # 件数の少ない索引から順に集合の積を取る
+            candidate_sets = [self._users_with_tech(key, min_months) for key, min_months in tech_terms]
+            candidate_sets += [set(self.process_postings.get(key, [])) for key in process_terms]
+            candidate_sets.sort(key=len)
+            matched = candidate_sets[0]
+            for user_ids in candidate_sets[1:]:
+                if not matched:
+                    break
+                matched = matched & user_ids
+
+            results = []
+            for user_id in matched:
+                skills = self.user_months.get(user_id, {})
+                matched_skills = {self.tech_names[key]: skills.get(key, 0) for key, _ in tech_terms}
+                results.append({'user_id': user_id, 'total_months': sum(matched_skills.values()), 'skills': matched_skills})
+
+        results.sort(key=lambda result: (-result['total_months'], result['user_id']))
+        return results[:limit]
+
+
+# プロセス内で共有するスキル索引
+skill_index = SkillIndex('skill_index')
+track_cache_revision(skill_index, SKILL_SOURCE_MODELS)
+
+
+####################################################################################################
+# 
+# 関数名：_track_skill_changes / _track_skill_statements / _apply_skill_changes / _discard_skill_changes
+# 詳細：スキルの元データが変更されたユーザーを記録し、コミットされた時点でそのユーザーを読み込み直す対象にします。
+#       一括のINSERT/UPDATE/DELETE文は対象のユーザーが分からないため、コミット後に索引を破棄し、次の検索時に作り直します。
+# 
+####################################################################################################
+@event.listens_for(Session, 'after_flush')
+def _track_skill_changes(session, flush_context):
+    user_ids = set()
+    project_ids = set()
+    development_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Project, IndividualDevelopment)):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, (Technology, Process)):
+            project_ids.add(obj.project_id)
+        elif isinstance(obj, (IndividualTechnology, IndividualProcess)):
+            development_ids.add(obj.individual_development_id)
+    if not (user_ids or project_ids or development_ids):
+        return
+
+    # 技術と工程は親のプロジェクト・個人開発からユーザーを求める
+    connection = session.connection()
+    if project_ids:
+        user_ids.update(connection.execute(select(Project.user_id).where(Project.id.in_(project_ids))).scalars())
+    if development_ids:
+        user_ids.update(connection.execute(
+            select(IndividualDevelopment.user_id).where(IndividualDevelopment.id.in_(development_ids))
+        ).scalars())
+    session.info.setdefault('skill_index_users', set()).update(user_ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_skill_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in SKILL_SOURCE_MODELS:
+            orm_execute_state.session.info['skill_index_statements'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_skill_changes(session):
+    user_ids = session.info.pop('skill_index_users', None)
+    if session.info.pop('skill_index_statements', False):
+        skill_index.invalidate()
+    elif user_ids:
+        skill_index.mark_users_stale(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_skill_changes(session):
+    session.info.pop('skill_index_users', None)
+    session.info.pop('skill_index_statements', None)
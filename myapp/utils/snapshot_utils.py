@@ -0,0 +1,157 @@
+from imports import *
+from run import *
+import hashlib
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from flask import Response
+from flask_login import AnonymousUserMixin
+from utils.sheet_utils import *
+
+# スナップショットのディレクトリ内のHTMLファイル名（PDFはダウンロード時のファイル名で保存）
+SNAPSHOT_HTML_NAME = 'view_sheet.html'
+
+# スナップショットのHTMLにはリンクコードの代わりにこの文字列を出力し、返却時にリンクコードに置き換える
+# （リンクごとに異なる値を含めないことで、内容が同じスナップショットは同じダイジェストになる）
+SNAPSHOT_LINK_CODE_PLACEHOLDER = '__snapshot_link_code__'
+
+# 作成中のスナップショットを削除しないよう、参照されていないディレクトリを削除するまでの猶予（秒）
+SNAPSHOT_ORPHAN_MIN_AGE = 3600
+
+
+def snapshot_root():
+    # 相対パスはカレントディレクトリではなくアプリケーションのディレクトリを基準にする（send_file と同じ基準）
+    return os.path.join(app.root_path, app.config['SNAPSHOT_DIR'])
+
+
+def snapshot_directory(digest):
+    return os.path.join(snapshot_root(), digest[:2], digest)
+
+
+####################################################################################################
+# 
+# 関数名：write_snapshot
+# 引数：files (dict) - {ファイル名: 内容（bytes）}
+# 返却値：スナップショットのダイジェスト（SHA-256の16進数）
+# 詳細：ファイル名と内容から求めたダイジェストのディレクトリにファイルを書き込みます。
+#       一時ディレクトリに書き込んでから名前を変更するため、書き込み途中のファイルが返却されることはありません。
+#       同じ内容のスナップショットが既にある場合は書き込みません。
+# 
+####################################################################################################
+def write_snapshot(files):
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode('utf-8') + b'\0' + hashlib.sha256(files[name]).digest())
+    digest = digest.hexdigest()
+
+    directory = snapshot_directory(digest)
+    if os.path.isdir(directory):
+        return digest
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        for name, content in files.items():
+            with open(os.path.join(staging, name), 'wb') as snapshot_file:
+                snapshot_file.write(content)
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        # 同じ内容のスナップショットが同時に書き込まれた場合は、そちらを使用する
+        if not os.path.isdir(directory):
+            raise
+    return digest
+
+
+####################################################################################################
+# 
+# 関数名：create_link_snapshot
+# 引数：link (Link) - リンクコードが確定したリンク
+# 返却値：スナップショットのダイジェスト
+# 詳細：閲覧用のスキルシート（view_sheet.html）とPDFを現在の内容で出力し、スナップショットとして保存します。
+#       HTMLはログインしていない閲覧者と同じ表示になるように、リンクコードを含めずに出力します。
+#       PDFは作成日時と文書IDを固定して出力するため、内容が同じであれば同じスナップショットを共有します。
+# 
+####################################################################################################
+def create_link_snapshot(link):
+    context = build_view_sheet_context(link.user_id)
+    html = render_template('view_sheet.html', link_code=SNAPSHOT_LINK_CODE_PLACEHOLDER, current_user=AnonymousUserMixin(), **context)
+    user, project_data = build_pdf_project_data(link.user_id)
+    pdf_buffer = generate_pdf(user, project_data, invariant=True)
+    download_name = re.sub(r'[\\/\0]', '_', pdf_download_name(user))
+    return write_snapshot({SNAPSHOT_HTML_NAME: html.encode('utf-8'), download_name: pdf_buffer.getvalue()})
+
+
+@lru_cache(maxsize=4096)
+def snapshot_files(digest):
+    # スナップショットは作成後に変更しないため、ファイルの一覧はプロセス内で保持する
+    directory = snapshot_directory(digest)
+    pdf_name = next(name for name in os.listdir(directory) if name.endswith('.pdf'))
+    return os.path.join(directory, SNAPSHOT_HTML_NAME), os.path.join(directory, pdf_name)
+
+
+####################################################################################################
+# 
+# 関数名：send_snapshot_file
+# 引数：link (LinkTarget) - スナップショットのリンク
+#       kind (str) - 'html'（閲覧画面）または 'pdf'
+#       link_code (str) - リクエストされたリンクコード（HTMLのPDFダウンロードのURLに埋め込む）
+# 返却値：スナップショットのファイル（見つからない場合は invalid.html）
+# 詳細：DBへの問い合わせやテンプレートの描画を行わずに、スナップショットのファイルを返却します。
+#       HTMLはPDFダウンロードのURLだけをリンクコードに置き換えて返却します。
+#       リンクは無効化や期限切れで閲覧できなくなるため、ブラウザや中継サーバーには保存させても毎回再検証させます（private, no-cache）。
+#       ETag はスナップショットのダイジェスト（HTMLはリンクIDも含む）のため、リンクが有効で内容が同じ場合は 304 を返却します。
+# 
+####################################################################################################
+def send_snapshot_file(link, kind, link_code):
+    try:
+        html_path, pdf_path = snapshot_files(link.snapshot_digest)
+    except (FileNotFoundError, StopIteration):
+        app.logger.error(f'Snapshot files not found: {link.snapshot_digest}')
+        flash('スナップショットが見つかりません。', 'error')
+        return render_template('invalid.html', current_url=request.url)
+
+    if kind == 'pdf':
+        response = send_file(pdf_path, mimetype='application/pdf', as_attachment=True,
+                             download_name=os.path.basename(pdf_path), max_age=0, etag=f'{link.snapshot_digest}-pdf')
+    else:
+        with open(html_path, 'rb') as html_file:
+            html = html_file.read().replace(
+                url_for('download_pdf', link_code=SNAPSHOT_LINK_CODE_PLACEHOLDER).encode('utf-8'),
+                url_for('download_pdf', link_code=link_code).encode('utf-8'),
+            )
+        response = Response(html, mimetype='text/html')
+        response.set_etag(f'{link.snapshot_digest}-{link.link_id}-html')
+        response.make_conditional(request)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+####################################################################################################
+# 
+# 関数名：remove_orphaned_snapshots
+# 引数：min_age (int) - 削除の対象とする最終更新からの経過秒数
+# 返却値：削除したスナップショットの件数
+# 詳細：どのリンクからも参照されていないスナップショットのディレクトリを削除します。
+#       リンクの削除はユーザーの削除など複数の箇所で行われるため、リンクの定期削除の後にまとめて確認します。
+# 
+####################################################################################################
+def remove_orphaned_snapshots(min_age=SNAPSHOT_ORPHAN_MIN_AGE):
+    root = snapshot_root()
+    if not os.path.isdir(root):
+        return 0
+    referenced = set(db.session.scalars(select(Link.snapshot_digest).where(Link.snapshot_digest.isnot(None))))
+    threshold = time.time() - min_age
+    removed = 0
+    for prefix in os.scandir(root):
+        if not prefix.is_dir():
+            continue
+        for entry in os.scandir(prefix.path):
+            if entry.name in referenced or entry.stat().st_mtime > threshold:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            snapshot_files.cache_clear()
+            removed += 1
+    return removed
@@ -0,0 +1,66 @@
+from imports import *
+from run import *
+from utils.cache_utils import RevisionedCache, track_cache_revision
+
+# ログイン中のユーザーとして保持する列（パスワードのハッシュは保持しない）
+CACHED_USER_COLUMNS = [column.name for column in User.__table__.columns if column.name != 'password']
+
+
+####################################################################################################
+# 
+# クラス名：CachedUser
+# 詳細：user_loader が返却するログイン中のユーザーです。User の列の値だけを持つ読み取り専用のオブジェクトで、
+#       セッションに属さないためリクエストをまたいでプロセス内で共有できます。
+#       ユーザーの情報を変更する場合は db.session.get(User, current_user.id) で User を取得して変更してください。
+# 
+####################################################################################################
+class CachedUser:
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'CachedUser is read-only; update the User model instead ({name})')
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, (CachedUser, User)):
+            return self.id == other.id
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+# ユーザーID → CachedUser（存在しないユーザーは None）のキャッシュ
+user_cache = RevisionedCache(
+    'user',
+    max_size=app.config['USER_CACHE_SIZE'],
+    ttl=app.config['USER_CACHE_TTL'],
+    negative_ttl=app.config['USER_CACHE_NEGATIVE_TTL'],
+)
+track_cache_revision(user_cache, (User,))
+
+
+####################################################################################################
+# 
+# 関数名：get_cached_user
+# 引数：user_id (int) - ユーザーID
+# 返却値：CachedUser。存在しないユーザーの場合は None
+# 詳細：キャッシュにない場合のみDBに問い合わせます。User を変更したトランザクションのコミット後はキャッシュを破棄し、
+#       他のワーカーでの変更も世代番号により CACHE_REVISION_CHECK_INTERVAL 秒以内に反映します。
+# 
+####################################################################################################
+def get_cached_user(user_id):
+    hit, user = user_cache.get(user_id)
+    if not hit:
+        row = db.session.execute(
+            select(*[User.__table__.c[name] for name in CACHED_USER_COLUMNS]).where(User.id == user_id)
+        ).mappings().first()
+        user = CachedUser(row) if row else None
+        user_cache.set(user_id, user)
+    return user
@@ -0,0 +1,194 @@
+from imports import *
+from run import *
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.cache_utils import read_cache_revision, track_cache_revision
+
+# 補完の対象となるユーザーの項目
+SUGGEST_FIELDS = ['username', 'email', 'display_name', 'nearest_station', 'education']
+
+
+####################################################################################################
+# 
+# クラス名：UserPrefixIndex
+# 詳細：ユーザーの各項目を (正規化した値, ユーザーID) の昇順リストとしてプロセス内に保持し、
+#       bisect による二分探索で前方一致する候補を取得します。DBへの問い合わせは構築時と世代番号の確認時のみです。
+#       このワーカーでの変更はコミット時に差分で反映し、他のワーカーでの変更は CACHE_REVISION_CHECK_INTERVAL 秒ごとに
+#       世代番号（cache_revision）を確認して、変わっていれば次回の参照時に再構築します。
+# 
+####################################################################################################
+class UserPrefixIndex:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.entries = {field: [] for field in fields}  # {項目名: [(正規化した値, ユーザーID)]}
+        self.users = {}  # {ユーザーID: {項目名: 値}}
+        self.lock = threading.RLock()
+        self.built = False
+        self.revision = None  # 索引に反映済みの世代番号
+        self.checked_at = 0.0
+
+    @staticmethod
+    def normalize(value):
+        return value.casefold() if value else ''
+
+    def build(self):
+        # 行より先に世代番号を読み、読み込み中の変更は次回の確認で検出する
+        revision = read_cache_revision(self.name)
+        rows = db.session.execute(select(User.id, *[getattr(User, field) for field in self.fields])).all()
+        entries = {field: [] for field in self.fields}
+        users = {}
+        for row in rows:
+            values = dict(zip(self.fields, row[1:]))
+            users[row[0]] = values
+            for field, value in values.items():
+                if value:
+                    entries[field].append((self.normalize(value), row[0]))
+        for field_entries in entries.values():
+            field_entries.sort()
+
+        with self.lock:
+            self.entries = entries
+            self.users = users
+            self.built = True
+            self.revision = revision
+            self.checked_at = time.monotonic()
+        app.logger.info(f'User prefix index built with {len(users)} users')
+
+    def check_revision(self):
+        now = time.monotonic()
+        if not self.built or now - self.checked_at < app.config['CACHE_REVISION_CHECK_INTERVAL']:
+            return
+        revision = read_cache_revision(self.name)
+        with self.lock:
+            if revision != self.revision:
+                self.built = False
+            self.checked_at = now
+
+    def committed(self, revision):
+        # このワーカーの変更は _apply_user_changes で差分として反映する。変更前の世代番号が反映済みの番号と
+        # 一致しない場合は、他のワーカーの変更も含まれるため再構築する
+        with self.lock:
+            if self.built and self.revision == revision - 1:
+                self.revision = revision
+            else:
+                self.built = False
+
+    def ensure_built(self):
+        self.check_revision()
+        if not self.built:
+            with self.lock:
+                if not self.built:
+                    self.build()
+
+    def invalidate(self):
+        with self.lock:
+            self.built = False
+
+    def _remove(self, user_id):
+        values = self.users.pop(user_id, None)
+        if not values:
+            return
+        for field, value in values.items():
+            if not value:
+                continue
+            field_entries = self.entries[field]
+            position = bisect_left(field_entries, (self.normalize(value), user_id))
+            if position < len(field_entries) and field_entries[position] == (self.normalize(value), user_id):
+                del field_entries[position]
+
+    def upsert(self, user_id, values):
+        with self.lock:
+            if not self.built:
+                return
+            self._remove(user_id)
+            self.users[user_id] = values
+            for field, value in values.items():
+                if value:
+                    insort(self.entries[field], (self.normalize(value), user_id))
+
+    def remove(self, user_id):
+        with self.lock:
+            if self.built:
+                self._remove(user_id)
+
+    def suggest(self, prefix, limit=10):
+        self.ensure_built()
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self.lock:
+            for field in self.fields:
+                field_entries = self.entries[field]
+                position = bisect_left(field_entries, (prefix, -1))
+                while position < len(field_entries) and len(results) < limit:
+                    value, user_id = field_entries[position]
+                    if not value.startswith(prefix):
+                        break
+                    if user_id not in seen:
+                        seen.add(user_id)
+                        results.append(dict(self.users[user_id], id=user_id, matched_field=field))
+                    position += 1
+                if len(results) >= limit:
+                    break
+        return results
+
+
+# プロセス内で共有するユーザーの前方一致インデックス
+user_prefix_index = UserPrefixIndex('user_index', SUGGEST_FIELDS)
+track_cache_revision(user_prefix_index, (User,))
+
+
+####################################################################################################
+# 
+# 関数名：_collect_user_changes / _apply_user_changes / _discard_user_changes
+# 詳細：フラッシュ時に変更されたユーザーを記録し、コミットが成功した時点でインデックスに反映します。
+#       一括の UPDATE/DELETE 文で変更した場合は対象のユーザーが分からないため、コミット後に再構築します。
+#       ロールバックされた変更はインデックスに反映しません。
+# 
+####################################################################################################
+@event.listens_for(Session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    changes = session.info.setdefault('user_index_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, User) and obj.id is not None:
+            changes[obj.id] = {field: getattr(obj, field) for field in SUGGEST_FIELDS}
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_user_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is User:
+            orm_execute_state.session.info['user_index_statements'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_user_changes(session):
+    if session.info.pop('user_index_statements', False):
+        session.info.pop('user_index_changes', None)
+        user_prefix_index.invalidate()
+        return
+    changes = session.info.pop('user_index_changes', None)
+    if not changes:
+        return
+    for user_id, values in changes.items():
+        if values is None:
+            user_prefix_index.remove(user_id)
+        else:
+            user_prefix_index.upsert(user_id, values)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('user_index_changes', None)
+    session.info.pop('user_index_statements', None)
@@ -1,5 +1,20 @@
 from imports import *
 from run import *
+import json
+from flask import Response, stream_with_context
+from utils.project_utils import *
+from utils.link_utils import *
+from utils.link_stats import *
+from utils.pagination_utils import *
+from utils.auth_utils import *
+from utils.search_utils import *
+from utils.user_index import *
+from utils.dashboard_utils import *
+from utils.export_utils import *
+from utils.bulk_utils import *
+from utils.skill_index import *
+from utils.match_utils import *
+from utils.log_utils import *
 
 
 ####################################################################################################
@@ -31,11 +46,19 @@ def admin_required(f):
 def admin_login():
     form = AdminLoginForm()  # type: ignore # フォームクラスを定義してください
     if form.validate_on_submit():
+        # ハッシュ計算の前に流量制限を確認
+        if throttle_login(form.username.data):
+            flash('ログインの試行回数が多すぎます。しばらくしてから再度お試しください。', 'danger')
+            return render_template('admin_login.html', form=form), 429
+
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data) and user.is_admin:
+        if user and verify_password(user, form.password.data) and user.is_admin:
+            # ハッシュ方式を変更した場合は再ハッシュしたパスワードを保存
+            db.session.commit()
             login_user(user)
             app.logger.info(f'Admin {user.id} logged in')
             return redirect(url_for('admin_dashboard'))
+        record_login_failure(form.username.data)
         flash('ログイン情報が無効です。', 'danger')
         app.logger.warning(f'Failed admin login attempt for username: {form.username.data}')
     app.logger.info('Admin login page accessed')
@@ -47,6 +70,7 @@ def admin_login():
 # 引数：なし
 # 返却値：admin_dashboard.html
 # 詳細：管理者ダッシュボードページを表示します。アクセスにはログインと管理者権限が必要です。
+#       運用統計は集計テーブルから読み込み、古くなっている場合はバックグラウンドで再集計します。
 # 
 ####################################################################################################
 @app.route('/admin/dashboard')
@@ -54,7 +78,8 @@ def admin_login():
 @admin_required
 def admin_dashboard():
     app.logger.info(f'Admin {current_user.id} accessed dashboard')
-    return render_template('admin_dashboard.html')
+    stats, stats_refreshed_at = get_dashboard_rollups()
+    return render_template('admin_dashboard.html', stats=stats, stats_refreshed_at=stats_refreshed_at, auth_metrics=auth_metrics.snapshot())
 
 ####################################################################################################
 # 
@@ -77,7 +102,7 @@ def admin_logout():
 # 関数名：admin_users
 # 引数：なし
 # 返却値：admin_users.html
-# 詳細：全ユーザーの一覧を表示するページを提供します。管理者のログインが必要です。
+# 詳細：ユーザー一覧ページの枠組みを提供します。ユーザーのデータは admin_users_pagination から画面側で取得します。管理者のログインが必要です。
 # 
 ####################################################################################################
 @app.route('/admin/users')
@@ -85,8 +110,7 @@ def admin_logout():
 @admin_required
 def admin_users():
     app.logger.info(f'Admin {current_user.id} accessed user list')
-    users = User.query.all()
-    return render_template('admin_users.html', users=users)
+    return render_template('admin_users.html')
 
 ####################################################################################################
 # 
@@ -116,16 +140,12 @@ def admin_user_detail(user_id):
         flash('ユーザー情報が更新されました。', 'success')
         return redirect(url_for('admin_user_detail', user_id=user.id))
 
-    # 最新の有効なスキルシートのリンクを取得
-    latest_active_link = Link.query.filter_by(user_id=user.id, is_active=True).order_by(Link.created_at.desc()).first()
-    # リンクコードをフルURLに変換
-    if latest_active_link:
-        latest_active_link_url = url_for('view_sheet', link_code=latest_active_link.link_code, _external=True)
-    else:
-        latest_active_link_url = None
+    # 最新の有効なスキルシートのリンクを取得し、フルURLに変換
+    latest_active_link_url = get_latest_active_link_url(user.id)
 
     app.logger.info(f'Admin {current_user.id} accessed user detail for user {user.id}')
-    return render_template('admin_user_detail.html', user=user, latest_active_url=latest_active_link_url)
+    link_stats = get_link_stats(user.id)
+    return render_template('admin_user_detail.html', user=user, latest_active_url=latest_active_link_url, link_stats=link_stats)
 
 
 ####################################################################################################
@@ -134,6 +154,7 @@ def admin_user_detail(user_id):
 # 引数：user_id (削除するユーザーのID)
 # 返却値：管理者ユーザー一覧ページへのリダイレクト
 # 詳細：指定されたユーザーIDのユーザーを削除し、削除後はユーザー一覧ページにリダイレクトします。
+#       一括削除と同じく、ユーザーに紐づくリンク（閲覧数の集計を含む）やプロジェクトも同じトランザクションで削除します。
 # 
 ####################################################################################################
 @app.route('/admin/user/delete/<int:user_id>', methods=['POST'])
@@ -141,42 +162,82 @@ def admin_user_detail(user_id):
 @admin_required
 def admin_user_delete(user_id):
     user = User.query.get_or_404(user_id)
-    db.session.delete(user)
-    db.session.commit()
-    app.logger.info(f'Admin {current_user.id} deleted user {user.id}')
+    counts = apply_bulk_user_action('delete', [user.id])
+
+    # 件数キャッシュは変更を監視していないため破棄（前方一致インデックスは一括の文を検知して再構築する）
+    clear_count_cache()
+
+    app.logger.info(f'Admin {current_user.id} deleted user {user_id}: {json.dumps(counts)}')
     flash('ユーザーが削除されました。', 'success')
     return redirect(url_for('admin_users'))
 
+####################################################################################################
+# 
+# 関数名：admin_users_bulk_action
+# 引数：action (str) - 'deactivate'（無効化）、'promote'（管理者に昇格）、'delete'（削除）
+#       filters (dict) - admin_users_pagination と同じ検索条件
+#       expected_count (int) - 画面で確認した検索結果の件数（削除・昇格の場合は必須、一致しない場合は実行しない）
+# 返却値：JSON形式の操作結果（テーブルごとの件数と監査記録）
+# 詳細：検索条件に一致するすべてのユーザーに対して、一括で無効化・管理者への昇格・削除を行います。
+#       expected_count は実行直前に数え直した検索結果の件数（管理者自身を含む）と比較します。
+#       操作中の管理者自身は対象から除外します。
+# 
+####################################################################################################
+@app.route('/admin/users/bulk_action', methods=['POST'])
+@login_required
+@admin_required
+def admin_users_bulk_action():
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    filters = data.get('filters') or {}
+    if action not in BULK_USER_ACTIONS or not isinstance(filters, dict):
+        return jsonify({'error': '操作の種類または検索条件が正しくありません。'}), 400
+
+    expected_count = data.get('expected_count')
+    if expected_count is None and action in ('delete', 'promote'):
+        return jsonify({'error': '対象件数を確認してから実行してください。'}), 400
+    if expected_count is not None:
+        try:
+            expected_count = int(expected_count)
+        except (TypeError, ValueError):
+            return jsonify({'error': '対象件数が正しくありません。'}), 400
+
+    query, _ = build_users_query(filters)
+    matched_ids = [user_id for user_id, in query.with_entities(User.id).order_by(User.id)]
+    if expected_count is not None and expected_count != len(matched_ids):
+        return jsonify({'error': '対象件数が変更されています。再度確認してください。', 'matched': len(matched_ids)}), 409
+    user_ids = [user_id for user_id in matched_ids if user_id != current_user.id]
+
+    counts = apply_bulk_user_action(action, user_ids) if user_ids else {'users': 0}
+
+    # 件数キャッシュは変更を監視していないため破棄（前方一致インデックスは一括の文を検知して再構築する）
+    clear_count_cache()
+
+    audit = {
+        'action': action,
+        'admin_id': current_user.id,
+        'filters': {name: value for name, value in filters.items() if value not in (None, '')},
+        'user_ids': user_ids,
+        'counts': counts,
+        'executed_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    app.logger.info(f'Admin bulk action: {json.dumps(audit, ensure_ascii=False)}')
+    return jsonify({'action': action, 'matched': len(user_ids), 'counts': counts, 'audit': audit})
+
 ####################################################################################################
 # 
 # 関数名：admin_projects
 # 引数：なし
 # 返却値：admin_projects.html
-# 詳細：全プロジェクトとその関連テクノロジーを一覧表示するページを提供します。プロジェクトとプロセスを取得し、表示します。
+# 詳細：プロジェクト一覧ページの枠組みを提供します。プロジェクトと関連する技術、プロセスは admin_projects_pagination から画面側で取得します。
 # 
 ####################################################################################################
 @app.route('/admin/projects')
 @login_required
 @admin_required
 def admin_projects():
-    # プロジェクトとその関連テクノロジーを取得
-    projects = Project.query.all()
-
-    # プロジェクトIDを取得
-    project_ids = [project.id for project in projects]
-
-    # プロジェクトに関連するプロセスを取得
-    processes = Process.query.filter(Process.project_id.in_(project_ids)).all()
-
-    # プロジェクトIDごとにプロセスをマッピング
-    project_processes = {}
-    for process in processes:
-        if process.project_id not in project_processes:
-            project_processes[process.project_id] = []
-        project_processes[process.project_id].append(process)
-
     app.logger.info(f'Admin {current_user.id} accessed project list')
-    return render_template('admin_projects.html', projects=projects, project_processes=project_processes)
+    return render_template('admin_projects.html')
 
 ####################################################################################################
 # 
@@ -205,8 +266,8 @@ def admin_project_detail(project_id):
         project.responsibilities = request.form['responsibilities']
 
         # 技術の処理
-        tech_types = ['os', 'language', 'framework', 'database', 'containertech', 'cicd', 'logging', 'tools']
-        for tech_type in tech_types:
+        tech_data = {}
+        for tech_type in TECH_TYPES:
             tech_names = []
             tech_durations = []
             i = 0
@@ -225,57 +286,28 @@ def admin_project_detail(project_id):
                 app.logger.info(f'Duplicate technology name found in {tech_type}')
                 return redirect(url_for('admin_project_detail', project_id=project_id))
 
-            # 既存技術の取得と名前のリスト作成
-            existing_techs = Technology.query.filter_by(project_id=project.id, type=tech_type).all()
-            existing_names = {tech.name for tech in existing_techs}
-
-            # 更新と新規追加
-            for name, duration in zip(tech_names, tech_durations):
-                if name and duration.isdigit() and int(duration) > 0:
-                    if name in existing_names:
-                        tech = next(tech for tech in existing_techs if tech.name == name)
-                        tech.duration_months = int(duration)
-                        app.logger.info(f'Updated technology {name} in {tech_type}')
-                    else:
-                        new_technology = Technology(
-                            project_id=project.id,
-                            type=tech_type,
-                            name=name,
-                            duration_months=int(duration)
-                        )
-                        db.session.add(new_technology)
-                        app.logger.info(f'Added new technology {name} in {tech_type}')
-
-            # 削除処理
-            for tech in existing_techs:
-                if tech.name not in tech_names:
-                    db.session.delete(tech)
-                    app.logger.info(f'Deleted technology {tech.name} from {tech_type}')
+            tech_data[tech_type] = {
+                name: int(duration)
+                for name, duration in zip(tech_names, tech_durations)
+                if name and duration and duration.isdigit() and int(duration) > 0
+            }
 
-        # 工程の処理
+        # 工程の処理（定義済みの工程のみ受け付ける）
         processes = request.form.getlist('process')
-        existing_processes = Process.query.filter_by(project_id=project.id).all()
-        existing_process_names = {process.name for process in existing_processes}
+        selected_processes = [process_name for process_name in ['要件定義', '基本設計', '詳細設計', '実装', '単体テスト', '結合テスト', '受入テスト', '運用・保守'] if process_name in processes]
 
-        for process_name in ['要件定義', '基本設計', '詳細設計', '実装', '単体テスト', '結合テスト', '受入テスト', '運用・保守']:
-            if process_name in processes:
-                if process_name not in existing_process_names:
-                    new_process = Process(project_id=project.id, name=process_name)
-                    db.session.add(new_process)
-                    app.logger.info(f'Added new process {process_name}')
-            else:
-                if process_name in existing_process_names:
-                    process = next(p for p in existing_processes if p.name == process_name)
-                    db.session.delete(process)
-                    app.logger.info(f'Deleted process {process_name}')
+        # 技術と工程の差分を一括で反映し、1回のトランザクションでコミット
+        changes = sync_project_skills(project.id, tech_data, selected_processes)
+        app.logger.info(f'Synced skills for project {project_id}: {changes}')
 
         db.session.commit()
         flash('プロジェクトが更新されました。', 'success')
         app.logger.info(f'Project {project_id} updated successfully')
         return redirect(url_for('admin_project_detail', project_id=project_id))
 
-    technologies = {tech_type: Technology.query.filter_by(project_id=project.id, type=tech_type).all() for tech_type in ['os', 'language', 'framework', 'database', 'containertech', 'cicd', 'logging', 'tools']}
-    processes = [process.name for process in Process.query.filter_by(project_id=project.id).all()]
+    project_techs, project_processes = load_project_skills(project.id)
+    technologies = group_technologies_by_type(project_techs)
+    processes = [process.name for process in project_processes]
 
     return render_template('admin_project_detail.html', project=project, technologies=technologies, processes=processes)
 
@@ -315,7 +347,7 @@ def admin_user_create():
     if request.method == 'POST':
         app.logger.info('Creating a new user')
         username = request.form['username']
-        password = generate_password_hash(request.form['password'])
+        password = hash_password(request.form['password'])
         email = request.form['email']  # メールアドレスの取得
         display_name = request.form.get('display_name')
         age = request.form.get('age')
@@ -348,35 +380,29 @@ def admin_user_create():
 
 ####################################################################################################
 # 
-# 関数名：admin_users_pagination
-# 引数：page (int) - ページ番号
-# 返却値：JSON形式のユーザーデータ
-# 詳細：検索条件に基づいてユーザーをページネーションで取得し、JSON形式で返却します。検索条件にはユーザーID、ユーザー名、メールアドレスなどが含まれます。
+# 関数名：build_users_query
+# 引数：args - リクエストのクエリ引数（検索条件）
+# 返却値：(ユーザーと最新の有効なリンクコードを返すクエリ, 最新の有効なリンクのサブクエリ)
+# 詳細：ユーザー一覧の検索条件からクエリを作成します。一覧、エクスポート、一括操作で同じ条件を共有します。
 # 
 ####################################################################################################
-@app.route('/admin/users_pagination', methods=['GET'])
-@login_required
-@admin_required
-def admin_users_pagination():
-    app.logger.info('admin_users_pagination start')
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-
+def build_users_query(args):
     # 検索条件の取得
-    user_id = request.args.get('user_id')
-    username = request.args.get('username')
-    email = request.args.get('email')
-    display_name = request.args.get('display_name')
-    age = request.args.get('age')
-    gender = request.args.get('gender')
-    nearest_station = request.args.get('nearest_station')
-    experience_years = request.args.get('experience_years')
-    education = request.args.get('education')
-    latest_active_link_url = request.args.get('latest_active_link_url')
-    is_admin = request.args.get('is_admin')
-
-    # クエリの作成
-    query = User.query
+    user_id = args.get('user_id')
+    username = args.get('username')
+    email = args.get('email')
+    display_name = args.get('display_name')
+    age = args.get('age')
+    gender = args.get('gender')
+    nearest_station = args.get('nearest_station')
+    experience_years = args.get('experience_years')
+    education = args.get('education')
+    latest_active_link_url = args.get('latest_active_link_url')
+    is_admin = args.get('is_admin')
+
+    # クエリの作成（最新の有効なリンクを外部結合し、ユーザーごとの問い合わせをなくす）
+    latest_active_link = latest_active_link_subquery()
+    query = db.session.query(User, latest_active_link.c.link_code).outerjoin(latest_active_link, latest_active_link.c.user_id == User.id)
 
     if user_id:
         query = query.filter(User.id == user_id)
@@ -397,8 +423,7 @@ def admin_users_pagination():
     if education:
         query = query.filter(User.education.like(f'%{education}%'))
     if latest_active_link_url:
-        subquery = Link.query.filter(Link.link_code.like(f'%{latest_active_link_url}%')).subquery()
-        query = query.filter(User.id.in_(db.session.query(Link.user_id).filter(Link.is_active == True).filter(Link.link_code.like(f'%{latest_active_link_url}%')).subquery()))
+        query = query.filter(latest_active_link.c.link_code.like(f'%{latest_active_link_url}%'))
     if is_admin is not None:
         if is_admin == 'null':
             query = query.filter(User.is_admin.is_(None))
@@ -407,16 +432,36 @@ def admin_users_pagination():
         elif is_admin == 'false':
             query = query.filter(User.is_admin.is_(False))
 
-    users_paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+    return query, latest_active_link
+
+####################################################################################################
+# 
+# 関数名：admin_users_pagination
+# 引数：cursor (str) - 前後のページを指すカーソルトークン（最初のページは省略）
+#       per_page (int) - 1ページあたりの件数（最大100件）
+#       total (str) - '0' の場合は件数を返却しない
+# 返却値：JSON形式のユーザーデータ
+# 詳細：検索条件に基づいてユーザーをユーザーID順のカーソルページネーションで取得し、JSON形式で返却します。検索条件にはユーザーID、ユーザー名、メールアドレスなどが含まれます。
+#       件数は絞り込み条件ごとに一定時間キャッシュされます。
+# 
+####################################################################################################
+@app.route('/admin/users_pagination', methods=['GET'])
+@login_required
+@admin_required
+def admin_users_pagination():
+    app.logger.info('admin_users_pagination start')
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+
+    # 検索条件に基づくクエリの作成
+    query, latest_active_link = build_users_query(request.args)
 
-    users = users_paginated.items
-    total = users_paginated.total
-    pages = users_paginated.pages
+    users, next_cursor, prev_cursor = keyset_paginate(query, User.id, lambda row: row[0].id, cursor, per_page)
+    total = cached_count(pagination_cache_key(request.args), query) if request.args.get('total') != '0' else None
 
     users_data = []
-    for user in users:
-        latest_active_link = db.session.query(Link).filter_by(user_id=user.id, is_active=True).order_by(Link.created_at.desc()).first()
-        latest_active_link_url = url_for('view_sheet', link_code=latest_active_link.link_code, _external=True) if latest_active_link else None
+    for user, link_code in users:
+        latest_active_link_url = url_for('view_sheet', link_code=link_code, _external=True) if link_code else None
 
         users_data.append({
             'id': user.id,
@@ -436,10 +481,27 @@ def admin_users_pagination():
     return jsonify({
         'users': users_data,
         'total': total,
-        'pages': pages,
-        'current_page': page
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
     })
 
+####################################################################################################
+# 
+# 関数名：admin_users_suggest
+# 引数：q (str) - 入力中の文字列、limit (int) - 取得する件数
+# 返却値：JSON形式のユーザー候補
+# 詳細：ユーザー名、メールアドレス、表示名、最寄り駅、学歴のいずれかが前方一致するユーザーを、
+#       プロセス内の前方一致インデックスから返却します。DBへの問い合わせは行いません。
+# 
+####################################################################################################
+@app.route('/admin/users/suggest', methods=['GET'])
+@login_required
+@admin_required
+def admin_users_suggest():
+    prefix = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify({'users': user_prefix_index.suggest(prefix, limit=limit)})
+
 ####################################################################################################
 # 
 # 関数名：create_admin
@@ -457,7 +519,7 @@ def create_admin():
     username = request.form.get('username')
     password = request.form.get('password')
     if username and password:
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = hash_password(password)
         admin_user = User(username=username, password=hashed_password, is_admin=True)
         db.session.add(admin_user)
         db.session.commit()
@@ -534,58 +596,75 @@ def admin_project_create():
     return render_template('admin_project_create.html')
 ####################################################################################################
 # 
-# 関数名：admin_projects_pagination
-# 引数：page (int) - ページ番号
-# 返却値：JSON形式のプロジェクトデータ
-# 詳細：検索条件に基づいてプロジェクトをページネーションで取得し、JSON形式で返却します。検索条件にはプロジェクトID、プロジェクト名、業界、開始月、終了月などが含まれます。
+# 関数名：build_projects_query
+# 引数：args - リクエストのクエリ引数（検索条件）
+# 返却値：プロジェクトのクエリ
+# 詳細：プロジェクト一覧の検索条件からクエリを作成します。一覧とエクスポートで同じ条件を共有します。
 # 
 ####################################################################################################
-@app.route('/admin/projects_pagination', methods=['GET'])
-@login_required
-@admin_required
-def admin_projects_pagination():
-    app.logger.info('admin_projects_pagination start')
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-
+def build_projects_query(args):
     # 検索条件の取得
-    project_id = request.args.get('project_id')
-    project_name = request.args.get('project_name')
-    industry = request.args.get('industry')
-    start_month = request.args.get('start_month')
-    end_month = request.args.get('end_month')
-    project_summary = request.args.get('project_summary')
-    responsibilities = request.args.get('responsibilities')
-    technologies = request.args.get('technologies')
-    processes = request.args.get('processes')
+    project_id = args.get('project_id')
+    project_name = args.get('project_name')
+    industry = args.get('industry')
+    start_month = args.get('start_month')
+    end_month = args.get('end_month')
+    project_summary = args.get('project_summary')
+    responsibilities = args.get('responsibilities')
+    technologies = args.get('technologies')
+    processes = args.get('processes')
 
     # クエリの作成
     query = Project.query
 
     if project_id:
         query = query.filter(Project.id == project_id)
-    if project_name:
-        query = query.filter(Project.project_name.like(f'%{project_name}%'))
-    if industry:
-        query = query.filter(Project.industry.like(f'%{industry}%'))
     if start_month:
         query = query.filter(Project.start_month >= start_month)
     if end_month:
         query = query.filter(Project.end_month <= end_month)
-    if project_summary:
-        query = query.filter(Project.project_summary.like(f'%{project_summary}%'))
-    if responsibilities:
-        query = query.filter(Project.responsibilities.like(f'%{responsibilities}%'))
+
+    # テキスト項目は全文検索の索引で絞り込む
+    query = filter_projects_by_text(query, {
+        'project_name': project_name,
+        'industry': industry,
+        'project_summary': project_summary,
+        'responsibilities': responsibilities,
+    })
+    # 技術と工程はEXISTSで絞り込み、結合による行の重複を防ぐ
     if technologies:
-        query = query.join(Project.technologies).filter(Technology.name.like(f'%{technologies}%'))
+        query = query.filter(Project.technologies.any(Technology.name.like(f'%{technologies}%')))
     if processes:
-        query = query.join(Project.processes).filter(Process.name.like(f'%{processes}%'))
+        query = query.filter(Project.processes.any(Process.name.like(f'%{processes}%')))
 
-    projects_paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+    return query
 
-    projects = projects_paginated.items
-    total = projects_paginated.total
-    pages = projects_paginated.pages
+####################################################################################################
+# 
+# 関数名：admin_projects_pagination
+# 引数：cursor (str) - 前後のページを指すカーソルトークン（最初のページは省略）
+#       per_page (int) - 1ページあたりの件数（最大100件）
+#       total (str) - '0' の場合は件数を返却しない
+# 返却値：JSON形式のプロジェクトデータ
+# 詳細：検索条件に基づいてプロジェクトをプロジェクトID順のカーソルページネーションで取得し、JSON形式で返却します。検索条件にはプロジェクトID、プロジェクト名、業界、開始月、終了月などが含まれます。
+#       件数は絞り込み条件ごとに一定時間キャッシュされます。
+# 
+####################################################################################################
+@app.route('/admin/projects_pagination', methods=['GET'])
+@login_required
+@admin_required
+def admin_projects_pagination():
+    app.logger.info('admin_projects_pagination start')
+    cursor = request.args.get('cursor')
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+
+    # 検索条件に基づくクエリの作成
+    query = build_projects_query(request.args)
+
+    # 技術と工程はページ内のプロジェクト分をまとめて取得
+    page_query = query.options(selectinload(Project.technologies), selectinload(Project.processes))
+    projects, next_cursor, prev_cursor = keyset_paginate(page_query, Project.id, lambda project: project.id, cursor, per_page)
+    total = cached_count(pagination_cache_key(request.args), query) if request.args.get('total') != '0' else None
 
     projects_data = []
     for project in projects:
@@ -608,19 +687,210 @@ def admin_projects_pagination():
     return jsonify({
         'projects': projects_data,
         'total': total,
-        'pages': pages,
-        'current_page': page
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
     })
 
 
 
 
+####################################################################################################
+# 
+# 関数名：admin_talent_search
+# 引数：q (str) - スキルの検索条件（例：「Java >= 36 AND AWS >= 12 AND 工程:基本設計」）
+# 返却値：admin_talent_search.html
+# 詳細：案件の条件に合うエンジニアを、事前に集計したスキル索引から検索し、条件に一致した技術の合計使用期間の長い順に表示します。
+# 
+####################################################################################################
+@app.route('/admin/talent_search', methods=['GET'])
+@login_required
+@admin_required
+def admin_talent_search():
+    query = request.args.get('q', '').strip()
+    results = skill_index.search(query, limit=50) if query else []
+
+    # 表示用のユーザー情報をまとめて取得
+    user_ids = [result['user_id'] for result in results]
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    candidates = [dict(result, user=users[result['user_id']]) for result in results if result['user_id'] in users]
+
+    app.logger.info(f'Admin {current_user.id} searched talents: {len(candidates)} candidates')
+    return render_template('admin_talent_search.html', query=query, candidates=candidates)
+
+####################################################################################################
+# 
+# 関数名：admin_candidate_match
+# 引数：required (str) - 必須スキル（1行に「技術名, 必要な使用期間, 重み」）
+#       preferred (str) - 歓迎スキル（同上）
+#       limit (int) - 表示する候補者数
+# 返却値：admin_candidate_match.html、または JSON で送信された場合は候補者のリスト
+# 詳細：案件のスキル要件に対する全ユーザーのマッチ度を計算し、スコアの高い順に表示します。
+#       JSON では {"required": [{"name", "months", "weight"}], "preferred": [...], "limit"} を受け付けます。
+# 
+####################################################################################################
+@app.route('/admin/candidate_match', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def admin_candidate_match():
+    form = request.form if request.method == 'POST' else request.args
+    try:
+        if request.is_json:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or not all(isinstance(data.get(key, []), list) for key in ('required', 'preferred')):
+                return jsonify({'error': 'スキル要件の形式が正しくありません。'}), 400
+            requirements = [
+                build_requirement(item.get('name', ''), item.get('months'), item.get('weight'), required)
+                for key, required in (('required', True), ('preferred', False))
+                for item in data.get(key, []) if isinstance(item, dict)
+            ]
+            limit = data.get('limit', 20)
+        else:
+            requirements = parse_requirement_lines(form.get('required', ''), True) + parse_requirement_lines(form.get('preferred', ''), False)
+            limit = form.get('limit', 20)
+    except ValueError:
+        # 使用期間や重みに有限でない値（nan、inf）が指定された場合
+        if request.is_json:
+            return jsonify({'error': 'スキル要件の形式が正しくありません。'}), 400
+        flash('スキル要件の形式が正しくありません。', 'danger')
+        requirements, limit = [], 20
+    try:
+        limit = min(max(int(limit), 1), 100)
+    except (TypeError, ValueError, OverflowError):
+        limit = 20
+
+    results = match_candidates(requirements, limit) if requirements else []
+
+    # 表示用のユーザー情報をまとめて取得
+    user_ids = [result['user_id'] for result in results]
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    candidates = [dict(result, user=users[result['user_id']]) for result in results if result['user_id'] in users]
+    app.logger.info(f'Admin {current_user.id} matched candidates for {len(requirements)} requirements: {len(candidates)} candidates')
+
+    if request.is_json:
+        return jsonify({
+            'candidates': [{
+                'id': candidate['user'].id,
+                'username': candidate['user'].username,
+                'display_name': candidate['user'].display_name,
+                'score': candidate['score'],
+                'skills': candidate['skills'],
+                'missing_required': candidate['missing_required'],
+            } for candidate in candidates],
+        })
+
+    return render_template('admin_candidate_match.html', candidates=candidates, searched=bool(requirements),
+                           required=form.get('required', ''), preferred=form.get('preferred', ''))
+
+####################################################################################################
+# 
+# 関数名：admin_export_users
+# 引数：format (str) - 'csv'（既定）または 'jsonl'、その他は admin_users_pagination と同じ検索条件
+# 返却値：CSVまたはJSONL形式のユーザーデータ（ストリーミング）
+# 詳細：検索条件に一致するユーザーをユーザーID順に一定件数ずつ取得しながら出力します。
+# 
+####################################################################################################
+@app.route('/admin/export/users', methods=['GET'])
+@login_required
+@admin_required
+def admin_export_users():
+    export_format = request.args.get('format', 'csv')
+    app.logger.info(f'Admin {current_user.id} exported users as {export_format}')
+
+    query, latest_active_link = build_users_query(request.args)
+    columns = ['id', 'username', 'email', 'display_name', 'age', 'gender', 'nearest_station', 'experience_years', 'education', 'latest_active_link_url', 'is_admin', 'created_at']
+    query = query.with_entities(
+        User.id, User.username, User.email, User.display_name, User.age, User.gender,
+        User.nearest_station, User.experience_years, User.education,
+        latest_active_link.c.link_code, User.is_admin, User.created_at
+    ).order_by(User.id).yield_per(EXPORT_BATCH_SIZE)
+
+    def generate_rows():
+        for row in query:
+            data = row._asdict()
+            link_code = data.pop('link_code')
+            data['latest_active_link_url'] = url_for('view_sheet', link_code=link_code, _external=True) if link_code else None
+            yield data
+
+    return export_response('users', columns, generate_rows(), export_format)
+
+####################################################################################################
+# 
+# 関数名：admin_export_projects
+# 引数：format (str) - 'csv'（既定）または 'jsonl'、その他は admin_projects_pagination と同じ検索条件
+# 返却値：CSVまたはJSONL形式のプロジェクトデータ（ストリーミング）
+# 詳細：検索条件に一致するプロジェクトをプロジェクトID順にキーセットで一定件数ずつ取得し、技術、工程とともに出力します。
+# 
+####################################################################################################
+@app.route('/admin/export/projects', methods=['GET'])
+@login_required
+@admin_required
+def admin_export_projects():
+    export_format = request.args.get('format', 'csv')
+    app.logger.info(f'Admin {current_user.id} exported projects as {export_format}')
+
+    query = build_projects_query(request.args).with_entities(
+        Project.id, Project.user_id, Project.project_name, Project.industry, Project.start_month,
+        Project.end_month, Project.project_summary, Project.responsibilities
+    )
+    columns = ['id', 'user_id', 'project_name', 'industry', 'start_month', 'end_month', 'project_summary', 'responsibilities', 'technologies', 'processes']
+
+    def names_by_project(model, project_ids):
+        names = {}
+        for project_id, name in db.session.query(model.project_id, model.name).filter(model.project_id.in_(project_ids)).order_by(model.id):
+            names.setdefault(project_id, []).append(name)
+        return names
+
+    def generate_rows():
+        for batch in iter_keyset_batches(query, Project.id):
+            # 技術と工程はバッチごとに IN 句で1回ずつ取得する
+            project_ids = [row.id for row in batch]
+            technologies = names_by_project(Technology, project_ids)
+            processes = names_by_project(Process, project_ids)
+            for row in batch:
+                data = row._asdict()
+                data['technologies'] = ', '.join(technologies.get(row.id, []))
+                data['processes'] = ', '.join(processes.get(row.id, []))
+                yield data
+
+    return export_response('projects', columns, generate_rows(), export_format)
+
+####################################################################################################
+# 
+# 関数名：admin_projects_search
+# 引数：q (str) - 検索語、limit (int) - 取得する件数
+# 返却値：JSON形式のプロジェクトデータ
+# 詳細：プロジェクト名、業界、プロジェクト概要、担当業務を対象に全文検索を行い、関連度の高い順に返却します。
+# 
+####################################################################################################
+@app.route('/admin/projects_search', methods=['GET'])
+@login_required
+@admin_required
+def admin_projects_search():
+    keyword = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 50, type=int), 200)
+
+    projects_data = []
+    for project, score in search_projects(keyword, limit=limit):
+        projects_data.append({
+            'id': project.id,
+            'project_name': project.project_name,
+            'industry': project.industry,
+            'start_month': project.start_month,
+            'end_month': project.end_month,
+            'score': score,
+        })
+
+    app.logger.info(f'admin_projects_search returned {len(projects_data)} projects')
+    return jsonify({'projects': projects_data})
+
+
 ####################################################################################################
 # 
 # 関数名：admin_logs
-# 引数：なし
+# 引数：page (int) - ページ番号（1始まり）
 # 返却値：HTMLテンプレート
-# 詳細：ログファイルから最新の10日間のログを読み込み、表示するためのHTMLテンプレートに渡します。ログファイルが存在しない場合はエラーログを記録します。
+# 詳細：最新の10日間のログを新しい順にページ単位で表示するためのHTMLテンプレートに渡します。
+#       ログファイルは末尾からローテーション済みのファイルへ向かって逆順に読み込み、表示するページ分だけを読み込みます。
 # 
 ####################################################################################################
 @app.route('/admin/logs')
@@ -629,32 +899,119 @@ def admin_projects_pagination():
 def admin_logs():
     app.logger.info('Fetching logs for admin dashboard')
 
-    logs = []
-    log_file_path = 'logs/skill_canvas.log'
-    
-    # 最新の10日分のログを保持するためのリスト
-    recent_logs = []
-    now = datetime.now()
-
-    try:
-        with open(log_file_path, 'r') as log_file:
-            for line in log_file:
-                # ログのタイムスタンプを抽出してパースする
-                try:
-                    timestamp_str = line.split()[0] + ' ' + line.split()[1]
-                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S,%f')
-                except ValueError:
-                    continue
-                
-                # 最新の10日以内のログをリストに追加
-                if now - timedelta(days=10) <= timestamp <= now:
-                    recent_logs.append(line)
-    except FileNotFoundError:
+    page = request.args.get('page', 1, type=int) or 1
+    page = max(page, 1)
+    recent_logs, has_next = read_recent_logs(file_handler, days=10, page=page, per_page=100)
+    if not recent_logs and page == 1 and not log_file_paths(file_handler):
         app.logger.error('Log file not found.')
 
     app.logger.info('Logs fetched and rendered successfully')
-    # 最新の10日分のログを表示
-    return render_template('admin_logs.html', logs=recent_logs)
+    # 最新の10日分のログを新しい順に表示
+    return render_template('admin_logs.html', logs=recent_logs, page=page, has_next=has_next)
+
+####################################################################################################
+# 
+# 関数名：admin_logs_stream
+# 引数：level (str) - 表示する最低の重要度（省略可）
+#       Last-Event-ID ヘッダー - 前回受信した位置（"inode:offset" 形式、ブラウザが再接続時に自動で送信）
+# 返却値：Server-Sent Events 形式のレスポンス
+# 詳細：ログファイルに追記された行だけを順に送信します。ローテーションされた場合は新しいファイルに切り替えます。
+#       一定時間で接続を終了し、ブラウザの再接続時は Last-Event-ID の位置から再開します。
+# 
+####################################################################################################
+@app.route('/admin/logs/stream')
+@login_required
+@admin_required
+def admin_logs_stream():
+    level = request.args.get('level', '')
+    min_level = getattr(logging, level) if level in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL') else None
+
+    inode = offset = None
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if re.fullmatch(r'\d+:\d+', last_event_id):
+        inode, offset = (int(value) for value in last_event_id.split(':'))
+
+    lines = follow_log_file(
+        file_handler.baseFilename, inode=inode, offset=offset,
+        poll_interval=app.config['LOG_STREAM_POLL_INTERVAL'],
+        heartbeat_interval=app.config['LOG_STREAM_HEARTBEAT_INTERVAL'],
+        max_seconds=app.config['LOG_STREAM_MAX_SECONDS'],
+    )
+
+    def generate():
+        yield 'retry: 3000\n\n'
+        visible = True
+        for item in lines:
+            if item is None:
+                # 接続確認（切断されたクライアントはここで検出される）
+                yield ': keepalive\n\n'
+                continue
+            line, line_inode, line_offset = item
+            if min_level is not None:
+                line_level = log_line_level(line)
+                # トレースバックなどの継続行は直前の行の判定に従う
+                if line_level is not None:
+                    visible = getattr(logging, line_level, logging.INFO) >= min_level
+                if not visible:
+                    continue
+            yield f'id: {line_inode}:{line_offset}\ndata: {line}\n\n'
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+####################################################################################################
+# 
+# 関数名：admin_log_records
+# 引数：level (str) - 表示する最低の重要度
+#       user_id (int) - ユーザーID
+#       endpoint (str) - エンドポイント名
+#       request_id (str) - リクエストID
+#       since / until (str) - 期間（YYYY-MM-DDTHH:MM形式）
+#       before (int) - 前のページの最後のログのID
+# 返却値：HTMLテンプレート
+# 詳細：構造化ログを重要度、ユーザー、エンドポイント、期間で絞り込み、新しい順にページ単位で表示します。
+# 
+####################################################################################################
+@app.route('/admin/logs/records')
+@login_required
+@admin_required
+def admin_log_records():
+    def parse_datetime(value):
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    filters = {
+        'level': request.args.get('level', ''),
+        'user_id': request.args.get('user_id', type=int),
+        'endpoint': request.args.get('endpoint', '').strip(),
+        'request_id': request.args.get('request_id', '').strip(),
+        'since': parse_datetime(request.args.get('since')),
+        'until': parse_datetime(request.args.get('until')),
+    }
+    records, next_cursor = query_log_records(before_id=request.args.get('before', type=int), per_page=100, **filters)
+
+    # 次のページへのリンクで引き継ぐ検索条件
+    next_args = {name: value for name, value in request.args.items() if name != 'before' and value}
+    return render_template('admin_log_records.html', records=records, next_cursor=next_cursor, next_args=next_args,
+                           levels=LOG_LEVELS, args=request.args)
+
+####################################################################################################
+# 
+# 関数名：admin_slow_queries
+# 引数：なし
+# 返却値：HTMLテンプレート
+# 詳細：スロークエリログから最新のスロークエリを読み込み、実行計画とともに表示するためのHTMLテンプレートに渡します。
+# 
+####################################################################################################
+@app.route('/admin/slow_queries')
+@login_required
+@admin_required
+def admin_slow_queries():
+    app.logger.info('Fetching slow queries for admin dashboard')
+    slow_queries = read_slow_queries(limit=100)
+    return render_template('admin_slow_queries.html', slow_queries=slow_queries, threshold=app.config['SLOW_QUERY_THRESHOLD'])
 
 ####################################################################################################
 # 
@@ -697,6 +1054,8 @@ def reply_contact(contact_id):
                     recipients=[contact.email])
         msg.body = reply_message
         mail.send(msg)
+        contact.replied_at = datetime.now()
+        db.session.commit()
         app.logger.info(f'Reply sent to contact_id: {contact_id}')
         flash('返信が送信されました。', 'success')
         return redirect(url_for('admin_contacts'))
@@ -1,18 +1,21 @@
 from imports import *
 from run import *
+from utils.user_cache import *
+from utils.auth_utils import *
 
 ####################################################################################################
 # 
 # 関数名：load_user
 # 引数：user_id（ユーザーID）
-# 返却値：User オブジェクト
+# 返却値：CachedUser オブジェクト
 # 詳細：ユーザーIDに基づいてユーザーをロードする
+#       認証が必要なリクエストごとにDBに問い合わせないよう、プロセス内のキャッシュを優先する
 # 
 ####################################################################################################
 @login_manager.user_loader # type: ignore
 def load_user(user_id):
     # print("管理者ユーザーが追加されました。")
-    return User.query.get(int(user_id))
+    return get_cached_user(int(user_id))
 
 ####################################################################################################
 # 
@@ -39,17 +42,26 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
+
+        # ハッシュ計算の前に流量制限を確認
+        if throttle_login(username):
+            flash('ログインの試行回数が多すぎます。しばらくしてから再度お試しください。', 'danger')
+            return render_template('login.html'), 429
+
         user = User.query.filter_by(username=username).first() # type: ignore
 
-        if user and user.check_password(password):
+        if user and verify_password(user, password):
             if not user.is_active:
                 flash('Account not confirmed. Please check your email.', 'warning')
                 return redirect(url_for('login'))
 
+            # ハッシュ方式を変更した場合は再ハッシュしたパスワードを保存
+            db.session.commit()
             login_user(user)
             app.logger.info(f'User {username} logged in successfully.')
             return redirect(url_for('index'))
         
+        record_login_failure(username)
         app.logger.warning(f'Failed login attempt for username: {username}')
         flash('Invalid username or password', 'danger')
 
@@ -100,7 +112,7 @@ def reset_password(token):
         password = request.form['password']
         user = User.query.filter_by(email=email).first()
         if user:
-            user.password = generate_password_hash(password, method='pbkdf2:sha256')
+            user.password = hash_password(password)
             db.session.commit()
             flash('Your password has been updated!', 'success')
             return redirect(url_for('login'))
@@ -1,5 +1,9 @@
 from imports import *
 from run import *
+from utils.link_utils import *
+from utils.link_stats import *
+from utils.sheet_utils import *
+from utils.snapshot_utils import *
 
 ####################################################################################################
 # 
@@ -13,31 +17,27 @@ from run import *
 def download_pdf(link_code):
     app.logger.info(f'Received request to download PDF with link_code: {link_code}')
 
-    # リンクコードに対応するリンクを取得
-    link = Link.query.filter_by(link_code=link_code, is_active=True).first()
+    # リンクコードに対応するリンクを取得（キャッシュを優先）
+    link = resolve_link_code(link_code)
     if link is None:
         app.logger.warning(f'Invalid link_code provided: {link_code}')
         flash('無効なリンクです。', 'error')
-        return redirect(url_for('invalid'))
+        return render_template('invalid.html', current_url=request.url)
+
+    # ダウンロード数はメモリ上で数え、まとめてDBに書き込む
+    link_stats_buffer.record(link, 'pdf_downloads')
+
+    # スナップショットのリンクは作成時に出力したPDFをそのまま返却する
+    if link.snapshot_digest:
+        return send_snapshot_file(link, 'pdf', link_code)
 
     # スキルシートのデータを取得
     user_id = link.user_id
-    user = User.query.get_or_404(user_id)
-    projects = Project.query.filter_by(user_id=user_id).all()
-    project_data = []
-
-    for project in projects:
-        technologies = Technology.query.filter_by(project_id=project.id).all()
-        processes = Process.query.filter_by(project_id=project.id).all()
-        project_data.append({
-            'project': project,
-            'technologies': technologies,
-            'processes': processes
-        })
+    user, project_data = build_pdf_project_data(user_id)
 
     app.logger.info(f'Generating PDF for user_id: {user_id}')
     # PDF生成
     pdf_buffer = generate_pdf(user, project_data)
     app.logger.info(f'PDF generated successfully for user_id: {user_id}')
     
-    return send_file(pdf_buffer, as_attachment=True, download_name='スキルシート_'+user.username+'.pdf', mimetype='application/pdf')
+    return send_file(pdf_buffer, as_attachment=True, download_name=pdf_download_name(user), mimetype='application/pdf')
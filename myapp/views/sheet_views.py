@@ -1,6 +1,11 @@
 
 from imports import *
 from run import *
+from utils.project_utils import *
+from utils.link_utils import *
+from utils.link_stats import *
+from utils.sheet_utils import *
+from utils.snapshot_utils import *
 
 
 ####################################################################################################
@@ -178,14 +183,15 @@ def sheet():
         skills_by_category_formatted[category] = skills_list
 
     # 最新のアクティブなリンクを取得
-    active_link = Link.query.filter_by(user_id=user_id, is_active=True).order_by(Link.created_at.desc()).first()
+    link_url = get_latest_active_link_url(user_id)
 
-    link_url = url_for('view_sheet', link_code=active_link.link_code, _external=True) if active_link else None
+    # 共有リンクの閲覧状況
+    link_stats = get_link_stats(user_id)
 
     # `user.experience_years` が None の場合に備えてデフォルト値を設定
     experience_years = current_user.experience_years or 0
 
-    return render_template('sheet.html', user=current_user, projects=project_data, individual_developments=individual_dev_data, skills_by_category=skills_by_category_formatted, tech_type_mapping=tech_type_mapping, link_url=link_url, experience_years=experience_years)
+    return render_template('sheet.html', user=current_user, projects=project_data, individual_developments=individual_dev_data, skills_by_category=skills_by_category_formatted, tech_type_mapping=tech_type_mapping, link_url=link_url, experience_years=experience_years, link_stats=link_stats)
 
 
 ####################################################################################################
@@ -200,12 +206,14 @@ def sheet():
 @login_required
 def edit_profile():
     if request.method == 'POST':
-        current_user.display_name = request.form['display_name']
-        current_user.age = request.form['age']
-        current_user.gender = request.form['gender']
-        current_user.nearest_station = request.form['nearest_station']
-        current_user.experience_years = request.form['experience_years']
-        current_user.education = request.form['education']
+        # current_user はキャッシュされた読み取り専用のユーザーのため、DBから取得したユーザーを更新する
+        user = db.session.get(User, current_user.id)
+        user.display_name = request.form['display_name']
+        user.age = request.form['age']
+        user.gender = request.form['gender']
+        user.nearest_station = request.form['nearest_station']
+        user.experience_years = request.form['experience_years']
+        user.education = request.form['education']
         db.session.commit()
         flash('プロフィール情報が更新されました。', 'success')
         return redirect(url_for('sheet'))
@@ -224,7 +232,7 @@ def edit_profile():
 def edit_project(project_id):
     project = Project.query.get_or_404(project_id)
     
-    tech_types = ['os', 'language', 'framework', 'database', 'containertech', 'cicd', 'logging', 'tools']
+    tech_types = TECH_TYPES
 
     if request.method == 'POST':
         # プロジェクトの基本情報を更新
@@ -236,6 +244,7 @@ def edit_project(project_id):
         project.responsibilities = request.form['responsibilities']
 
         # 技術の処理
+        tech_data = {}
         for tech_type in tech_types:
             tech_names = [request.form.get(f'{tech_type}_{i}') for i in range(len(request.form)) if f'{tech_type}_{i}' in request.form]
             tech_durations = [request.form.get(f'{tech_type}_{i}_num') for i in range(len(request.form)) if f'{tech_type}_{i}_num' in request.form]
@@ -245,89 +254,79 @@ def edit_project(project_id):
                 flash('技術名が重複しています。修正してください。', 'error')
                 return redirect(url_for('edit_project', project_id=project.id))
 
-            existing_techs = Technology.query.filter_by(project_id=project.id, type=tech_type).all()
-            existing_names = {tech.name for tech in existing_techs}
-
-            # 新しい技術を追加または更新
-            for name, duration in zip(tech_names, tech_durations):
-                if name and duration.isdigit() and int(duration) > 0:
-                    if name in existing_names:
-                        tech = next(tech for tech in existing_techs if tech.name == name)
-                        tech.duration_months = int(duration)
-                    else:
-                        new_technology = Technology(
-                            project_id=project.id,
-                            type=tech_type,
-                            name=name,
-                            duration_months=int(duration)
-                        )
-                        db.session.add(new_technology)
-            
-            # 削除された技術を特定して削除
-            submitted_names = set(tech_names)
-            for tech in existing_techs:
-                if tech.name not in submitted_names:
-                    db.session.delete(tech)
-        
-        db.session.commit()
+            tech_data[tech_type] = {
+                name: int(duration)
+                for name, duration in zip(tech_names, tech_durations)
+                if name and duration.isdigit() and int(duration) > 0
+            }
 
-        # 担当工程の処理
+        # 技術と担当工程の差分を一括で反映し、1回のトランザクションでコミット
         selected_processes = request.form.getlist('process')
-        existing_processes = Process.query.filter_by(project_id=project.id).all()
-        existing_process_names = {process.name for process in existing_processes}
-
-        for process_name in selected_processes:
-            if process_name not in existing_process_names:
-                new_process = Process(
-                    project_id=project.id,
-                    name=process_name
-                )
-                db.session.add(new_process)
-        
-        for process in existing_processes:
-            if process.name not in selected_processes:
-                db.session.delete(process)
-                
+        sync_project_skills(project.id, tech_data, selected_processes)
         db.session.commit()
 
         flash('プロジェクトが更新されました', 'success')
         return redirect(url_for('edit_project', project_id=project.id))
 
-    technologies = {}
+    project_techs, project_processes = load_project_skills(project.id)
+    technologies = group_technologies_by_type(project_techs)
     for tech_type in tech_types:
-        techs = Technology.query.filter_by(project_id=project.id, type=tech_type).all()
-        if not techs:
-            techs = [{'name': '', 'duration_months': ''}]  # 空のリストを渡す
-        technologies[tech_type] = techs
+        if not technologies[tech_type]:
+            technologies[tech_type] = [{'name': '', 'duration_months': ''}]  # 空のリストを渡す
 
-    processes = [process.name for process in Process.query.filter_by(project_id=project.id).all()]
+    processes = [process.name for process in project_processes]
 
     return render_template('edit_project.html', project=project, processes=processes, technologies=technologies)
 
 ####################################################################################################
 # 
 # 関数名：create_link
-# 引数：なし
-# 返却値：JSON（リンクURLを含む）
+# 引数：expires_in_days（JSONまたはフォーム、省略時は無期限）
+#       snapshot（JSONまたはフォーム、true の場合は作成時点の内容を固定したリンクを作成）
+# 返却値：JSON（リンクURLと有効期限を含む）
 # 詳細：新しいリンクを作成し、現在のアクティブなリンクを無効化する
+#       有効期限は LINK_EXPIRES_DAYS_CHOICES の日数から選択する
+#       スナップショットのリンクは、閲覧画面とPDFを作成時に出力し、以降は出力したファイルを返却する
 # 
 ####################################################################################################
 @app.route('/create_link', methods=['POST'])
 @login_required
 def create_link():
+    data = request.get_json(silent=True) or request.form
+    expires_in_days = data.get('expires_in_days')
+    expires_at = None
+    if expires_in_days not in (None, ''):
+        try:
+            expires_in_days = int(expires_in_days)
+        except (TypeError, ValueError):
+            expires_in_days = None
+        if expires_in_days not in app.config['LINK_EXPIRES_DAYS_CHOICES']:
+            return jsonify({'error': '有効期限が正しくありません。'}), 400
+        expires_at = datetime.now() + timedelta(days=expires_in_days)
+    snapshot = data.get('snapshot') in (True, 'true', 'on', '1')
 
     new_link = Link(
         user_id=current_user.id,
-        link_code=str(uuid.uuid4()),
-        is_active=True
+        link_code=str(uuid.uuid4()),  # リンクIDの採番後に署名付きのコードに置き換える
+        is_active=True,
+        expires_at=expires_at
     )
     db.session.add(new_link)
+    db.session.flush()
+    new_link.link_code = generate_link_code(new_link)
+    if snapshot:
+        try:
+            new_link.snapshot_digest = create_link_snapshot(new_link)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f'Error creating snapshot for user_id: {current_user.id} - {str(e)}')
+            return jsonify({'error': 'スナップショットの作成に失敗しました。'}), 500
     db.session.commit()
 
     # リンクURLを生成
     link_url = url_for('view_sheet', link_code=new_link.link_code, _external=True)
 
-    return jsonify({'link': link_url})
+    return jsonify({'link': link_url, 'expires_at': expires_at.strftime('%Y-%m-%d %H:%M') if expires_at else None, 'snapshot': snapshot})
 
 ####################################################################################################
 # 
@@ -340,81 +339,22 @@ def create_link():
 
 @app.route('/view_sheet/<link_code>', methods=['GET'])
 def view_sheet(link_code):
-    # リンクコードに対応するリンクを取得
-    link = Link.query.filter_by(link_code=link_code, is_active=True).first()
+    # リンクコードに対応するリンクを取得（キャッシュを優先）
+    link = resolve_link_code(link_code)
     if link is None:
         flash('無効なリンクです。', 'error')
         current_url = request.url
         return render_template('invalid.html', current_url=current_url)
 
-    # リンクが有効な場合、スキルシートを表示するためデータを受け渡し
-    user_id = link.user_id
-    user = User.query.get_or_404(user_id)
-    projects = Project.query.filter_by(user_id=user_id).all()
-    individual_developments = IndividualDevelopment.query.filter_by(user_id=user_id).all()
-    
-    project_data = []
-    individual_dev_data = []
-    skills_by_category = {}
+    # 閲覧数はメモリ上で数え、まとめてDBに書き込む
+    link_stats_buffer.record(link, 'views')
 
-    tech_type_mapping = {
-        'os': 'OS',
-        'language': '言語',
-        'framework': 'フレームワーク',
-        'database': 'データベース',
-        'containertech': 'コンテナ技術',
-        'cicd': 'CI/CD',
-        'logging': 'ログ',
-        'tools': 'その他ツール'
-    }
+    # スナップショットのリンクは作成時に出力したファイルをそのまま返却する
+    if link.snapshot_digest:
+        return send_snapshot_file(link, 'html', link_code)
 
-    for project in projects:
-        technologies = Technology.query.filter_by(project_id=project.id).all()
-        processes = Process.query.filter_by(project_id=project.id).all()
-        
-        for tech in technologies:
-            tech_type = tech_type_mapping[tech.type]
-            if tech_type not in skills_by_category:
-                skills_by_category[tech_type] = {}
-            
-            if tech.name not in skills_by_category[tech_type]:
-                skills_by_category[tech_type][tech.name] = tech.duration_months
-            else:
-                skills_by_category[tech_type][tech.name] += tech.duration_months
-        
-        project_data.append({
-            'project': project,
-            'technologies': technologies,
-            'processes': processes
-        })
-
-    # 個人開発データの取得
-    for dev in individual_developments:
-        processes = IndividualProcess.query.filter_by(individual_development_id=dev.id).all()
-        technologies = IndividualTechnology.query.filter_by(individual_development_id=dev.id).all()
-        
-        for tech in technologies:
-            tech_type = tech_type_mapping[tech.type]
-            if tech_type not in skills_by_category:
-                skills_by_category[tech_type] = {}
-            
-            if tech.name not in skills_by_category[tech_type]:
-                skills_by_category[tech_type][tech.name] = tech.duration_months
-            else:
-                skills_by_category[tech_type][tech.name] += tech.duration_months
-        
-        individual_dev_data.append({
-            'individual_development': dev,
-            'processes': processes,
-            'technologies': technologies
-        })
-
-    skills_by_category_formatted = {}
-    for category, skills in skills_by_category.items():
-        skills_list = [{'name': name, 'duration_months': duration} for name, duration in skills.items()]
-        skills_by_category_formatted[category] = skills_list
-
-    return render_template('view_sheet.html', user=user, projects=project_data, individual_developments=individual_dev_data, skills_by_category=skills_by_category_formatted, link_code=link_code)
+    # リンクが有効な場合、スキルシートを表示するためデータを受け渡し
+    return render_template('view_sheet.html', link_code=link_code, **build_view_sheet_context(link.user_id))
 
 
 ####################################################################################################
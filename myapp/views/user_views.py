@@ -1,5 +1,6 @@
 from imports import *
 from run import *
+from utils.auth_utils import *
 
 ####################################################################################################
 # 
@@ -25,9 +26,14 @@ def userinfo():
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
+        # ハッシュ計算の前に流量制限を確認
+        if throttle_login():
+            flash('登録の試行回数が多すぎます。しばらくしてから再度お試しください。', 'danger')
+            return render_template('register.html'), 429
+
         username = request.form['username']
         email = request.form['email']
-        password = generate_password_hash(request.form['password'], method='pbkdf2:sha256')
+        password = hash_password(request.form['password'])
 
         # 新しいユーザーを作成（まだアクティブ化されていない）
         new_user = User(username=username, email=email, password=password, is_active=False)
@@ -88,29 +94,31 @@ def confirm_email(token):
 @login_required
 def account():
     if request.method == 'POST':
+        # current_user はキャッシュされた読み取り専用のユーザーのため、DBから取得したユーザーを更新する
+        user = db.session.get(User, current_user.id)
         new_username = request.form['username']
         new_email = request.form['email']
         new_password = request.form['password']
         
         # ユーザー名の更新
         if new_username:
-            current_user.username = new_username
+            user.username = new_username
         
         # メールアドレスの更新
         if new_email:
-            current_user.email = new_email
+            user.email = new_email
         
         # パスワードの更新
         if new_password:
-            hashed_password = generate_password_hash(new_password, method='pbkdf2:sha256')
-            current_user.password = hashed_password
+            hashed_password = hash_password(new_password)
+            user.password = hashed_password
         
         if new_email:
             existing_user = User.query.filter_by(email=new_email).first()
         if existing_user and existing_user.id != current_user.id:
             flash('このメールアドレスは既に使用されています。', 'danger')
         else:
-            current_user.email = new_email
+            user.email = new_email
 
         try:
             db.session.commit()
@@ -143,12 +151,14 @@ def profile():
         new_experience_years = request.form['experience_years']
         new_education = request.form['education']
 
-        current_user.display_name = new_display_name
-        current_user.age = new_age
-        current_user.gender = new_gender
-        current_user.nearest_station = new_nearest_station
-        current_user.experience_years = new_experience_years
-        current_user.education = new_education
+        # current_user はキャッシュされた読み取り専用のユーザーのため、DBから取得したユーザーを更新する
+        user = db.session.get(User, current_user.id)
+        user.display_name = new_display_name
+        user.age = new_age
+        user.gender = new_gender
+        user.nearest_station = new_nearest_station
+        user.experience_years = new_experience_years
+        user.education = new_education
 
         try:
             db.session.commit()